@@ -1,40 +1,69 @@
-import canvasapi
 import os.path as path
 import logging
+import threading
+import contextvars
 
-import datetime
-today = datetime.datetime.today().strftime("%Y-%m-%d")
+# importing this library should be quick, so the big dependencies (canvasapi, markdown, bs4, emoji) are imported in the functions which use them.
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
 
 log_level=logging.DEBUG
-log_filename = f'markdown2canvas_{today}.log'
 log_encoding = 'utf-8'
 
-root_logger = logging.getLogger()
-root_logger.setLevel(log_level)
-handler = logging.FileHandler(log_filename, 'a', log_encoding)
-root_logger.addHandler(handler)
 
-logging.debug(f'starting logging at {datetime.datetime.now()}')
+def configure_logging(filename=None, level=None):
+    """
+    logs what this library does to a file.  nothing is logged unless you call this.
+
+    filename -- defaults to `markdown2canvas_YYYY-MM-DD.log` in the current folder
+    level -- defaults to `log_level`
+
+    only this library's logger is set up, so other libraries' debug logging stays off.  returns the handler, so you can remove it again.
+    """
+    import datetime
+
+    if filename is None:
+        today = datetime.datetime.today().strftime("%Y-%m-%d")
+        filename = f'markdown2canvas_{today}.log'
+
+    if level is None:
+        level = log_level
+
+    handler = logging.FileHandler(filename, 'a', log_encoding)
+    logger.addHandler(handler)
+    logger.setLevel(level)
 
-def is_file_already_uploaded(filename,course):
+    logger.debug(f'starting logging at {datetime.datetime.now()}')
+
+    return handler
+
+
+def is_file_already_uploaded(filename,course,index=None):
     """
     returns a boolean, true if there's a file of `filename` already in `course`.
 
     This function wants the full path to the file.
     """
-    return ( not find_file_in_course(filename,course) is None )
+    return ( not find_file_in_course(filename,course,index) is None )
 
-def find_file_in_course(filename,course):
+def find_file_in_course(filename,course,index=None):
     """
     Checks to see of the file at `filename` is already in the "files" part of `course`.
 
     It tests filename and size as reported on disk.  If it finds a match, then it's up.
 
     This function wants the full path to the file.
+
+    If you pass a `CourseIndex` as `index`, the lookup uses it instead of listing the course's files.
     """
     import os
 
     base = path.split(filename)[1]
+
+    if index is not None:
+        return index.find_file(base, path.getsize(filename))
+
     files = course.get_files()
     for f in files:
         if f.filename==base and f.size == path.getsize(filename):
@@ -46,20 +75,26 @@ def find_file_in_course(filename,course):
 
 
 
-def is_page_already_uploaded(name,course):
+def is_page_already_uploaded(name,course,index=None):
     """
     returns a boolean indicating whether a page of the given `name` is already in the `course`.
     """
-    return ( not find_page_in_course(name,course) is None )
+    return ( not find_page_in_course(name,course,index) is None )
 
 
-def find_page_in_course(name,course):
+def find_page_in_course(name,course,index=None):
     """
     Checks to see if there's already a page named `name` as part of `course`.
 
     tests merely based on the name.  assumes assignments are uniquely named.
+
+    If you pass a `CourseIndex` as `index`, the lookup uses it instead of listing the course's pages.
     """
     import os
+
+    if index is not None:
+        return index.find_page(name)
+
     pages = course.get_pages()
     for p in pages:
         if p.title == name:
@@ -69,20 +104,26 @@ def find_page_in_course(name,course):
 
 
 
-def is_assignment_already_uploaded(name,course):
+def is_assignment_already_uploaded(name,course,index=None):
     """
     returns a boolean indicating whether an assignment of the given `name` is already in the `course`.
     """
-    return ( not find_assignment_in_course(name,course) is None )
+    return ( not find_assignment_in_course(name,course,index) is None )
 
 
-def find_assignment_in_course(name,course):
+def find_assignment_in_course(name,course,index=None):
     """
     Checks to see if there's already an assignment named `name` as part of `course`.
 
     tests merely based on the name.  assumes assingments are uniquely named.
+
+    If you pass a `CourseIndex` as `index`, the lookup uses it instead of listing the course's assignments.
     """
     import os
+
+    if index is not None:
+        return index.find_assignment(name)
+
     assignments = course.get_assignments()
     for a in assignments:
 
@@ -116,898 +157,3999 @@ def get_canvas_key_url():
         exec(cred_file.read(),locals())
 
     if isinstance(locals()['API_KEY'], str):
-        logging.info(f'using canvas with API_KEY as defined in {cred_loc}')
+        logger.info(f'using canvas with API_KEY as defined in {cred_loc}')
     else:
         raise SetupError(f'failing to use canvas.  Make sure that file {cred_loc} contains a line of code defining a string variable `API_KEY="keyhere"`')
 
     return locals()['API_KEY'],locals()['API_URL']
 
 
-def make_canvas_api_obj(url=None):
+def make_canvas_api_obj(url=None, throttled=True):
     """
     - reads the key from a python file, path to which must be in environment variable CANVAS_CREDENTIAL_FILE.
     - optionally, pass in a url to use, in case you don't want the default one you put in your CANVAS_CREDENTIAL_FILE.
+    - unless `throttled` is False, requests go through the shared `CanvasSession` for that url's host, which keeps under Canvas' rate limit.  see `throttle_canvas`.
     """
 
+    import canvasapi
+
     key, default_url = get_canvas_key_url()
     if not url:
         url = default_url
 
-    return canvasapi.Canvas(url, key)
-
+    canvas = canvasapi.Canvas(url, key)
 
+    if throttled:
+        throttle_canvas(canvas)
 
+    return canvas
 
 
 
-def compute_relative_style_path(style_path):
-    here = path.abspath('.')
-    there = path.abspath(style_path)
 
-    return path.join(path.commonpath([here,there]), style_path)
+################## talking to Canvas
 
+# Canvas gives each user a bucket of request "cost".  Each request's cost is taken from it, and it refills at a steady rate.  Every response says how much is left (`X-Rate-Limit-Remaining`) and what the request cost (`X-Request-Cost`).  When it's empty, Canvas answers 403 "Rate Limit Exceeded".
+#
+# A `CanvasSession` sends the requests of a `canvasapi.Canvas`, through a pool of kept-alive connections, and a `RateLimiter` per host, which
+# - limits how many requests are in flight at once, halving that when Canvas says to slow down, and growing it back while there's plenty left in the bucket
+# - once the bucket gets low, spaces out the start of requests, so they cost no faster than the bucket refills
+# - sends a request again, after waiting, if Canvas refused it for the rate limit.  that's always safe, because Canvas didn't do anything with it.
+#
+# Other failures (dropped connections, timeouts, 5xx) are dealt with by a `RetryPolicy`.  The session sends requests which are safe to repeat (GET, PUT, DELETE) again by itself.  Requests which make things (POST) aren't safe to just repeat -- if the first one worked but the response got lost, repeating it makes a duplicate.  So the functions in this library which make things use `create_checked`, which looks for the thing before trying again.
 
+max_concurrent_requests = 8 # most requests in flight at once, to one host
 
-def preprocess_markdown_images(contents,style_path):
+rate_limit_low_water = 200.0 # when less than this is left in the bucket, requests are spaced out
 
-    rel_style_path = compute_relative_style_path(style_path)
+rate_limit_refill_rate = 10.0 # how fast Canvas refills the bucket, per second
 
-    contents = contents.replace('$PATHTOMD2CANVASSTYLEFILE',rel_style_path)
+rate_limit_retries = 8 # how many times a request refused for the rate limit is sent again
 
-    return contents
 
 
-def apply_style_markdown(sourcename, style_path, outname):
-    from os.path import join
+class RetryPolicy(object):
+    """
+    How to try again, when talking to Canvas fails in a way that might work next time.
 
-    # need to add header and footer.  assume they're called `header.md` and `footer.md`.  we're just going to concatenate them and dump to file.
+    attempts -- most tries of one call, including the first
+    backoff -- the delay before the first retry is random, up to this many seconds.  the limit doubles with each retry (exponential backoff, with "full jitter")
+    max_backoff -- the limit on the random delay stops doubling at this many seconds
+    deadline -- no retry starts this many seconds or more after the first try did
+    timeout -- (connect, read) timeouts of each request, in seconds
+    """
 
-    with open(sourcename,'r',encoding='utf-8') as f:
-        body = f.read()
+    retryable_statuses = {408, 500, 502, 503, 504}
 
-    with open(join(style_path,'header.md'),'r',encoding='utf-8') as f:
-        header = f.read()
+    idempotent_methods = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'}
 
-    with open(join(style_path,'footer.md'),'r',encoding='utf-8') as f:
-        footer = f.read()
 
+    def __init__(self, attempts=5, backoff=0.5, max_backoff=30.0, deadline=300.0, timeout=(10.0, 120.0)):
+        super(RetryPolicy, self).__init__()
 
-    contents = f'{header}\n{body}\n{footer}'
-    contents = preprocess_markdown_images(contents, style_path)
+        self.attempts = attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.deadline = deadline
+        self.timeout = timeout
 
-    with open(outname,'w',encoding='utf-8') as f:
-        f.write(contents)
 
+    def delay(self, failures):
+        """
+        a random number of seconds to wait, after `failures` failed tries
+        """
+        import random
 
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2**(failures-1)))
 
 
-def apply_style_html(translated_html_without_hf, style_path, outname):
-    from os.path import join
+    def may_retry(self, failures, started):
+        """
+        whether another try is allowed, after `failures` failed tries of a call which started at time.monotonic() `started`
+        """
+        import time
 
-    # need to add header and footer.  assume they're called `header.html` and `footer.html`.  we're just going to concatenate them and dump to file.
+        return failures < self.attempts and time.monotonic() - started < self.deadline
 
-    with open(join(style_path,'header.html'),'r',encoding='utf-8') as f:
-        header = f.read()
 
-    with open(join(style_path,'footer.html'),'r',encoding='utf-8') as f:
-        footer = f.read()
+    def is_retryable_exception(self, e):
+        """
+        whether the exception `e`, from requests or canvasapi, might not happen next time
+        """
+        import re
+        import requests
+        from canvasapi.exceptions import CanvasException, RateLimitExceeded
 
+        if isinstance(e, (requests.exceptions.ConnectionError, requests.exceptions.Timeout, requests.exceptions.ChunkedEncodingError)):
+            return True
 
-    return f'{header}\n{translated_html_without_hf}\n{footer}'
+        if isinstance(e, RateLimitExceeded) or 'Rate Limit Exceeded' in str(e):
+            return True
 
+        if isinstance(e, CanvasException):
+            # canvasapi doesn't keep the status for these, just the message
+            m = re.search(r'status code (\d+)', str(e))
+            return m is not None and int(m.group(1)) in self.retryable_statuses
 
+        return False
 
 
+    def call(self, func, check=None, description=None):
+        """
+        returns `func()`, calling it again if it raises a retryable exception.
 
+        if `check` is given, it's called before each retry, and if it returns something other than None, that's returned instead of trying again.  see `create_checked`.
+        """
+        import time
 
-def markdown2html(filename):
+        started = time.monotonic()
+        failures = 0
+        while True:
+            try:
+                return func()
+            except Exception as e:
+                failures += 1
+                if not (self.is_retryable_exception(e) and self.may_retry(failures, started)):
+                    raise
+                logger.warning(f'{description or func} failed ({e!r}), trying again')
 
-    root = path.split(filename)[0]
+            time.sleep(self.delay(failures))
 
-    import emoji
-    import markdown
-    from bs4 import BeautifulSoup
+            if check is not None:
+                found = check()
+                if found is not None:
+                    logger.info(f'{description or func} worked after all')
+                    return found
 
 
-    with open(filename,'r',encoding='utf-8') as file:
-        markdown_source = file.read()
 
-    emojified = emoji.emojize(markdown_source)
+retry_policy = RetryPolicy() # used for everything, unless a `CanvasSession` has its own
 
 
-    html = markdown.markdown(emojified, extensions=['codehilite','fenced_code','md_in_html','tables'])
-    soup = BeautifulSoup(html,features="lxml")
 
-    all_imgs = soup.findAll("img")
-    for img in all_imgs:
-            src = img["src"]
-            if ('http://' not in src) and ('https://' not in src):
-                img["src"] = path.join(root,src)
+def create_checked(create, find, description=None):
+    """
+    returns `create()`, which makes something on Canvas.  if that fails in a way which might work next time (see `RetryPolicy`), it's tried again, but first `find()` is called to see whether the failed try made the thing after all.  `find` returns the thing, or None.
+    """
+    return retry_policy.call(create, check=find, description=description)
 
-    return soup.prettify()
 
 
+def is_rate_limited(response):
+    """
+    whether Canvas refused `response`'s request because of the rate limit
+    """
+    if response.status_code == 429:
+        return True
+    return response.status_code == 403 and 'Rate Limit Exceeded' in response.text
 
 
 
-def find_local_images(html):
-    from bs4 import BeautifulSoup
+class RateLimiter(object):
+    """
+    Paces requests to one host, using the rate limit headers in its responses.  Call `acquire()` before each request, and `release(response)` after.
 
-    soup = BeautifulSoup(html,features="lxml")
+    max_concurrency -- most requests in flight at once.  defaults to `max_concurrent_requests`
+    low_water -- below this much left in the bucket, requests are spaced out.  defaults to `rate_limit_low_water`
+    refill_rate -- how fast the bucket refills, per second.  defaults to `rate_limit_refill_rate`
+    """
 
-    local_images = {}
+    def __init__(self, max_concurrency=None, low_water=None, refill_rate=None):
+        super(RateLimiter, self).__init__()
 
-    all_imgs = soup.findAll("img")
+        import threading
 
-    if all_imgs:
-        for img in all_imgs:
-            src = img["src"]
-            if src[:7] not in ['https:/','http://']:
-                local_images[src] = Image(path.abspath(src))
+        self.max_concurrency = max_concurrency or max_concurrent_requests
+        self.low_water = rate_limit_low_water if low_water is None else low_water
+        self.refill_rate = refill_rate or rate_limit_refill_rate
 
-    return local_images
+        self.concurrency = self.max_concurrency # the current limit, which adapts
+        self.in_flight = 0
+        self.remaining = None # what's left in the bucket, as of the last response.  None until there's been one with the header.
+        self.cost = 1.0 # a running average of the cost of a request
 
+        self._next_start = 0.0 # when the next request may start, by time.monotonic()
+        self._cond = threading.Condition()
 
 
+    def acquire(self):
+        import time
 
-def adjust_html_for_images(html, published_images, courseid):
-    """
-    this function edits the html source, replacing local url's
-    with url's to images on Canvas.
-    """
-    from bs4 import BeautifulSoup
+        with self._cond:
+            while self.in_flight >= self.concurrency:
+                self._cond.wait()
+            self.in_flight += 1
 
-    soup = BeautifulSoup(html,features="lxml")
+            now = time.monotonic()
+            start = max(now, self._next_start)
 
-    all_imgs = soup.findAll("img")
-    if all_imgs:
-        for img in all_imgs:
-            src = img["src"]
-            if src[:7] not in ['https:/','http://']:
-                # find the image in the list of published images, replace url, do more stuff.
-                local_img = published_images[src]
-                img['src'] = local_img.make_src_url(courseid)
-                img['class'] = "instructure_file_link inline_disabled"
-                img['data-api-endpoint'] = local_img.make_api_endpoint_url(courseid)
-                img['data-api-returntype'] = 'File'
-    return soup.prettify()
+            if self.remaining is not None and self.remaining < self.low_water:
+                # take turns, one request's worth of refill apart
+                self._next_start = start + self.cost/self.refill_rate
+            else:
+                self._next_start = start
 
-    # <p>
-    #     <img class="instructure_file_link inline_disabled" src="https://uws-td.instructure.com/courses/3099/files/219835/preview" alt="hauser_menagerie.jpg" data-api-endpoint="https://uws-td.instructure.com/api/v1/courses/3099/files/219835" data-api-returntype="File" />
-    # </p>
+            if self.remaining is not None:
+                self.remaining -= self.cost # until the response says otherwise
 
+        if start > now:
+            time.sleep(start - now)
 
 
+    def release(self, response=None):
+        """
+        `response` is None if the request didn't get one.
+        """
+        import time
 
+        with self._cond:
+            self.in_flight -= 1
 
-def get_root_folder(course):
-    for f in course.get_folders():
-        if f.full_name == 'course files':
-            return f
+            if response is not None:
+                cost = _float_header(response, 'X-Request-Cost')
+                if cost is not None:
+                    self.cost = 0.8*self.cost + 0.2*cost
 
+                remaining = _float_header(response, 'X-Rate-Limit-Remaining')
+                if remaining is not None:
+                    self.remaining = remaining
 
+                if is_rate_limited(response):
+                    self.concurrency = max(1, self.concurrency//2)
+                    self.remaining = min(self.remaining or 0.0, 0.0)
+                    # wait long enough for a few requests' worth to refill
+                    self._next_start = max(self._next_start, time.monotonic() + 4*self.cost/self.refill_rate)
+                    logger.info(f'rate limited by canvas, now {self.concurrency} requests at a time')
 
+                elif self.remaining is None or self.remaining >= self.low_water:
+                    self.concurrency = min(self.max_concurrency, self.concurrency+1)
 
+            self._cond.notify_all()
 
 
 
-class AlreadyExists(Exception):
+def _float_header(response, name):
+    try:
+        return float(response.headers[name])
+    except (KeyError, ValueError):
+        return None
 
-    def __init__(self, message, errors=""):
-        # Call the base class constructor with the parameters it needs
-        super().__init__(message)
 
-        self.errors = errors
 
-class SetupError(Exception):
+class CanvasSession(object):
+    """
+    A pooled, kept-alive http session for a `canvasapi.Canvas` to send its requests through, which keeps under Canvas' rate limit.  See `throttle_canvas`.
 
-    def __init__(self, message, errors=""):            
-        # Call the base class constructor with the parameters it needs
-        super().__init__(message)
-            
-        self.errors = errors
+    It has the methods of a `requests.Session` which canvasapi uses.  Anything else is passed through to the underlying session.
 
+    The first three arguments are passed to the `RateLimiter` made for each host.  `retry_policy` defaults to the module's `retry_policy`.
+    """
 
+    def __init__(self, max_concurrency=None, low_water=None, refill_rate=None, retry_policy=None):
+        super(CanvasSession, self).__init__()
 
+        import threading
+        import requests
+        from requests.adapters import HTTPAdapter
 
-class DoesntExist(Exception):
-    """
-    Used when getting a thing, but it doesn't exist
-    """
+        self.limiter_options = {'max_concurrency': max_concurrency, 'low_water': low_water, 'refill_rate': refill_rate}
 
-    def __init__(self, message, errors=""):            
-        # Call the base class constructor with the parameters it needs
-        super().__init__(message)
-            
-        self.errors = errors
+        pool_size = max(max_concurrency or max_concurrent_requests, 10)
+        self.session = requests.Session()
+        for prefix in ['http://', 'https://']:
+            self.session.mount(prefix, HTTPAdapter(pool_connections=4, pool_maxsize=pool_size))
 
+        self.retry_policy = retry_policy
 
+        self._limiters = {}
+        self._lock = threading.Lock()
 
 
-def create_or_get_assignment(name, course, even_if_exists = False):
+    def limiter(self, url):
+        """
+        the `RateLimiter` for the host in `url`
+        """
+        from urllib.parse import urlsplit
+
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._limiters:
+                self._limiters[host] = RateLimiter(**self.limiter_options)
+            return self._limiters[host]
+
+
+    def request(self, method, url, *args, **kwargs):
+        import time
+
+        policy = self.retry_policy or retry_policy
+        kwargs.setdefault('timeout', policy.timeout)
+
+        limiter = self.limiter(url)
+        rewind = _rewinder(kwargs.get('files'))
+        retry_failures = method.upper() in policy.idempotent_methods
+
+        started = time.monotonic()
+        failures = 0
+        rate_limited = 0
+        while True:
+            rewind()
+            limiter.acquire()
+            response, error = None, None
+            sent = time.perf_counter()
+            try:
+                response = self.session.request(method, url, *args, **kwargs)
+            except Exception as e:
+                error = e
+            finally:
+                limiter.release(response)
+
+            if instrumentation is not None:
+                instrumentation.record(method, url, response, error, time.perf_counter() - sent)
+
+            if error is None and is_rate_limited(response):
+                rate_limited += 1
+                if rate_limited > rate_limit_retries:
+                    return response
+                continue
 
-    if is_assignment_already_uploaded(name,course):
-        if even_if_exists:
-            return find_assignment_in_course(name,course)
-        else:
-            raise AlreadyExists(f"assignment {name} already exists")
-    else:
-        # make new assignment of name in course.
-        return course.create_assignment(assignment={'name':name})
+            if error is not None:
+                retryable = policy.is_retryable_exception(error)
+            else:
+                retryable = response.status_code in policy.retryable_statuses
 
+            if not retryable:
+                return response
 
+            failures += 1
+            if not (retry_failures and policy.may_retry(failures, started)):
+                if error is not None:
+                    raise error
+                return response
 
-def create_or_get_page(name, course, even_if_exists):
-    if is_page_already_uploaded(name,course):
+            logger.warning(f'{method} {url} failed ({error!r} {response}), trying again')
+            time.sleep(policy.delay(failures))
 
-        if even_if_exists:
-            return find_page_in_course(name,course)
-        else:
-            raise AlreadyExists(f"page {name} already exists")
-    else:
-        # make new assignment of name in course.
-        result = course.create_page(wiki_page={'body':"empty page",'title':name})
-        return result
 
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
 
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
 
+    def put(self, url, **kwargs):
+        return self.request('PUT', url, **kwargs)
 
-def create_or_get_module(module_name, course):
+    def patch(self, url, **kwargs):
+        return self.request('PATCH', url, **kwargs)
 
-    try:
-        return get_module(module_name, course)
-    except DoesntExist as e:
-        return course.create_module(module={'name':module_name})
+    def delete(self, url, **kwargs):
+        return self.request('DELETE', url, **kwargs)
 
+    def __getattr__(self, name):
+        return getattr(self.session, name)
 
 
 
-def get_module(module_name, course):
+def _rewinder(files):
     """
-    returns 
-    * Module if such a module exists, 
-    * raises if not
+    returns a function which puts the open files being uploaded back where they started, so a request can be sent again
     """
-    modules = course.get_modules()
+    if not files:
+        return lambda: None
 
-    for m in modules:
-        if m.name == module_name:
-            return m
+    handles = [f[1] if isinstance(f, tuple) else f for f in files.values()]
+    starts = [(h, h.tell()) for h in handles if hasattr(h, 'seek') and hasattr(h, 'tell')]
 
-    raise DoesntExist(f"tried to get module {module_name}, but it doesn't exist in the course")
+    def rewind():
+        for h, position in starts:
+            h.seek(position)
 
+    return rewind
 
-def get_subfolder_named(folder, subfolder_name):
 
-    assert '/' not in subfolder_name, "this is likely broken if subfolder has a / in its name, / gets converted to something else by Canvas.  don't use / in subfolder names, that's not allowed"
 
-    current_subfolders = folder.get_folders()
-    for f in current_subfolders:
-        if f.name == subfolder_name:
-            return f
+_canvas_sessions = {}
+_canvas_sessions_lock = threading.Lock()
 
-    raise DoesntExist(f'a subfolder of {folder.name} named {subfolder_name} does not currently exist')
 
-    
-def delete_module(module_name, course, even_if_exists):
+def canvas_session_for(url):
+    """
+    the `CanvasSession` shared by everything talking to the Canvas at `url`
+    """
+    from urllib.parse import urlsplit
+
+    host = urlsplit(url).netloc
+    with _canvas_sessions_lock:
+        if host not in _canvas_sessions:
+            _canvas_sessions[host] = CanvasSession()
+        return _canvas_sessions[host]
 
-    if even_if_exists:
-        try:
-            m = get_module(module_name, course)
-            m.delete()
-        except DoesntExist as e:
-            return
 
-    else:
-        # this path is expected to raise if the module doesn't exist
-        m = get_module(module_name, course)
-        m.delete()
 
+def throttle_canvas(canvas, session=None):
+    """
+    makes `canvas` (a `canvasapi.Canvas`) send its requests through `session`, a `CanvasSession`.  By default, the one shared by everything talking to the same host.
 
+    `make_canvas_api_obj` does this for you.  returns `canvas`.
+    """
+    requester = canvas._Canvas__requester
 
-################## classes
+    if session is None:
+        session = canvas_session_for(requester.base_url)
 
+    requester._session = session
+    return canvas
 
-class CanvasObject(object):
-    """
-    A base class for wrapping canvas objects.
-    """
 
-    def __init__(self,canvas_obj=None):
 
 
-        super(object, self).__init__()
 
-        # try to open, and see if the meta and source files exist.
-        # if not, raise
+################## measuring the calls to Canvas
 
-        self.canvas_obj = canvas_obj
 
+instrumentation = None # the `Instrumentation` recording calls to Canvas, if any.  see `use_instrumentation`.
 
+current_container = contextvars.ContextVar('current_container', default=None) # the folder of the container being published, for `Instrumentation`
 
 
-class Document(CanvasObject):
-    """
-    A base class which handles common pieces of interface for things like Pages and Assignments
+def use_instrumentation(callback=None):
     """
+    starts recording every request made to Canvas through a `CanvasSession` (see `throttle_canvas`) in an `Instrumentation`, and returns it.  `callback`, if given, is called with the record of each request as it finishes.
 
-    def __init__(self,folder):
-        """
-        Construct a Document.
-        Reads the meta.json file and source.md files
-        from the specified folder.
-        """
+    call `use_instrumentation(False)` to stop recording.
+    """
+    global instrumentation
 
-        super(Document,self).__init__(folder)
-        import json, os
-        from os.path import join
+    if callback is False:
+        instrumentation = None
+    else:
+        instrumentation = Instrumentation(callback)
 
-        self.folder = folder
+    return instrumentation
 
-        self.metaname = path.join(folder,'meta.json')
-        with open(path.join(folder,'meta.json'),'r') as f:
-            self.metadata = json.load(f)
 
 
-        self.sourcename = path.join(folder,'source.md')
+def _attributed(publish):
+    """
+    decorates a `publish` method, so the requests it makes are recorded as made for the thing being published.  if that's happening while publishing something else (an image for a page, say), they stay with the something else.
+    """
+    import functools
 
-        self.name = None
+    @functools.wraps(publish)
+    def attributed_publish(self, *args, **kwargs):
+        if current_container.get() is not None:
+            return publish(self, *args, **kwargs)
 
-        self._set_from_metadata()
+        token = current_container.set(getattr(self, 'givenpath', None) or self.folder)
+        try:
+            return publish(self, *args, **kwargs)
+        finally:
+            current_container.reset(token)
 
-        if 'style' in self.metadata:
-            outname = join(self.folder,"styled_source.md")
-            apply_style_markdown(self.sourcename, self.metadata['style'], outname)
+    return attributed_publish
 
-            translated_html_without_hf = markdown2html(outname)
 
-            self.translated_html = apply_style_html(translated_html_without_hf, self.metadata['style'], outname)
-        else:
-            self.translated_html = markdown2html(self.sourcename)
 
-        self.local_images = find_local_images(self.translated_html)
+def operation_name(method, url):
+    """
+    a name for what a request to Canvas does, like 'list pages', 'edit page' or 'list module items', from its method and url.  requests outside the api (to upload urls) are 'upload'.
+    """
+    from urllib.parse import urlsplit
 
-        # print(f'local images: {self.local_images}')
+    parts = [p for p in urlsplit(url).path.split('/') if p]
+    if parts[:2] != ['api','v1']:
+        return 'upload'
 
+    # the api's paths alternate between kinds of thing and ids: courses/1/modules/2/items
+    parts = parts[2:]
+    kinds, ids = parts[0::2], parts[1::2]
+    singular = [k[:-1] if k.endswith('s') else k for k in kinds]
 
+    listing = len(ids) < len(kinds) and method.upper() == 'GET'
+    kind = kinds[-1] if listing else singular[-1]
+    # items and revisions need saying what of.  subfolders of a folder are just folders.
+    if len(singular) > 1 and singular[-2] not in ('course', singular[-1]):
+        kind = f'{singular[-2]} {kind}'
 
+    if method.upper() == 'POST' and kinds[-1] == 'files':
+        return 'start upload'
 
+    if listing:
+        return f'list {kind}'
 
+    verbs = {'GET': 'get', 'PUT': 'edit', 'PATCH': 'edit', 'DELETE': 'delete', 'POST': 'create'}
+    return f'{verbs.get(method.upper(), method.lower())} {kind}'
 
 
 
+class Instrumentation(object):
+    """
+    A record of the requests made to Canvas: what each one was for (see `operation_name`), which container it was made while publishing, how long it took, its status, and how many bytes went each way.
 
+    `use_instrumentation` makes one and turns it on.  `report()` sums things up by operation and by container, which is handy for finding things which make a request per item (and `to_json()` writes that down).  `callback`, if given, is called with the record of each request, a dict, as it finishes.
 
+    Can be shared between threads.
+    """
 
+    latency_buckets = [0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0] # upper bounds, in seconds.  anything slower goes in one more bucket.
 
-    def publish_images_and_adjust_html(self,course,overwrite=False):
-        # first, publish the local images.
-        for im in self.local_images.values():
-            im.publish(course,'images')
+    def __init__(self, callback=None):
+        super(Instrumentation, self).__init__()
 
+        self.callback = callback
+        self.calls = []
+        self._lock = threading.Lock()
 
-        # then, deal with the urls
-        self.translated_html = adjust_html_for_images(self.translated_html, self.local_images, course.id)
 
+    def record(self, method, url, response, error, seconds):
+        """
+        records one request.  `CanvasSession` calls this for every request it sends, including ones sent again.
+        """
+        from urllib.parse import urlsplit
 
-        with open(f'{self.folder}/result.html','w') as result:
-            result.write(self.translated_html)
+        call = {'operation': operation_name(method, url),
+                'method': method.upper(),
+                'path': urlsplit(url).path,
+                'container': current_container.get(),
+                'status': None if response is None else response.status_code,
+                'error': None if error is None else repr(error),
+                'seconds': seconds,
+                'bytes_sent': _request_bytes(response),
+                'bytes_received': 0 if response is None else len(response.content)}
 
+        with self._lock:
+            self.calls.append(call)
 
+        logger.debug(f'{call["operation"]} {call["path"]}: {call["status"] or call["error"]} in {seconds:.3f}s')
 
+        if self.callback is not None:
+            self.callback(call)
 
 
-    def _set_from_metadata(self):
-        self.name = self.metadata['name']
+    def clear(self):
+        with self._lock:
+            self.calls = []
 
-        if 'modules' in self.metadata:
-            self.modules = self.metadata['modules']
-        else:
-            self.modules = []
 
+    def _bucket(self, seconds):
+        for n, bound in enumerate(self.latency_buckets):
+            if seconds <= bound:
+                return n
+        return len(self.latency_buckets)
 
 
-    def _dict_of_props(self):
+    def report(self):
         """
-        construct a dictionary of properties, such that it can be used to `edit` a canvas object.
-        """
-        d = {}
-        return d
+        the calls summed up, as a dict:
 
+        - `requests`, `seconds`, `bytes_sent`, `bytes_received` -- totals
+        - `operations` -- for each operation, those totals, plus `errors` (how many weren't 2xx), `max_seconds`, and `histogram`, how many took up to each of `latency_buckets` seconds
+        - `containers` -- for each container, how many requests of each operation were made while publishing it.  requests made outside of publishing anything are under `''`.
 
-    def ensure_in_modules(self, course):
+        for list operations, the number of requests is the number of pages of results fetched.
+        """
+        with self._lock:
+            calls = list(self.calls)
 
-        if not self.canvas_obj:
-            raise DoesntExist(f"trying to make sure an object is in its modules, but this item ({self.name}) doesn't exist on canvas yet.  publish it first.")
+        def totals():
+            return {'requests': 0, 'seconds': 0.0, 'bytes_sent': 0, 'bytes_received': 0}
 
-        for module_name in self.modules:
-            module = create_or_get_module(module_name, course)
+        everything = totals()
+        operations = {}
+        containers = {}
+        for call in calls:
+            op = operations.setdefault(call['operation'], dict(totals(), errors=0, max_seconds=0.0, histogram=[0]*(len(self.latency_buckets)+1)))
+            for t in [everything, op]:
+                t['requests'] += 1
+                t['seconds'] += call['seconds']
+                t['bytes_sent'] += call['bytes_sent']
+                t['bytes_received'] += call['bytes_received']
 
-            if self.metadata['type'] == 'page':
-                content_id = self.canvas_obj.page_id
-            elif self.metadata['type'] == 'assignment':
-                content_id = self.canvas_obj.id
+            if call['status'] is None or not 200 <= call['status'] < 300:
+                op['errors'] += 1
+            op['max_seconds'] = max(op['max_seconds'], call['seconds'])
+            op['histogram'][self._bucket(call['seconds'])] += 1
 
+            by_operation = containers.setdefault(call['container'] or '', {})
+            by_operation[call['operation']] = by_operation.get(call['operation'], 0) + 1
 
-            module.create_module_item(module_item={'type':self.metadata['type'], 'content_id':content_id})
+        return dict(everything, operations=operations, containers=containers, latency_buckets=self.latency_buckets)
 
 
-    def is_in_module(self, module_name, course):
+    def to_json(self, filename=None):
         """
-        checks whether this content is an item in the listed module
-
-        passthrough raise if the module doesn't exist
+        the `report()` as json.  if `filename` is given, it's written there too.
         """
+        import json
 
-        module = get_module(module_name,course)
+        text = json.dumps(self.report(), indent=1, sort_keys=True)
+        if filename is not None:
+            write_atomically(filename, text)
+        return text
 
-        for item in module.get_module_items():
 
-            if item.type=='Page':
-                if self.metadata['type']=='page':
 
-                    if course.get_page(item.page_url).title == self.name:
-                        return True
+def _request_bytes(response):
+    """
+    how big the body of the request for `response` was
+    """
+    body = None if response is None else response.request.body
+    if isinstance(body, (bytes, str)):
+        return len(body)
+    return 0
 
-                else:   
-                    continue
 
 
-            if item.type=='Assignment':
-                if self.metadata['type']=='assignment':
 
-                    if course.get_assignment(assignment=a.content_id).name == self.name:
-                        return True
-                else:
-                    continue
+def compute_relative_style_path(style_path):
+    here = path.abspath('.')
+    there = path.abspath(style_path)
 
-        return False
+    return path.join(path.commonpath([here,there]), style_path)
 
 
-class Page(Document):
-    """
-    a Page is an abstraction around content for plain old canvas pages, which facilitates uploading to Canvas.
 
-    folder -- a string, the name of the folder we're going to read data from.
-    """
-    def __init__(self, folder):
-        super(Page, self).__init__(folder)
+def preprocess_markdown_images(contents,style_path):
 
+    rel_style_path = compute_relative_style_path(style_path)
 
-    def _set_from_metadata(self):
-        super(Page,self)._set_from_metadata()
+    contents = contents.replace('$PATHTOMD2CANVASSTYLEFILE',rel_style_path)
 
+    return contents
 
-    def publish(self,course, overwrite=False):
-        """
-        if `overwrite` is False, then if an assignment is found with the same name already, the function will decline to make any edits.
 
-        That is, if overwrite==False, then this function will only succeed if there's no existing assignment of the same name.
+def apply_style_markdown(sourcename, style_path, outname):
+    from os.path import join
 
-        This base-class function will handle things like the html, images, etc.
+    # need to add header and footer.  assume they're called `header.md` and `footer.md`.  we're just going to concatenate them and dump to file.
 
-        Other derived-class `publish` functions will handle things like due-dates for assignments, etc.
-        """
-        try:
-            page = create_or_get_page(self.name, course, even_if_exists=overwrite)
-        except AlreadyExists as e:
-            if not overwrite:
-                raise e
+    with open(sourcename,'r',encoding='utf-8') as f:
+        body = f.read()
 
-        self.canvas_obj = page
+    with open(join(style_path,'header.md'),'r',encoding='utf-8') as f:
+        header = f.read()
 
-        self.publish_images_and_adjust_html(course)
+    with open(join(style_path,'footer.md'),'r',encoding='utf-8') as f:
+        footer = f.read()
 
-        d = self._dict_of_props()
-        page.edit(wiki_page=d) 
 
-        self.ensure_in_modules(course)
+    contents = f'{header}\n{body}\n{footer}'
+    contents = preprocess_markdown_images(contents, style_path)
 
+    with open(outname,'w',encoding='utf-8') as f:
+        f.write(contents)
 
 
 
-    def _dict_of_props(self):
 
-        d = super(Page,self)._dict_of_props()
+def apply_style_html(translated_html_without_hf, style_path, outname):
+    from os.path import join
 
-        d['body'] = self.translated_html
-        d['title'] = self.name
+    # need to add header and footer.  assume they're called `header.html` and `footer.html`.  we're just going to concatenate them and dump to file.
 
-        return d
+    with open(join(style_path,'header.html'),'r',encoding='utf-8') as f:
+        header = f.read()
 
-    def __str__(self):
-        result = f"Page({self.folder})"
-        return result
+    with open(join(style_path,'footer.html'),'r',encoding='utf-8') as f:
+        footer = f.read()
 
 
-class Assignment(Document):
-    """docstring for Assignment"""
-    def __init__(self, folder):
-        super(Assignment, self).__init__(folder)
+    return f'{header}\n{translated_html_without_hf}\n{footer}'
 
-        # self._set_from_metadata() # <-- this is called from the base __init__
 
-    def __str__(self):
-        result = f"Assignment({self.folder})"
-        return result
 
-    def _set_from_metadata(self):
-        super(Assignment,self)._set_from_metadata()
 
+class Style(object):
+    """
+    A style folder, read and rendered once, to be shared by all the documents which use it.
 
-        self.allowed_extensions = self.metadata['allowed_extensions'] if 'allowed_extensions' in self.metadata else None
+    A style is a folder with `header.html`, `header.md`, `footer.md` and `footer.html`.  The markdown parts have their `$PATHTOMD2CANVASSTYLEFILE` replaced, and are rendered to html once, here.  Then `apply` wraps each document's rendered body in the header and footer, in memory.
 
-        self.points_possible = self.metadata['points_possible'] if 'points_possible' in self.metadata else None
+    Get these with `Style.load(style_path)`, which makes each style only once, and makes it again if its files change.
 
-        self.unlock_at = self.metadata['unlock_at'] if 'unlock_at' in self.metadata else None
-        self.lock_at = self.metadata['lock_at'] if 'lock_at' in self.metadata else None
-        self.due_at = self.metadata['due_at'] if 'due_at' in self.metadata else None
+    A style holds only what's the same wherever it's published: html, and the paths of its images.  Each document makes its own `Image`s, since what they're uploaded as depends on the course.
 
-        self.published = self.metadata['published'] if 'published' in self.metadata else None
+    A style can also have a `markdown.json`, like `{"extensions": ["toc", "attr_list", ...], "extension_configs": {"toc": {...}}}`, to render the documents using it (and its own markdown) with different markdown extensions than `markdown_extensions`.
+    """
 
-        self.submission_types = self.metadata['submission_types'] if 'submission_types' in self.metadata else None
+    _loaded = {} # absolute style path to (key, style)
+    _loaded_lock = threading.Lock()
 
-        self.external_tool_tag_attributes = self.metadata['external_tool_tag_attributes'] if 'external_tool_tag_attributes' in self.metadata else None
 
+    def __init__(self, style_path):
+        super(Style, self).__init__()
 
-    def _dict_of_props(self):
+        self.style_path = style_path
 
-        d = super(Assignment,self)._dict_of_props()
-        d['name'] = self.name
-        d['description'] = self.translated_html
+        def read(name):
+            with open(path.join(style_path, name),'r',encoding='utf-8') as f:
+                return f.read()
 
-        if not self.allowed_extensions is None:
-            d['allowed_extensions'] = self.allowed_extensions
+        self.header_html = read('header.html')
+        self.footer_html = read('footer.html')
 
-        if not self.points_possible is None:
-            d['points_possible'] = self.points_possible
+        # None means the module's defaults
+        self.markdown_extensions = None
+        self.markdown_extension_configs = None
+        if path.exists(path.join(style_path, 'markdown.json')):
+            import json
 
-        if not self.unlock_at is None:
-            d['unlock_at'] = self.unlock_at
-        if not self.due_at is None:
-            d['due_at'] = self.due_at
-        if not self.lock_at is None:
-            d['lock_at'] = self.lock_at
+            options = json.loads(read('markdown.json'))
+            self.markdown_extensions = options.get('extensions')
+            self.markdown_extension_configs = options.get('extension_configs')
 
-        if not self.published is None:
-            d['published'] = self.published
+        # rendered separately, these are the same as when they were concatenated around the source, as long as they're whole blocks of markdown.
+        self.header_md_html = self.render_markdown_source(preprocess_markdown_images(read('header.md'), style_path).encode('utf-8'))
+        self.footer_md_html = self.render_markdown_source(preprocess_markdown_images(read('footer.md'), style_path).encode('utf-8'))
 
-        if not self.submission_types is None:
-            d['submission_types'] = self.submission_types
+        # the srcs of the images used by the style.  they're absolute paths already, from `preprocess_markdown_images`.
+        self.image_srcs = []
+        for fragment in [self.header_md_html, self.footer_md_html]:
+            for img in parse_html(fragment).find_all("img"):
+                src = img["src"]
+                if src[:7] not in ['https:/','http://'] and src not in self.image_srcs:
+                    self.image_srcs.append(src)
 
-        if not self.external_tool_tag_attributes is None:
-            d['external_tool_tag_attributes'] = self.external_tool_tag_attributes
 
+    @classmethod
+    def load(cls, style_path):
+        """
+        returns the `Style` for `style_path`, shared with everything else using it.
+        """
+        from os import stat
 
-        return d
+        # a style is loaded again if any of its files changed, replacing the old one
+        key = tuple(stat(path.join(style_path, n)).st_mtime_ns for n in cls.filenames)
+        key += tuple(stat(f).st_mtime_ns if path.exists(f) else None for f in [path.join(style_path, n) for n in cls.optional_filenames])
 
+        with cls._loaded_lock:
+            loaded_key, style = cls._loaded.get(path.abspath(style_path), (None, None))
+            if loaded_key != key:
+                with profile_stage('load style'):
+                    style = cls(style_path)
+                cls._loaded[path.abspath(style_path)] = (key, style)
 
+        return style
 
-    def publish(self, course, overwrite=False):
-        """
-        if `overwrite` is False, then if an assignment is found with the same name already, the function will decline to make any edits.
 
-        That is, if overwrite==False, then this function will only succeed if there's no existing assignment of the same name.
+    filenames = ['header.md','footer.md','header.html','footer.html']
+    optional_filenames = ['markdown.json']
+
+
+    def render_markdown(self, filename):
         """
-        assignment = None
-        try:
-            assignment = create_or_get_assignment(self.name, course, overwrite)
-        except AlreadyExists as e:
-            if not overwrite:
-                raise e
+        `render_markdown`, with this style's markdown extensions
+        """
+        return render_markdown(filename, self.markdown_extensions, self.markdown_extension_configs)
 
 
-        self.canvas_obj = assignment
+    def render_markdown_source(self, source_bytes):
+        """
+        `render_markdown_source`, with this style's markdown extensions
+        """
+        return render_markdown_source(source_bytes, self.markdown_extensions, self.markdown_extension_configs)
 
 
-        # now that we have the assignment, we'll update its content.
+    def apply(self, body):
+        """
+        wraps a document's body in this style's header and footer, returning an html string.
 
-        new_props=self._dict_of_props()
+        `body` is the document's rendered html, with its image paths already localized (see `localize_image_paths`), as a string or a parsed soup.  the header and footer aren't changed.
+        """
+        with profile_stage('apply style'):
+            if not isinstance(body, str):
+                body = _html_contents(body)
+            return f'{self.header_html}\n{self.header_md_html}\n{body}\n{self.footer_md_html}\n{self.footer_html}'
 
-        # for example,
-        # ass[0].edit(assignment={'lock_at':datetime.datetime(2021, 8, 17, 4, 59, 59),'due_at':datetime.datetime(2021, 8, 17, 4, 59, 59)})
-        # we construct the dict of values in the _dict_of_props() function.
 
-        assignment.edit(assignment=new_props)
 
-        self.ensure_in_modules(course)
 
-        return True
 
 
 
+# The html for a document goes through a pipeline of steps, all of which work on one parsed tree:
+#
+# 1. `render_markdown` turns markdown into an html string
+# 2. `parse_html` parses that, once
+# 3. `localize_image_paths` makes paths of local images relative to where we're running
+# 4. `find_local_images` collects the local images
+# 5. `adjust_html_for_images` swaps in the urls of the images on Canvas, after they're uploaded
+#
+# and the tree is turned back into a string (`prettify()`) only once, at the end.
+#
+# `find_local_images` and `adjust_html_for_images` also accept html strings, for backwards compatibility.
 
 
+markdown_extensions = ['codehilite','fenced_code','md_in_html','tables'] # used unless a style says otherwise.  see `Style`.
+markdown_extension_configs = {} # options for the extensions, by extension name, like {'codehilite': {'linenums': True}}
 
 
-class Image(CanvasObject):
-    """
-    A wrapper class for images on Canvas
+def render_markdown(filename, extensions=None, extension_configs=None):
     """
+    reads the markdown in `filename`, and returns it as an html string.  image paths are as in the source.
 
+    `extensions` and `extension_configs` default to `markdown_extensions` and `markdown_extension_configs`.
 
-    def __init__(self, filename, alttext = ''):
-        super(Image, self).__init__()
+    if a render cache is in use (see `use_render_cache`), and this exact source was rendered before, the cached html is returned instead.
+    """
+    with profile_stage('read source'):
+        with open(filename,'rb') as file:
+            source_bytes = file.read()
 
-        self.givenpath = filename
-        self.filename = filename
-        self.name = path.split(filename)[1]
-        self.folder = path.split(filename)[0]
-        self.alttext = alttext
+    return render_markdown_source(source_bytes, extensions, extension_configs)
 
 
-        # <p>
-        #     <img class="instructure_file_link inline_disabled" src="https://uws-td.instructure.com/courses/3099/files/219835/preview" alt="hauser_menagerie.jpg" data-api-endpoint="https://uws-td.instructure.com/api/v1/courses/3099/files/219835" data-api-returntype="File" />
-        # </p>
 
-    def publish(self, course, dest, overwrite=False, raise_if_already_uploaded = False):
-        """
+def render_markdown_source(source_bytes, extensions=None, extension_configs=None):
+    """
+    like `render_markdown`, but for markdown you already have, as utf-8 bytes.
+    """
+    if extensions is None:
+        extensions = markdown_extensions
+    if extension_configs is None:
+        extension_configs = markdown_extension_configs
+
+    cache = render_cache
+    if cache is not None:
+        with profile_stage('render cache'):
+            key = cache.key(source_bytes, extensions, extension_configs)
+            html = cache.get(key)
+        if html is not None:
+            return html
 
+    import emoji
 
-        see also https://canvas.instructure.com/doc/api/file.file_uploads.html
-        """
+    markdown_source = source_bytes.decode('utf-8')
 
-        if overwrite:
-            on_duplicate = 'overwrite'
-        else:
-            on_duplicate = 'rename'
+    with profile_stage('emojize'):
+        emojified = emoji.emojize(markdown_source)
 
+    with profile_stage('markdown'):
+        _highlighting.cache = highlight_cache
+        try:
+            html = markdown_renderer(extensions, extension_configs).convert(emojified)
+        finally:
+            _highlighting.cache = None
 
-        # this still needs to be adjusted to capture the Canvas image, in case it exists
-        if overwrite:
-            success_code, json_response = course.upload(self.givenpath, parent_folder_path=dest,on_duplicate=on_duplicate)
-            if not success_code:
-                print(f'failed to upload...  {self.givenpath}')
+    if cache is not None:
+        with profile_stage('render cache'):
+            cache.put(key, html)
 
+    return html
 
-            self.canvas_obj = course.get_file(json_response['id'])
-            return self.canvas_obj
 
-        else:
-            if is_file_already_uploaded(self.givenpath,course):
-                if raise_if_already_uploaded:
-                    raise AlreadyExists(f'image {self.name} already exists in course {course.name}, but you don\'t want to overwrite.')
-                else:
-                    img_on_canvas = find_file_in_course(self.givenpath,course)
-            else:
-                # get the remote image
-                print(f'file not already uploaded, uploading {self.name}')
 
-                success_code, json_response = course.upload(self.givenpath, parent_folder_path=dest,on_duplicate=on_duplicate)
-                img_on_canvas = course.get_file(json_response['id'])
-                if not success_code:
-                    print(f'failed to upload...  {self.givenpath}')
 
+def markdown_renderer(extensions=None, extension_configs=None):
+    """
+    a `markdown.Markdown` with `extensions`, ready to `convert` one document.
 
-            self.canvas_obj = img_on_canvas
+    making one loads all its extensions, so each thread keeps the one it made for each set of extensions, and it's `reset` before being handed out again.  so don't share it with other threads, or hang on to it after converting.
 
-            return img_on_canvas
+    `extensions` and `extension_configs` default to `markdown_extensions` and `markdown_extension_configs`.
+    """
+    import json
 
-    def make_src_url(self,courseid):
-        """
-        constructs a string which can be used to embed the image in a Canvas page.
+    if extensions is None:
+        extensions = markdown_extensions
+    if extension_configs is None:
+        extension_configs = markdown_extension_configs
 
-        sadly, the JSON back from Canvas doesn't just produce this for us.  lame.
+    key = (tuple(extensions), json.dumps(extension_configs, sort_keys=True, default=repr))
 
-        """
-        import canvasapi
-        im = self.canvas_obj
-        assert(isinstance(self.canvas_obj, canvasapi.file.File))
+    renderers = getattr(_markdown_renderers, 'by_key', None)
+    if renderers is None:
+        renderers = _markdown_renderers.by_key = {}
 
-        n = im.url.find('/files')
+    md = renderers.get(key)
+    if md is None:
+        import markdown
+        md = renderers[key] = markdown.Markdown(extensions=list(extensions), extension_configs=extension_configs)
 
-        url = im.url[:n]+'/courses/'+str(courseid)+'/files/'+str(im.id)+'/preview'
+    return md.reset()
 
-        return url
+_markdown_renderers = threading.local()
 
-    def make_api_endpoint_url(self,courseid):
-        import canvasapi
-        im = self.canvas_obj
-        assert(isinstance(self.canvas_obj, canvasapi.file.File))
 
-        n = im.url.find('/files')
 
-        url = im.url[:n] + '/api/v1/courses/' + str(courseid) + '/files/' + str(im.id)
-        return url
-        # data-api-endpoint="https://uws-td.instructure.com/api/v1/courses/3099/files/219835"
 
+highlight_cache = None # the `RenderCache` holding highlighted code blocks, if any.  see `use_highlight_cache`.
 
-    def __str__(self):
-        result = "\n"
-        result = result + f'givenpath: {self.givenpath}\n'
-        result = result + f'name: {self.name}\n'
-        result = result + f'folder: {self.folder}\n'
-        result = result + f'alttext: {self.alttext}\n'
-        result = result + f'canvas_obj: {self.canvas_obj}\n'
-        url = self.make_src_url('fakecoursenumber')
-        result = result + f'constructed canvas url: {url}\n'
 
-        return result+'\n'
+def use_highlight_cache(directory=None, max_bytes=64*2**20):
+    """
+    turns on the on-disk cache of highlighted code blocks, so that a code block which was highlighted before (in any document, in this run or a previous one) isn't run through Pygments again.
 
-    def __repr__(self):
-        return str(self)
+    directory -- where to keep the cache.  defaults to the `highlight` folder in `default_cache_dir()`
+    max_bytes -- when the cache gets bigger than this, the least recently used entries are thrown out
 
+    pass `directory=False` to turn the cache back off.  returns the cache.
 
+    blocks are keyed by their code, language, the highlighting options, and the versions of Markdown and Pygments.  this works by putting a caching `CodeHilite` in the `codehilite` and `fenced_code` extensions while the cache is on.  it only uses the cache for markdown rendered by this library, and behaves just like the original for anything else using Markdown.
+    """
+    global highlight_cache
 
+    if directory is False:
+        highlight_cache = None
+        _uninstall_cached_code_hilite()
+    else:
+        highlight_cache = RenderCache(directory or path.join(default_cache_dir(),'highlight'), max_bytes)
+        _install_cached_code_hilite()
 
+    return highlight_cache
 
 
 
-class Link(CanvasObject):
+def _install_cached_code_hilite():
     """
-    a containerization of url's, for uploading to Canvas modules
+    puts `CachedCodeHilite`, a `CodeHilite` which uses `highlight_cache` while `render_markdown_source` is converting, where the markdown extensions look for `CodeHilite`.  `_uninstall_cached_code_hilite` puts the original back.
     """
-    def __init__(self, folder):
-        super(Link, self).__init__()
-        self.folder = folder
+    global _cached_code_hilite
 
-        import json, os
-        from os.path import join
+    import markdown.extensions.codehilite as codehilite
+    import markdown.extensions.fenced_code as fenced_code
 
-        self.metaname = path.join(folder,'meta.json')
-        with open(path.join(folder,'meta.json'),'r') as f:
-            self.metadata = json.load(f)
-    
-    def __str__(self):
-        result = f"Link({self.metadata['external_url']})"
-        return result
+    if _cached_code_hilite is not None:
+        codehilite.CodeHilite = fenced_code.CodeHilite = _cached_code_hilite
+        return
 
-    def __repr__(self):
-        return str(self)
+    class CachedCodeHilite(codehilite.CodeHilite):
 
+        def hilite(self, shebang=True):
+            cache = getattr(_highlighting, 'cache', None)
+            if cache is None:
+                return super(CachedCodeHilite, self).hilite(shebang)
 
-    def publish(self, course, overwrite=False):
+            key = self._cache_key(shebang)
+            html = cache.get(key)
+            if html is None:
+                with profile_stage('highlight'):
+                    html = super(CachedCodeHilite, self).hilite(shebang)
+                cache.put(key, html)
+            return html
 
-        for m in self.metadata['modules']:
-            if link_on_canvas:= self.is_in_module(course, m):
-                if not overwrite:
-                    n = self.metadata['external_url']
-                    raise AlreadyExists(f'trying to upload {self}, but is already on Canvas')
-                else:
-                    link_on_canvas.edit(module_item={'external_url':self.metadata['external_url'],'title':self.metadata['name'], 'new_tab':bool(self.metadata['new_tab'])})
+        def _cache_key(self, shebang):
+            import hashlib, json
 
-            else:
-                mod = get_module(m, course)
-                mod.create_module_item(module_item={'type':'ExternalUrl','external_url':self.metadata['external_url'],'title':self.metadata['name'], 'new_tab':bool(self.metadata['new_tab'])})
+            formatter = self.pygments_formatter if isinstance(self.pygments_formatter, str) else f'{self.pygments_formatter.__module__}.{self.pygments_formatter.__qualname__}'
+            described = [self.src, self.lang, shebang, self.guess_lang, self.use_pygments, self.lang_prefix, formatter, self.options, _library_versions()]
+            return hashlib.sha256(json.dumps(described, sort_keys=True, default=repr).encode('utf-8')).hexdigest()
 
+    codehilite.CodeHilite = CachedCodeHilite
+    fenced_code.CodeHilite = CachedCodeHilite
+    _cached_code_hilite = CachedCodeHilite
 
-    def is_already_uploaded(self, course):
-        for m in self.metadata['modules']:
-            if not self.is_in_module(course, m):
-                return False
 
-        return True
 
+def _uninstall_cached_code_hilite():
+    if _cached_code_hilite is None:
+        return
 
+    import markdown.extensions.codehilite as codehilite
+    import markdown.extensions.fenced_code as fenced_code
 
-    def is_in_module(self, course, module_name):
-        module = get_module(module_name,course)
+    original = _cached_code_hilite.__bases__[0]
+    codehilite.CodeHilite = fenced_code.CodeHilite = original
 
-        for item in module.get_module_items():
+_cached_code_hilite = None
+_highlighting = threading.local() # `cache` is the highlight cache to use, while this library is rendering markdown in this thread
 
-            if item.type=='ExternalUrl' and item.external_url==self.metadata['external_url']:
-                return item
-            else:   
-                continue
 
-        return None
 
-    
 
+render_cache = None # the `RenderCache` used by `render_markdown`, if any.  see `use_render_cache`.
 
-class File(CanvasObject):
+
+def default_cache_dir():
     """
-    a containerization of arbitrary files, for uploading to Canvas
+    where markdown2canvas keeps its caches, unless told otherwise: `$XDG_CACHE_HOME/markdown2canvas`, or `~/.cache/markdown2canvas`.
     """
-    def __init__(self, folder):
-        super(File, self).__init__(folder)
+    from os import environ
 
-        import json, os
-        from os.path import join
+    base = environ.get('XDG_CACHE_HOME') or path.join(path.expanduser('~'), '.cache')
+    return path.join(base, 'markdown2canvas')
 
-        self.folder = folder
-        
-        self.metaname = path.join(folder,'meta.json')
-        with open(path.join(folder,'meta.json'),'r') as f:
-            self.metadata = json.load(f)
 
+def use_render_cache(directory=None, max_bytes=256*2**20):
+    """
+    turns on the on-disk render cache, so that markdown which was rendered before (in this run or a previous one) isn't rendered again.
 
-    
-    def __str__(self):
-        result = f"File({self.metadata})"
-        return result
+    directory -- where to keep the cache.  defaults to the `render` folder in `default_cache_dir()`
+    max_bytes -- when the cache gets bigger than this, the least recently used entries are thrown out
 
-    def __repr__(self):
-        return str(self)
+    pass `directory=False` to turn the cache back off.  returns the cache.
+    """
+    global render_cache
 
+    if directory is False:
+        render_cache = None
+    else:
+        render_cache = RenderCache(directory or path.join(default_cache_dir(),'render'), max_bytes)
 
-    def _upload_(self, course):
-        pass
+    return render_cache
 
-    def publish(self, course, overwrite=False):
-        
 
-        if file_on_canvas:= self.is_already_uploaded(course):
-            if not overwrite:
-                n = self.metadata['filename']
-                raise AlreadyExists(f'trying to upload file {n}, but is already on Canvas')
 
-            content_id = file_on_canvas.id
+def _library_versions():
+    """
+    the versions of the libraries which rendering depends on, as a string.  part of the render cache key.
+    """
+    global _library_versions_string
 
-        else:
-            root = get_root_folder(course)
+    if _library_versions_string is None:
+        from importlib import metadata
 
-            d = self.metadata['destination']
-            d = d.split('/')
+        versions = []
+        for lib in ['Markdown','emoji','Pygments']:
+            try:
+                versions.append(f'{lib}=={metadata.version(lib)}')
+            except metadata.PackageNotFoundError:
+                versions.append(f'{lib}==?')
 
-            curr_dir = root
-            for subd in d:
-                try:
-                    curr_dir = get_subfolder_named(curr_dir, subd)
-                except DoesntExist as e:
-                    curr_dir = curr_dir.create_folder(subd)
-            
-            filepath_to_upload = path.join(self.folder,self.metadata['filename'])
-            reply = curr_dir.upload(file=filepath_to_upload)
-            
-            if not reply[0]:
-                raise RuntimeError(f'something went wrong uploading {filepath_to_upload}')
+        _library_versions_string = ','.join(versions)
 
-            file_on_canvas = reply[1]
-            content_id = file_on_canvas['id']
+    return _library_versions_string
+
+_library_versions_string = None
+
+
+
+class RenderCache(object):
+    """
+    A content-addressed cache of rendered html, kept as files on disk.
+
+    Entries are keyed by the bytes of the markdown source, the list of markdown extensions and their options, and the versions of the rendering libraries, so they never go stale -- a change to any of those is just a different key.  A style is part of the key through its header and footer, which are part of the source.
+
+    When the cache is bigger than `max_bytes`, the least recently used entries are deleted.
+
+    directory -- where to keep the cache
+    max_bytes -- size limit of the cache, in bytes
+    """
+
+    def __init__(self, directory, max_bytes=256*2**20):
+        super(RenderCache, self).__init__()
+
+        import os, threading
+
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+        os.makedirs(self.directory, exist_ok=True)
+
+        self._size = sum(size for _, _, size in self._entries())
+
+
+    def key(self, source_bytes, extensions, extension_configs=None):
+        import hashlib, json
+
+        h = hashlib.sha256()
+        h.update(source_bytes)
+        h.update(b'\0')
+        h.update(repr(list(extensions)).encode('utf-8'))
+        h.update(b'\0')
+        if extension_configs:
+            h.update(json.dumps(extension_configs, sort_keys=True, default=repr).encode('utf-8'))
+            h.update(b'\0')
+        h.update(_library_versions().encode('utf-8'))
+        return h.hexdigest()
+
+
+    def _filename(self, key):
+        return path.join(self.directory, key[:2], key + '.html')
+
+
+    def _entries(self):
+        """
+        yields (filename, last used time, size) for every entry in the cache
+        """
+        import os
+
+        for sub in os.scandir(self.directory):
+            if not sub.is_dir():
+                continue
+            for entry in os.scandir(sub.path):
+                if entry.name.endswith('.html'):
+                    st = entry.stat()
+                    yield entry.path, st.st_mtime, st.st_size
+
+
+    def get(self, key):
+        """
+        returns the cached html for `key`, or None.  a hit counts as a use, for eviction.
+        """
+        import os
+
+        filename = self._filename(key)
+        try:
+            with open(filename,'r',encoding='utf-8') as f:
+                html = f.read()
+            os.utime(filename)
+        except FileNotFoundError:
+            return None
+
+        return html
+
+
+    def put(self, key, html):
+        import os
+
+        filename = self._filename(key)
+        os.makedirs(path.dirname(filename), exist_ok=True)
+
+        write_atomically(filename, html)
+
+        with self._lock:
+            self._size += path.getsize(filename)
+            if self._size > self.max_bytes:
+                self._evict()
+
+
+    def _evict(self):
+        """
+        deletes least recently used entries, until the cache is down to 3/4 of its size limit.
+        """
+        import os
+
+        entries = sorted(self._entries(), key=lambda e: e[1])
+
+        self._size = sum(size for _, _, size in entries)
+        for filename, _, size in entries:
+            if self._size <= self.max_bytes*3//4:
+                break
+            try:
+                os.remove(filename)
+            except FileNotFoundError:
+                pass
+            self._size -= size
+
+
+    def clear(self):
+        import os
+
+        with self._lock:
+            for filename, _, _ in list(self._entries()):
+                os.remove(filename)
+            self._size = 0
+
+
+
+
+################## profiling rendering
+
+
+render_profiler = None # the `RenderProfiler` timing the stages of rendering, if any.  see `use_render_profiler`.
+
+
+def use_render_profiler(on=True, memory=False):
+    """
+    starts timing each stage of rendering (reading, emojizing, markdown, styling, parsing, prettifying, ...) for each container, in a `RenderProfiler`, and returns it.
+
+    with `memory=True`, the peak memory use of each stage is measured too, with `tracemalloc`.  that slows rendering down a lot, and the peaks only make sense when rendering one thing at a time.
+
+    call `use_render_profiler(False)` to stop.  `tracemalloc` is only stopped again if the profiler started it.
+    """
+    import tracemalloc
+
+    global render_profiler
+
+    if render_profiler is not None and render_profiler.started_tracing:
+        tracemalloc.stop()
+
+    render_profiler = RenderProfiler(memory) if on else None
+
+    if on and memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        render_profiler.started_tracing = True
+
+    return render_profiler
+
+
+
+def profile_stage(stage, container=None):
+    """
+    a context manager which times what's in it as `stage` of rendering, if a `RenderProfiler` is in use.  stages inside other stages are timed as part of them.
+
+    `container` is the folder of the container being rendered.  by default, it's the one of the stage this is inside, or of the container being published.
+    """
+    if render_profiler is None:
+        return _not_profiling
+    return _ProfiledStage(render_profiler, stage, container)
+
+
+
+class _NotProfiling(object):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_not_profiling = _NotProfiling()
+
+
+
+class _ProfiledStage(object):
+
+    def __init__(self, profiler, stage, container):
+        self.profiler = profiler
+        self.stage = stage
+        self.container = container
+
+    def __enter__(self):
+        import time, tracemalloc
+
+        stack = self.profiler._stack()
+        outer = stack[-1] if stack else None
+        if outer is not None:
+            self.container = outer.container
+            self.path = outer.path + (self.stage,)
+        else:
+            self.container = self.container or current_container.get() or ''
+            self.path = (self.stage,)
+        stack.append(self)
+
+        self.peak = 0
+        if self.profiler.memory:
+            self.memory_before, peak_so_far = tracemalloc.get_traced_memory()
+            # the outer stage's peak so far would be lost by resetting it
+            if outer is not None:
+                outer.peak = max(outer.peak, peak_so_far)
+            tracemalloc.reset_peak()
+
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        import time, tracemalloc
+
+        seconds = time.perf_counter() - self.started
+
+        stack = self.profiler._stack()
+        stack.pop()
+
+        peak = None
+        if self.profiler.memory:
+            # the peak of a stage is the biggest of its own and its inner stages'.  each stage resets tracemalloc's peak, so they're passed up.
+            self.peak = max(self.peak, tracemalloc.get_traced_memory()[1])
+            peak = self.peak - self.memory_before
+            if stack:
+                stack[-1].peak = max(stack[-1].peak, self.peak)
+
+        self.profiler.record(self.container, self.path, seconds, peak)
+        return False
+
+
+
+class RenderProfiler(object):
+    """
+    Time (and, optionally, peak memory) spent in each stage of rendering, for each container.  `use_render_profiler` makes one and turns it on.
+
+    Stages are nested, like 'render;markdown'.  `report()` sums things up by stage and by container, `to_json()` writes that down, and `to_folded()` writes the times in the "folded stacks" format that flamegraph.pl, speedscope and friends read.
+
+    Can be shared between threads.
+    """
+
+    def __init__(self, memory=False):
+        super(RenderProfiler, self).__init__()
+
+        self.memory = memory
+        self.started_tracing = False # whether `use_render_profiler` started tracemalloc for this
+        self.totals = {} # (container, stage path) to [calls, seconds, peak bytes or None]
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+
+    def _stack(self):
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+
+    def record(self, container, stages, seconds, peak=None):
+        with self._lock:
+            entry = self.totals.setdefault((container, stages), [0, 0.0, None])
+            entry[0] += 1
+            entry[1] += seconds
+            if peak is not None:
+                entry[2] = max(entry[2] or 0, peak)
+
+
+    def clear(self):
+        with self._lock:
+            self.totals = {}
+
+
+    def report(self):
+        """
+        the times summed up, as a dict:
+
+        - `stages` -- for each stage (like 'render;markdown'), over all containers: `calls`, `seconds`, and `peak_bytes` if measuring memory
+        - `containers` -- for each container, the seconds spent in each stage, and in total in its outermost stages
+        """
+        with self._lock:
+            totals = dict(self.totals)
+
+        stages = {}
+        containers = {}
+        for (container, path_), (calls, seconds, peak) in totals.items():
+            name = ';'.join(path_)
+
+            stage = stages.setdefault(name, {'calls': 0, 'seconds': 0.0})
+            stage['calls'] += calls
+            stage['seconds'] += seconds
+            if peak is not None:
+                stage['peak_bytes'] = max(stage.get('peak_bytes', 0), peak)
+
+            c = containers.setdefault(container, {'seconds': 0.0, 'stages': {}})
+            c['stages'][name] = c['stages'].get(name, 0.0) + seconds
+            if len(path_) == 1:
+                c['seconds'] += seconds
+
+        return {'stages': stages, 'containers': containers}
+
+
+    def to_json(self, filename=None):
+        """
+        the `report()` as json.  if `filename` is given, it's written there too.
+        """
+        import json
+
+        text = json.dumps(self.report(), indent=1, sort_keys=True)
+        if filename is not None:
+            write_atomically(filename, text)
+        return text
+
+
+    def to_folded(self, filename=None):
+        """
+        the times as folded stacks, one line like `container;render;markdown 1234` per stage, with the microseconds spent in the stage itself, not its inner stages.  if `filename` is given, it's written there too.
+        """
+        with self._lock:
+            totals = {(container,) + path_: seconds for (container, path_), (_, seconds, _) in self.totals.items()}
+
+        own = dict(totals)
+        for stack, seconds in totals.items():
+            if len(stack) > 2:
+                own[stack[:-1]] -= seconds
+
+        lines = [f'{";".join(part.replace(";", ",") or "-" for part in stack)} {max(0, round(seconds*1e6))}' for stack, seconds in sorted(own.items())]
+        text = '\n'.join(lines) + '\n'
+
+        if filename is not None:
+            write_atomically(filename, text)
+        return text
+
+
+
+def parse_html(html):
+    from bs4 import BeautifulSoup
+
+    return BeautifulSoup(html,features="lxml")
+
+
+
+def _html_contents(soup):
+    """
+    the html in `soup`, without the `<html>`, `<head>` and `<body>` tags the parser wrapped it in
+    """
+    if soup.html is None:
+        return soup.decode()
+    return ''.join(child.decode_contents() if child.name in ('head','body') else str(child) for child in soup.html.contents)
+
+
+
+def localize_image_paths(soup, root):
+    """
+    prepends `root`, the folder the markdown came from, to the paths of local images in `soup`.
+    """
+    for img in soup.find_all("img"):
+        src = img["src"]
+        if ('http://' not in src) and ('https://' not in src):
+            img["src"] = path.join(root,src)
+
+
+
+def markdown2html(filename):
+
+    root = path.split(filename)[0]
+
+    with profile_stage('render', root):
+        html = render_markdown(filename)
+
+        with profile_stage('parse html'):
+            soup = parse_html(html)
+
+        with profile_stage('localize images'):
+            localize_image_paths(soup, root)
+
+        with profile_stage('prettify'):
+            return soup.prettify()
+
+
+
+
+
+def find_local_images(html):
+    """
+    returns a dict from src to `Image`, of the images in `html` which aren't on the internet.
+
+    `html` can be an html string, or an already-parsed soup.
+    """
+    soup = parse_html(html) if isinstance(html, str) else html
+
+    local_images = {}
+
+    all_imgs = soup.find_all("img")
+
+    if all_imgs:
+        for img in all_imgs:
+            src = img["src"]
+            if src[:7] not in ['https:/','http://']:
+                local_images[src] = Image(path.abspath(src))
+
+    return local_images
+
+
+
+
+def adjust_html_for_images(html, published_images, courseid):
+    """
+    this function edits the html source, replacing local url's
+    with url's to images on Canvas.
+
+    `html` can be an html string, in which case the adjusted html string is returned, or an already-parsed soup, which is edited in place and returned.
+    """
+    soup = parse_html(html) if isinstance(html, str) else html
+
+    all_imgs = soup.find_all("img")
+    if all_imgs:
+        for img in all_imgs:
+            src = img["src"]
+            if src[:7] not in ['https:/','http://']:
+                # find the image in the list of published images, replace url, do more stuff.
+                local_img = published_images[src]
+                img['src'] = local_img.make_src_url(courseid)
+                img['class'] = "instructure_file_link inline_disabled"
+                img['data-api-endpoint'] = local_img.make_api_endpoint_url(courseid)
+                img['data-api-returntype'] = 'File'
+
+    if isinstance(html, str):
+        return soup.prettify()
+    else:
+        return soup
+
+    # <p>
+    #     <img class="instructure_file_link inline_disabled" src="https://uws-td.instructure.com/courses/3099/files/219835/preview" alt="hauser_menagerie.jpg" data-api-endpoint="https://uws-td.instructure.com/api/v1/courses/3099/files/219835" data-api-returntype="File" />
+    # </p>
+
+
+
+
+
+def get_root_folder(course, index=None):
+    if index is not None:
+        return index.get_folder('course files')
+
+    for f in course.get_folders():
+        if f.full_name == 'course files':
+            return f
+
+
+
+
+
+
+
+class AlreadyExists(Exception):
+
+    def __init__(self, message, errors=""):
+        # Call the base class constructor with the parameters it needs
+        super().__init__(message)
+
+        self.errors = errors
+
+class SetupError(Exception):
+
+    def __init__(self, message, errors=""):            
+        # Call the base class constructor with the parameters it needs
+        super().__init__(message)
+            
+        self.errors = errors
+
+
+
+
+class ImageUploadError(Exception):
+    """
+    Used when some of the images in a document fail to upload.  `errors` is a dict, from the image's src to the exception uploading it raised.
+    """
+
+    def __init__(self, message, errors=""):
+        # Call the base class constructor with the parameters it needs
+        super().__init__(message)
+
+        self.errors = errors
+
+
+
+
+class DoesntExist(Exception):
+    """
+    Used when getting a thing, but it doesn't exist
+    """
+
+    def __init__(self, message, errors=""):            
+        # Call the base class constructor with the parameters it needs
+        super().__init__(message)
+            
+        self.errors = errors
+
+
+
+
+
+image_upload_workers = 4 # how many images of a document to upload at once.  see `Document.publish_images_and_adjust_html`.
+
+listing_page_size = 100 # items per request when listing things from Canvas.  Canvas caps most listings at 100.
+
+
+def _synchronized(method):
+    """
+    makes a method hold `self._lock` while it runs
+    """
+    import functools
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+
+    return wrapper
+
+
+
+class CourseIndex(object):
+    """
+    A local index of the pages, assignments, files, folders and modules in a course on Canvas.
+
+    Each listing is fetched from Canvas once, the first time it's needed, using a large page size.  After that, lookups are dict lookups.  The functions in this library which create, edit or delete things keep the index up to date when you pass it to them as `index`, so one index can be shared across a whole publish.
+
+    If something is changed on Canvas behind the index's back, call `refresh()`.
+
+    An index can be shared between threads.
+
+    course -- a canvasapi Course
+    """
+
+    def __init__(self, course):
+        super(CourseIndex, self).__init__()
+
+        import threading
+
+        self.course = course
+        self._lock = threading.RLock()
+
+        self.refresh()
+
+
+    @_synchronized
+    def refresh(self):
+        """
+        forgets everything, so that the listings are fetched again on next use.
+        """
+
+        self._pages_by_title = None
+        self._pages_by_url = None
+        self._page_keys = None # page id to the (title, url) it's indexed under.  editing a page changes the object itself, so they're kept here.
+
+        self._assignments_by_name = None
+        self._assignments_by_id = None
+        self._assignment_names = None # assignment id to the name it's indexed under
+
+        self._files_by_id = None
+        self._files_by_name_and_size = None
+        self._files_by_name = None
+
+        self._folders_by_path = None
+        self._folders_by_id = None
+
+        self._modules_by_name = None
+        self._modules_by_id = None
+        self._module_items = {} # module id to {key: item}.  see `module_item_key`.
+
+
+
+    ###### pages
+
+    @_synchronized
+    def _load_pages(self):
+        if self._pages_by_url is not None:
+            return
+
+        logger.info(f'listing pages of course {self.course.id}')
+
+        self._pages_by_title = {}
+        self._pages_by_url = {}
+        self._page_keys = {}
+        for p in self.course.get_pages(per_page=listing_page_size):
+            self._pages_by_title.setdefault(p.title, p)
+            self._pages_by_url[p.url] = p
+            self._page_keys[p.page_id] = (p.title, p.url)
+
+    @_synchronized
+    def find_page(self, title):
+        """
+        returns the page titled `title`, or None
+        """
+        self._load_pages()
+        return self._pages_by_title.get(title)
+
+    @_synchronized
+    def add_page(self, page):
+        """
+        adds or updates `page` in the index.  call after creating or editing a page.
+        """
+        self._load_pages()
+
+        # it might have been renamed since it was indexed
+        self._forget_page(page.page_id)
+
+        self._pages_by_title[page.title] = page
+        self._pages_by_url[page.url] = page
+        self._page_keys[page.page_id] = (page.title, page.url)
+
+    @_synchronized
+    def remove_page(self, page):
+        self._load_pages()
+        self._forget_page(page.page_id)
+
+    def _forget_page(self, page_id):
+        title, url = self._page_keys.pop(page_id, (None, None))
+
+        if url in self._pages_by_url and self._pages_by_url[url].page_id == page_id:
+            del self._pages_by_url[url]
+        if title in self._pages_by_title and self._pages_by_title[title].page_id == page_id:
+            del self._pages_by_title[title]
+
+
+
+    ###### assignments
+
+    @_synchronized
+    def _load_assignments(self):
+        if self._assignments_by_id is not None:
+            return
+
+        logger.info(f'listing assignments of course {self.course.id}')
+
+        self._assignments_by_name = {}
+        self._assignments_by_id = {}
+        self._assignment_names = {}
+        for a in self.course.get_assignments(per_page=listing_page_size):
+            self._assignments_by_name.setdefault(a.name, a)
+            self._assignments_by_id[a.id] = a
+            self._assignment_names[a.id] = a.name
+
+    @_synchronized
+    def find_assignment(self, name):
+        """
+        returns the assignment named `name`, or None
+        """
+        self._load_assignments()
+        return self._assignments_by_name.get(name)
+
+    @_synchronized
+    def get_assignment_by_id(self, assignment_id):
+        self._load_assignments()
+        return self._assignments_by_id.get(assignment_id)
+
+    @_synchronized
+    def add_assignment(self, assignment):
+        """
+        adds or updates `assignment` in the index.  call after creating or editing an assignment.
+        """
+        self._load_assignments()
+
+        # it might have been renamed since it was indexed
+        self._forget_assignment(assignment.id)
+
+        self._assignments_by_name[assignment.name] = assignment
+        self._assignments_by_id[assignment.id] = assignment
+        self._assignment_names[assignment.id] = assignment.name
+
+    @_synchronized
+    def remove_assignment(self, assignment):
+        self._load_assignments()
+        self._forget_assignment(assignment.id)
+
+    def _forget_assignment(self, assignment_id):
+        name = self._assignment_names.pop(assignment_id, None)
+
+        self._assignments_by_id.pop(assignment_id, None)
+        if name in self._assignments_by_name and self._assignments_by_name[name].id == assignment_id:
+            del self._assignments_by_name[name]
+
+
+
+    ###### files
+
+    @_synchronized
+    def _load_files(self):
+        if self._files_by_id is not None:
+            return
+
+        logger.info(f'listing files of course {self.course.id}')
+
+        self._files_by_id = {}
+        self._files_by_name_and_size = {}
+        self._files_by_name = {}
+        for f in self.course.get_files(per_page=listing_page_size):
+            self._insert_file(f)
+
+    def _insert_file(self, f):
+        self._files_by_id[f.id] = f
+        self._files_by_name_and_size.setdefault((f.filename, f.size), f)
+        self._files_by_name.setdefault(f.filename, []).append(f)
+
+    @_synchronized
+    def find_file(self, filename, size):
+        """
+        returns a file with base name `filename` and `size` bytes, or None
+        """
+        self._load_files()
+        return self._files_by_name_and_size.get((filename, size))
+
+    @_synchronized
+    def files_named(self, filename):
+        """
+        returns a list of all files with base name `filename`
+        """
+        self._load_files()
+        return list(self._files_by_name.get(filename, []))
+
+    @_synchronized
+    def get_file_by_id(self, file_id):
+        self._load_files()
+        return self._files_by_id.get(file_id)
+
+    @_synchronized
+    def add_file(self, f):
+        """
+        adds `f` to the index.  call after uploading a file.
+        """
+        self._load_files()
+
+        if f.id in self._files_by_id:
+            self.remove_file(self._files_by_id[f.id])
+
+        self._insert_file(f)
+
+    @_synchronized
+    def remove_file(self, f):
+        self._load_files()
+
+        self._files_by_id.pop(f.id, None)
+
+        same_name = [g for g in self._files_by_name.get(f.filename, []) if g.id != f.id]
+        if same_name:
+            self._files_by_name[f.filename] = same_name
+        else:
+            self._files_by_name.pop(f.filename, None)
+
+        key = (f.filename, f.size)
+        if key in self._files_by_name_and_size and self._files_by_name_and_size[key].id == f.id:
+            del self._files_by_name_and_size[key]
+            for g in same_name:
+                if g.size == f.size:
+                    self._files_by_name_and_size[key] = g
+                    break
+
+
+
+    ###### folders
+
+    @_synchronized
+    def _load_folders(self):
+        if self._folders_by_id is not None:
+            return
+
+        logger.info(f'listing folders of course {self.course.id}')
+
+        self._folders_by_path = {}
+        self._folders_by_id = {}
+        for f in self.course.get_folders(per_page=listing_page_size):
+            self.add_folder(f)
+
+    @_synchronized
+    def get_folder(self, full_name):
+        """
+        returns the folder with full path `full_name`, like 'course files/images', or None
+        """
+        self._load_folders()
+        return self._folders_by_path.get(full_name)
+
+    @_synchronized
+    def get_folder_by_id(self, folder_id):
+        self._load_folders()
+        return self._folders_by_id.get(folder_id)
+
+    @_synchronized
+    def add_folder(self, folder):
+        """
+        adds `folder` to the index.  call after creating a folder.
+        """
+        self._load_folders()
+
+        self._folders_by_path[folder.full_name] = folder
+        self._folders_by_id[folder.id] = folder
+
+
+
+    ###### modules
+
+    @_synchronized
+    def _load_modules(self):
+        if self._modules_by_id is not None:
+            return
+
+        logger.info(f'listing modules of course {self.course.id}')
+
+        self._modules_by_name = {}
+        self._modules_by_id = {}
+        for m in self.course.get_modules(per_page=listing_page_size):
+            self._modules_by_name.setdefault(m.name, m)
+            self._modules_by_id[m.id] = m
+
+    @_synchronized
+    def find_module(self, name):
+        """
+        returns the module named `name`, or None
+        """
+        self._load_modules()
+        return self._modules_by_name.get(name)
+
+    @_synchronized
+    def add_module(self, module):
+        """
+        adds `module` to the index.  call after creating a module.
+        """
+        self._load_modules()
+        self._modules_by_name.setdefault(module.name, module)
+        self._modules_by_id[module.id] = module
+
+    @_synchronized
+    def remove_module(self, module):
+        self._load_modules()
+
+        self._modules_by_id.pop(module.id, None)
+        if self._modules_by_name.get(module.name) is not None and self._modules_by_name[module.name].id == module.id:
+            del self._modules_by_name[module.name]
+
+            # there might be another module with the same name
+            for m in self._modules_by_id.values():
+                if m.name == module.name:
+                    self._modules_by_name[m.name] = m
+                    break
+
+        self._module_items.pop(module.id, None)
+
+
+
+    ###### module items
+
+    @_synchronized
+    def _load_module_items(self, module):
+        if module.id in self._module_items:
+            return self._module_items[module.id]
+
+        logger.info(f'listing items of module {module.name}')
+
+        items = {}
+        for item in module.get_module_items(per_page=listing_page_size):
+            items.setdefault(module_item_key_of(item), item)
+
+        self._module_items[module.id] = items
+        return items
+
+    @_synchronized
+    def find_module_item(self, module, key):
+        """
+        returns the item in `module` with key `key`, or None.  see `module_item_key`.  the items of each module are listed once, when first needed.
+        """
+        return self._load_module_items(module).get(key)
+
+    @_synchronized
+    def add_module_item(self, module, item):
+        """
+        adds `item` to the index.  call after adding an item to `module`.
+        """
+        self._load_module_items(module).setdefault(module_item_key_of(item), item)
+
+    @_synchronized
+    def remove_module_item(self, module, item):
+        items = self._load_module_items(module)
+        key = module_item_key_of(item)
+        if key in items and items[key].id == item.id:
+            del items[key]
+
+
+
+
+
+def write_atomically(filename, contents):
+    """
+    writes the string (or bytes) `contents` to `filename`, so that readers (and other threads writing the same file) only ever see a complete file.
+    """
+    import os, tempfile
+
+    fd, tmpname = tempfile.mkstemp(dir=path.dirname(path.abspath(filename)), prefix=path.basename(filename), suffix='.tmp')
+    try:
+        with (os.fdopen(fd,'wb') if isinstance(contents, bytes) else os.fdopen(fd,'w',encoding='utf-8')) as f:
+            f.write(contents)
+        os.replace(tmpname, filename)
+    except:
+        os.remove(tmpname)
+        raise
+
+
+
+
+manifest_dirname = '.markdown2canvas'
+
+
+def hash_files(filenames, root='.'):
+    """
+    computes a sha256 hex digest of the contents of `filenames`, together with their names relative to `root`.
+
+    files that don't exist contribute their name only, so that a file appearing or disappearing changes the hash.
+    """
+    import hashlib
+
+    h = hashlib.sha256()
+    for filename in filenames:
+        h.update(path.relpath(path.abspath(filename), path.abspath(root)).replace('\\','/').encode('utf-8'))
+        h.update(b'\0')
+        if path.exists(filename):
+            _update_from_file(h, filename)
+        h.update(b'\0')
+
+    return h.hexdigest()
+
+
+
+def _update_from_file(h, filename):
+    """
+    feeds the contents of `filename` to `h`, a hashlib hash, a chunk at a time.  returns `h`.
+    """
+    with open(filename,'rb') as f:
+        for chunk in iter(lambda: f.read(1<<20), b''):
+            h.update(chunk)
+    return h
+
+
+
+class _CourseRecord(object):
+    """
+    One course's section of a json file in `root/.markdown2canvas`, which holds a section per course.  `Manifest`, `AssetRegistry` and `SyncState` are these.
+
+    The section is `entries`.  Change it, set `_dirty`, and `save()` writes it back.
+
+    root -- the folder holding the `.markdown2canvas` folder
+    course -- a canvasapi Course, or a course id
+    name -- the name of the json file
+    """
+
+    def __init__(self, root, course, name):
+        super(_CourseRecord, self).__init__()
+
+        self.root = path.abspath(root)
+        self.course_id = str(getattr(course, 'id', course))
+        self.filename = path.join(self.root, manifest_dirname, name)
+
+        self._lock = threading.Lock()
+
+        self.entries = self._read().get(self.course_id, {})
+        self._dirty = False
+
+
+    def _read(self):
+        import json
+
+        if not path.exists(self.filename):
+            return {}
+
+        with open(self.filename,'r',encoding='utf-8') as f:
+            return json.load(f)
+
+
+    def save(self):
+        """
+        writes this course's section to disk, if anything changed.  other courses' sections of the file are kept.
+        """
+        import json, os
+
+        with self._lock:
+            if not self._dirty:
+                return
+
+            everything = self._read()
+            everything[self.course_id] = self.entries
+
+            os.makedirs(path.dirname(self.filename), exist_ok=True)
+            write_atomically(self.filename, json.dumps(everything, indent=1, sort_keys=True))
+
+            self._dirty = False
+
+
+
+
+class Manifest(_CourseRecord):
+    """
+    A record of the content hash of each container at the time it was last successfully published to a course.
+
+    Pass one to `publish` as `manifest`, and containers whose source, metadata, style files and local images haven't changed since they were last published are skipped.  The manifest lives in `root/.markdown2canvas/manifest.json`, which holds one section per course.  Call `save()` when you're done publishing.
+
+    The manifest only knows what *this library* published.  If content gets edited or deleted on Canvas by hand, `forget()` it (or `clear()` the manifest) to force it to be published again.
+
+    root -- the folder containing your course content.  containers are recorded by their path relative to this.
+    course -- a canvasapi Course, or a course id
+    """
+
+    def __init__(self, root, course):
+        super(Manifest, self).__init__(root, course, 'manifest.json')
+
+
+    def _key(self, thing):
+        return path.relpath(path.abspath(thing.folder), self.root).replace('\\','/')
+
+
+    def _hash(self, thing, images):
+        files = thing._manifest_files() + [path.join(self.root, im) for im in images]
+        return hash_files(files, self.root)
+
+
+    def is_unchanged(self, thing):
+        """
+        returns True if `thing` (a Page, Assignment, File or Link) was published to this course, and nothing it depends on has changed since.
+
+        doesn't render anything -- the images are the ones recorded at the last publish, which can only differ if the source did.
+        """
+        entry = self.entries.get(self._key(thing))
+        if entry is None:
+            return False
+
+        return entry['hash'] == self._hash(thing, entry['images'])
+
+
+    def record(self, thing):
+        """
+        records `thing` as successfully published in its current state.
+        """
+        local_images = getattr(thing, 'local_images', {})
+        images = sorted({path.relpath(im.givenpath, self.root).replace('\\','/') for im in local_images.values()})
+
+        self.entries[self._key(thing)] = {'hash': self._hash(thing, images), 'images': images}
+        self._dirty = True
+
+
+    def forget(self, thing):
+        if self.entries.pop(self._key(thing), None) is not None:
+            self._dirty = True
+
+
+    def clear(self):
+        self.entries = {}
+        self._dirty = True
+
+
+
+
+class AssetRegistry(_CourseRecord):
+    """
+    A record of which local files (images, mostly) are on Canvas, by the sha256 of their contents.
+
+    Pass one to `publish` as `registry`, and each distinct image is looked up or uploaded once per course, no matter how many documents use it or what it's called.  Every `Image` with the same contents gets the same canvasapi File.  The registry lives in `root/.markdown2canvas/assets.json`, which holds one section per course.  Call `save()` when you're done publishing.
+
+    Content the registry hasn't seen before is still looked for by name and size, like `find_file_in_course`, so that images uploaded before there was a registry aren't uploaded again.
+
+    A registry can be shared between threads.
+
+    root -- the folder containing your course content
+    course -- a canvasapi Course, or a course id
+    """
+
+    def __init__(self, root, course):
+        super(AssetRegistry, self).__init__(root, course, 'assets.json')
+
+        self._locks = {}   # hash to lock, so each asset is dealt with by one thread at a time
+        self._files = {}   # hash to canvasapi File, for assets dealt with in this run
+        self._hashes = {}  # (abspath, size, mtime) to hash
+
+
+    @property
+    def file_ids(self):
+        """
+        hash to id of the file on canvas
+        """
+        return self.entries
+
+
+    def hash(self, filename):
+        """
+        the sha256 hex digest of the contents of `filename`.  remembered until the file changes.
+        """
+        import hashlib, os
+
+        st = os.stat(filename)
+        key = (path.abspath(filename), st.st_size, st.st_mtime_ns)
+
+        with self._lock:
+            h = self._hashes.get(key)
+        if h is not None:
+            return h
+
+        h = _update_from_file(hashlib.sha256(), filename).hexdigest()
+
+        with self._lock:
+            self._hashes[key] = h
+        return h
+
+
+    def _lock_for(self, h):
+        with self._lock:
+            return self._locks.setdefault(h, threading.Lock())
+
+
+    def _recorded_file(self, h, course, index):
+        """
+        the file recorded for hash `h`, if it's still on canvas.
+        """
+        from canvasapi.exceptions import ResourceDoesNotExist
+
+        file_id = self.file_ids.get(h)
+        if file_id is None:
+            return None
+
+        if index is not None:
+            f = index.get_file_by_id(file_id)
+        else:
+            try:
+                f = course.get_file(file_id)
+            except ResourceDoesNotExist:
+                f = None
+
+        if f is None:
+            logger.info(f'file {file_id} for asset {h} is gone from course {self.course_id}')
+            self.forget(h)
+
+        return f
+
+
+    def publish(self, image, course, dest, overwrite=False, index=None):
+        """
+        returns the canvasapi File for `image`'s contents, uploading it to folder `dest` if it isn't on Canvas yet.
+
+        with `overwrite`, the contents are uploaded again (once per run), replacing any file of the same name in `dest`.
+        """
+        h = self.hash(image.upload_path)
+
+        with self._lock_for(h):
+            f = self._files.get(h)
+            if f is not None:
+                return f
+
+            if overwrite:
+                f = image._upload(course, dest, 'overwrite', index)
+            else:
+                f = self._recorded_file(h, course, index)
+                if f is None:
+                    f = find_file_in_course(image.upload_path, course, index)
+                if f is None:
+                    f = image._upload(course, dest, 'rename', index)
+
+            self._files[h] = f
+            with self._lock:
+                if self.file_ids.get(h) != f.id:
+                    self.file_ids[h] = f.id
+                    self._dirty = True
+
+            return f
+
+
+    def forget(self, h):
+        with self._lock:
+            self._files.pop(h, None)
+            if self.file_ids.pop(h, None) is not None:
+                self._dirty = True
+
+
+
+
+def create_or_get_assignment(name, course, even_if_exists = False, index=None):
+
+    assignment = find_assignment_in_course(name,course,index)
+    if assignment is not None:
+        if even_if_exists:
+            return assignment
+        else:
+            raise AlreadyExists(f"assignment {name} already exists")
+    else:
+        # make new assignment of name in course.
+        result = create_checked(lambda: course.create_assignment(assignment={'name':name}), lambda: find_assignment_in_course(name,course), f'creating assignment {name}')
+        if index is not None:
+            index.add_assignment(result)
+        return result
+
+
+
+def create_or_get_page(name, course, even_if_exists, index=None):
+
+    page = find_page_in_course(name,course,index)
+    if page is not None:
+
+        if even_if_exists:
+            return page
+        else:
+            raise AlreadyExists(f"page {name} already exists")
+    else:
+        # make new assignment of name in course.
+        result = create_checked(lambda: course.create_page(wiki_page={'body':"empty page",'title':name}), lambda: find_page_in_course(name,course), f'creating page {name}')
+        if index is not None:
+            index.add_page(result)
+        return result
+
+
+
+
+def module_item_key(item_type, content_id=None, page_url=None, external_url=None):
+    """
+    what identifies an item in a module: its type, and the page url for pages, the url for external urls, or else the id of its content
+    """
+    item_type = item_type.lower()
+
+    if item_type == 'page':
+        return (item_type, page_url)
+    elif item_type == 'externalurl':
+        return (item_type, external_url)
+    else:
+        return (item_type, content_id)
+
+
+
+def module_item_key_of(item):
+    """
+    the `module_item_key` of a canvasapi ModuleItem
+    """
+    return module_item_key(item.type, getattr(item, 'content_id', None), getattr(item, 'page_url', None), getattr(item, 'external_url', None))
+
+
+
+def find_module_item(module, item_type, content_id=None, page_url=None, external_url=None, index=None):
+    """
+    returns the item in `module` of type `item_type` ('page', 'File', ...) with the given `content_id`, `page_url` or `external_url`, or None.  which one is used depends on the type, see `module_item_key`.
+
+    Pass a `CourseIndex` as `index` to look it up there, rather than listing the module's items.
+    """
+    key = module_item_key(item_type, content_id, page_url, external_url)
+
+    if index is not None:
+        return index.find_module_item(module, key)
+
+    for item in module.get_module_items():
+        if module_item_key_of(item) == key:
+            return item
+
+    return None
+
+
+
+def add_module_item(module, item_type, module_item, description, index=None, **key):
+    """
+    adds an item to `module`, unless it's there already, and returns the item.
+
+    module_item -- the dict for canvasapi's `create_module_item`
+    key -- the `content_id`, `page_url` or `external_url` which identify the item.  see `module_item_key`.
+    """
+    item = find_module_item(module, item_type, index=index, **key)
+    if item is not None:
+        return item
+
+    item = create_checked(lambda: module.create_module_item(module_item=module_item), lambda: find_module_item(module, item_type, **key), description)
+
+    if index is not None:
+        index.add_module_item(module, item)
+
+    return item
+
+
+
+def create_or_get_module(module_name, course, index=None):
+
+    try:
+        return get_module(module_name, course, index)
+    except DoesntExist as e:
+        result = create_checked(lambda: course.create_module(module={'name':module_name}), lambda: _none_if_doesnt_exist(get_module, module_name, course), f'creating module {module_name}')
+        if index is not None:
+            index.add_module(result)
+        return result
+
+
+
+
+def get_module(module_name, course, index=None):
+    """
+    returns 
+    * Module if such a module exists, 
+    * raises if not
+    """
+    if index is not None:
+        m = index.find_module(module_name)
+        if m is None:
+            raise DoesntExist(f"tried to get module {module_name}, but it doesn't exist in the course")
+        return m
+
+    modules = course.get_modules()
+
+    for m in modules:
+        if m.name == module_name:
+            return m
+
+    raise DoesntExist(f"tried to get module {module_name}, but it doesn't exist in the course")
+
+
+def create_or_get_folder(folder_path, course, index=None):
+    """
+    returns the folder at `folder_path`, like 'automatically_uploaded_files/a_subfolder', relative to the course's files.  makes any folders along the way which don't exist yet.
+
+    The folders are looked up by their full path in `index`, a `CourseIndex`, so if they exist, this is a dict lookup.  Without an index, the course's folders are listed once.
+    """
+    if index is None:
+        index = CourseIndex(course)
+
+    parts = [subd for subd in folder_path.split('/') if subd]
+
+    found = index.get_folder('/'.join(['course files'] + parts))
+    if found is not None:
+        return found
+
+    curr_dir = get_root_folder(course, index)
+    for subd in parts:
+        parent = curr_dir
+        curr_dir = index.get_folder(f'{parent.full_name}/{subd}')
+
+        if curr_dir is None:
+            curr_dir = create_checked(lambda: parent.create_folder(subd), lambda: _none_if_doesnt_exist(get_subfolder_named, parent, subd), f'creating folder {subd}')
+            index.add_folder(curr_dir)
+
+    return curr_dir
+
+
+
+def _none_if_doesnt_exist(func, *args):
+    try:
+        return func(*args)
+    except DoesntExist:
+        return None
+
+
+
+def get_subfolder_named(folder, subfolder_name):
+
+    assert '/' not in subfolder_name, "this is likely broken if subfolder has a / in its name, / gets converted to something else by Canvas.  don't use / in subfolder names, that's not allowed"
+
+    current_subfolders = folder.get_folders()
+    for f in current_subfolders:
+        if f.name == subfolder_name:
+            return f
+
+    raise DoesntExist(f'a subfolder of {folder.name} named {subfolder_name} does not currently exist')
+
+    
+def delete_module(module_name, course, even_if_exists, index=None):
+
+    if even_if_exists:
+        try:
+            m = get_module(module_name, course, index)
+            m.delete()
+        except DoesntExist as e:
+            return
+
+    else:
+        # this path is expected to raise if the module doesn't exist
+        m = get_module(module_name, course, index)
+        m.delete()
+
+    if index is not None:
+        index.remove_module(m)
+
+
+
+################## making images smaller
+
+
+image_optimizer = None # the `ImageOptimizer` used before uploading images, if any.  see `use_image_optimizer`.
+
+
+def use_image_optimizer(max_width=1600, jpeg_quality=85, png_optimize=True, webp=False, strip_metadata=True, directory=None):
+    """
+    turns on image optimization: before an image is uploaded, it's shrunk to at most `max_width` pixels wide, compressed again, and its metadata (camera, location, ...) is thrown out.  the original is left alone.
+
+    max_width -- wider images are scaled down to this width.  None to leave the size alone
+    jpeg_quality -- quality for recompressed jpegs (and webp), 1 to 95
+    png_optimize -- have Pillow try harder to make pngs small
+    webp -- upload a webp instead of the jpeg or png.  every current browser shows them, but they can't be opened by everything else
+    strip_metadata -- throw out exif and text chunks.  the color profile is kept
+    directory -- where to keep the smaller copies.  defaults to the `images` folder in `default_cache_dir()`
+
+    pass `max_width=False` to turn it back off.  returns the optimizer.
+
+    needs Pillow, which is `pip install markdown2canvas[images]`.
+    """
+    global image_optimizer
+
+    if max_width is False:
+        image_optimizer = None
+    else:
+        image_optimizer = ImageOptimizer(directory or path.join(default_cache_dir(),'images'), max_width, jpeg_quality, png_optimize, webp, strip_metadata)
+
+    return image_optimizer
+
+
+
+class ImageOptimizer(object):
+    """
+    Makes smaller copies of images, for uploading instead of the originals.
+
+    Copies are kept on disk, keyed by the contents of the original and the options, so each image is only worked on once, even between runs.  If the copy wouldn't be smaller, and the image didn't need shrinking, the original is used -- without its metadata, taken out without touching the image, if `strip_metadata`.  Only jpegs and pngs are touched; anything else (gifs, svgs, ...) is uploaded as it is.
+
+    See `use_image_optimizer` for the options.
+    """
+
+    formats = ('JPEG', 'PNG')
+
+    def __init__(self, directory, max_width=1600, jpeg_quality=85, png_optimize=True, webp=False, strip_metadata=True):
+        super(ImageOptimizer, self).__init__()
+
+        import os, threading
+
+        try:
+            import PIL
+        except ImportError as e:
+            raise ImportError('optimizing images needs Pillow.  `pip install markdown2canvas[images]`') from e
+
+        self.directory = directory
+        self.max_width = max_width
+        self.jpeg_quality = jpeg_quality
+        self.png_optimize = png_optimize
+        self.webp = webp
+        self.strip_metadata = strip_metadata
+
+        self._optimized = {}
+        self._lock = threading.Lock()
+
+        os.makedirs(self.directory, exist_ok=True)
+
+
+    def key(self, filename):
+        """
+        the sha256 hex digest of the contents of `filename`, the options, and the version of Pillow.
+        """
+        import hashlib, json, PIL
+
+        sha = _update_from_file(hashlib.sha256(), filename)
+
+        options = [self.max_width, self.jpeg_quality, self.png_optimize, self.webp, self.strip_metadata, PIL.__version__]
+        sha.update(json.dumps(options).encode('utf-8'))
+        return sha.hexdigest()
+
+
+    def optimize(self, filename):
+        """
+        returns the name of the file to upload for the image `filename`: a smaller copy, or `filename` itself.  remembered until the file changes.
+        """
+        import os
+
+        st = os.stat(filename)
+        remembered = (path.abspath(filename), st.st_size, st.st_mtime_ns)
+
+        with self._lock:
+            result = self._optimized.get(remembered)
+        if result is not None:
+            return result
+
+        key = self.key(filename)
+        entry = path.join(self.directory, key[:2], key)
+        kept = path.join(entry, '.original')
+
+        if path.exists(kept):
+            result = filename
+        else:
+            derived = [name for name in os.listdir(entry) if not name.endswith('.tmp')] if path.isdir(entry) else []
+            if derived:
+                result = path.join(entry, derived[0])
+            else:
+                with profile_stage('optimize image'):
+                    result = self._make_copy(filename, entry, kept)
+
+        with self._lock:
+            self._optimized[remembered] = result
+        return result
+
+
+    def _make_copy(self, filename, entry, kept):
+        import io, os
+        from PIL import Image as PILImage, ImageOps, UnidentifiedImageError
+
+        try:
+            original = PILImage.open(filename)
+        except UnidentifiedImageError:
+            return self._keep(filename, entry, kept, "Pillow can't read it")
+
+        with original:
+            fmt = original.format
+            if fmt not in self.formats or getattr(original, 'is_animated', False):
+                return self._keep(filename, entry, kept, f'{fmt} images are uploaded as they are')
+
+            rotated = original.getexif().get(0x0112, 1) != 1
+            im = ImageOps.exif_transpose(original)
+
+        resized = self.max_width is not None and im.width > self.max_width
+        if resized:
+            im = im.resize((self.max_width, max(1, round(im.height * self.max_width / im.width))), PILImage.LANCZOS)
+
+        options = {}
+        if im.info.get('icc_profile'):
+            options['icc_profile'] = im.info['icc_profile']
+        if not self.strip_metadata:
+            if im.info.get('exif'):
+                options['exif'] = im.info['exif']
+            if fmt == 'PNG' and getattr(im, 'text', None):
+                from PIL.PngImagePlugin import PngInfo
+                options['pnginfo'] = PngInfo()
+                for k, v in im.text.items():
+                    options['pnginfo'].add_text(k, v)
+
+        name = path.basename(filename)
+        if self.webp:
+            name = path.splitext(name)[0] + '.webp'
+            if im.mode not in ('RGB', 'RGBA'):
+                im = im.convert('RGBA' if 'A' in im.mode or 'transparency' in im.info else 'RGB')
+            options.pop('pnginfo', None)
+            options.update(format='WEBP', quality=self.jpeg_quality, lossless=(fmt == 'PNG'), method=6)
+        elif fmt == 'JPEG':
+            options.update(format='JPEG', quality=self.jpeg_quality, optimize=True, progressive=True)
+        else:
+            options.update(format='PNG', optimize=self.png_optimize)
+
+        out = io.BytesIO()
+        im.save(out, **options)
+        contents = out.getvalue()
+
+        # an image which didn't need shrinking might be smaller as it was.  but without its metadata, if that's wanted.
+        # one which was rotated by its exif has to be saved again, since it'd be the wrong way round without it.
+        if not resized and not (self.strip_metadata and rotated):
+            with open(filename,'rb') as f:
+                as_it_was = f.read()
+            stripped = _without_metadata(as_it_was, fmt) if self.strip_metadata else as_it_was
+
+            if len(contents) >= len(stripped):
+                if stripped == as_it_was:
+                    return self._keep(filename, entry, kept, 'the optimized copy is no smaller')
+                contents, name = stripped, path.basename(filename)
+
+        os.makedirs(entry, exist_ok=True)
+        result = path.join(entry, name)
+        write_atomically(result, contents)
+        logger.info(f'optimized {filename} from {os.path.getsize(filename)} to {len(contents)} bytes')
+        return result
+
+
+    def _keep(self, filename, entry, kept, why):
+        import os
+
+        logger.info(f'not optimizing {filename}: {why}')
+        os.makedirs(entry, exist_ok=True)
+        write_atomically(kept, '')
+        return filename
+
+
+
+def _without_metadata(data, fmt):
+    """
+    the bytes of a jpeg or png, with the parts which only hold metadata taken out, and the image itself left exactly as it was.
+
+    from jpegs, this takes the APP segments other than JFIF, the color profile and Adobe's (which says how the colors are stored), and comments.  from pngs, the text, exif and time chunks.
+    """
+    import struct
+
+    out = bytearray()
+
+    if fmt == 'JPEG':
+        keep = {0xE0, 0xE2, 0xEE} # JFIF, icc profile, Adobe
+        out += data[:2]
+        i = 2
+        while i + 4 <= len(data) and data[i] == 0xFF:
+            marker = data[i+1]
+            if marker == 0xFF: # padding
+                i += 1
+                continue
+            if marker == 0xDA: # the image data starts, and runs to the end
+                break
+            length = struct.unpack('>H', data[i+2:i+4])[0]
+            if not (0xE0 <= marker <= 0xEF or marker == 0xFE) or marker in keep:
+                out += data[i:i+2+length]
+            i += 2 + length
+        out += data[i:]
+
+    elif fmt == 'PNG':
+        drop = {b'tEXt', b'zTXt', b'iTXt', b'eXIf', b'tIME'}
+        out += data[:8]
+        i = 8
+        while i + 8 <= len(data):
+            length = struct.unpack('>I', data[i:i+4])[0]
+            if data[i+4:i+8] not in drop:
+                out += data[i:i+12+length]
+            i += 12 + length
+
+    else:
+        return data
+
+    return bytes(out)
+
+
+
+
+################## classes
+
+
+class CanvasObject(object):
+    """
+    A base class for wrapping canvas objects.
+    """
+
+    def __init__(self,canvas_obj=None):
+
+
+        super(object, self).__init__()
+
+        # try to open, and see if the meta and source files exist.
+        # if not, raise
+
+        self.canvas_obj = canvas_obj
+
+
+
+    async def apublish(self, *args, **kwargs):
+        """
+        `publish`, for asyncio.  takes the same arguments.
+
+        the publishing happens in a worker thread, so lots of things can be published at once with `asyncio.gather`.  the number at once is limited by the event loop's default executor.  see also `publish_tree_async`.
+        """
+        import asyncio
+
+        return await asyncio.to_thread(self.publish, *args, **kwargs)
+
+
+
+
+class Document(CanvasObject):
+    """
+    A base class which handles common pieces of interface for things like Pages and Assignments
+    """
+
+    def __init__(self,folder):
+        """
+        Construct a Document.
+        Reads the meta.json file from the specified folder.
+
+        The source.md file isn't read until it's needed -- the html is rendered the first time `translated_html` or `local_images` is used.  So it's cheap to make lots of Documents, say to filter them by their metadata.
+        """
+
+        super(Document,self).__init__(folder)
+        import json, os
+        from os.path import join
+
+        self.folder = folder
+
+        self.metaname = path.join(folder,'meta.json')
+        with open(path.join(folder,'meta.json'),'r') as f:
+            self.metadata = json.load(f)
+
+
+        self.sourcename = path.join(folder,'source.md')
+
+        self.name = None
+
+        self._set_from_metadata()
+
+        # these are computed when first needed.  see `_render`.
+        self._soup = None
+        self._translated_html = None
+        self._local_images = None
+        self._rendered_html = None # from `use_rendered`
+
+
+
+    def _render(self):
+        """
+        renders the markdown source to a parsed html tree.  done at most once, on demand.
+        """
+        if self._rendered_html is not None:
+            with profile_stage('parse html', self.folder):
+                self._soup = parse_html(self._rendered_html)
+            self._rendered_html = None
+            return
+
+        with profile_stage('render', self.folder):
+            style = Style.load(self.metadata['style']) if 'style' in self.metadata else None
+            html = style.render_markdown(self.sourcename) if style is not None else render_markdown(self.sourcename)
+
+            # the soup is edited in place from here on, and only turned into a string when it's needed.
+            with profile_stage('parse html'):
+                soup = parse_html(html)
+
+            # only the document's own images are relative to its folder.  the style's header and footer are wrapped around it afterwards, as they are.
+            with profile_stage('localize images'):
+                localize_image_paths(soup, self.folder)
+
+            if style is not None:
+                html = style.apply(soup)
+                with profile_stage('parse html'):
+                    soup = parse_html(html)
+
+            self._soup = soup
+            self._translated_html = None
+
+
+
+    @property
+    def translated_html(self):
+        """
+        the html to publish, as a string
+        """
+        if self._translated_html is None:
+            soup = self._get_soup()
+            with profile_stage('prettify', self.folder):
+                self._translated_html = soup.prettify()
+        return self._translated_html
+
+    @translated_html.setter
+    def translated_html(self, html):
+        self._translated_html = html
+        self._soup = None
+        self._local_images = None # found again in the new html
+
+    def _get_soup(self):
+        if self._soup is None:
+            if self._translated_html is None:
+                self._render()
+            else:
+                self._soup = parse_html(self._translated_html)
+        return self._soup
+
+
+    @property
+    def local_images(self):
+        """
+        a dict from src to `Image`, of the images in the html which live on this computer
+        """
+        if self._local_images is None:
+            soup = self._get_soup()
+            with profile_stage('find images', self.folder):
+                self._local_images = find_local_images(soup)
+
+        return self._local_images
+
+    @local_images.setter
+    def local_images(self, images):
+        self._local_images = images
+
+
+    def use_rendered(self, result):
+        """
+        uses `result`, a `RenderResult` for this document's folder (see `render_many`), instead of rendering the source here.  if this document was already rendered, its html and images are replaced by the result's.
+        """
+        self._soup = None
+        self._translated_html = None
+        self._rendered_html = result.html
+        self._local_images = {src: Image(path.abspath(src)) for src in result.images}
+
+
+
+
+
+
+
+
+
+
+
+
+    def publish_images_and_adjust_html(self,course,overwrite=False,index=None,workers=None,registry=None):
+        """
+        uploads the local images, several at a time, then points the html at them.
+
+        `workers` is how many images to upload at once, defaulting to `image_upload_workers`.  Pass an `AssetRegistry` as `registry` to look up and upload the images by their contents.  If any images fail to upload, the rest are still uploaded, and then `ImageUploadError` is raised, with the exception for each failed image in its `errors`.
+
+        The images are looked up in `index`, or without one, in a `CourseIndex` made for them all, so the course's files are only listed once.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        if workers is None:
+            workers = image_upload_workers
+
+        if index is None and len(self.local_images) > 1:
+            index = CourseIndex(course)
+
+        # first, publish the local images.
+        errors = {}
+        if self.local_images:
+            with ThreadPoolExecutor(max_workers=max(1,min(workers,len(self.local_images)))) as pool:
+                futures = {src: pool.submit(contextvars.copy_context().run, im.publish, course, 'images', index=index, registry=registry) for src, im in self.local_images.items()}
+
+            for src, future in futures.items():
+                e = future.exception()
+                if e is None:
+                    self.local_images[src].canvas_obj = future.result()
+                else:
+                    logger.error(f'failed to upload image {src} for {self}: {e!r}')
+                    errors[src] = e
+
+        if errors:
+            raise ImageUploadError(f'{len(errors)} of {len(self.local_images)} images for {self} failed to upload: {", ".join(errors)}', errors)
+
+
+        # then, deal with the urls
+        adjust_html_for_images(self._get_soup(), self.local_images, course.id)
+        self._translated_html = None
+
+
+        write_atomically(path.join(self.folder,'result.html'), self.translated_html)
+
+
+
+
+
+    def _set_from_metadata(self):
+        self.name = self.metadata['name']
+
+        if 'modules' in self.metadata:
+            self.modules = self.metadata['modules']
+        else:
+            self.modules = []
+
+
+
+    def _dict_of_props(self):
+        """
+        construct a dictionary of properties, such that it can be used to `edit` a canvas object.
+        """
+        d = {}
+        return d
+
+
+    def _manifest_files(self):
+        """
+        the files whose contents determine what gets published, other than images.  see `Manifest`.
+        """
+        files = [self.sourcename, self.metaname]
+
+        if 'style' in self.metadata:
+            style_path = self.metadata['style']
+            files.extend(path.join(style_path, n) for n in Style.filenames)
+            files.extend(f for f in [path.join(style_path, n) for n in Style.optional_filenames] if path.exists(f))
+
+        return files
+
+
+    def _plan(self, course, plan, overwrite, index, registry=None):
+        """
+        adds what `publish` would do to `plan`.  see `plan`.
+        """
+        kind = self.metadata['type']
+
+        if kind == 'page':
+            existing = index.find_page(self.name)
+        else:
+            existing = index.find_assignment(self.name)
+
+        if existing is not None and not overwrite:
+            plan.add(Operation('conflict', f'{kind} {self.name} already exists', self.folder, requests=0))
+            return
+
+        for im in self.local_images.values():
+            plan.image(im, course, index, registry, self.folder)
+
+        if existing is None:
+            plan.add(Operation(f'create {kind}', self.name, self.folder))
+
+        fields = sorted(k for k in self._dict_of_props() if k not in ['body','description'])
+        plan.add(Operation(f'edit {kind}', self.name, self.folder, details={'fields': fields}))
+
+        for module_name in self.modules:
+            plan.module(module_name, index)
+            if existing is None or plan.module_item(module_name, index, kind, **self._module_item_key_args(existing)) is None:
+                plan.add(Operation('add module item', f'{self.name} in {module_name}', self.folder))
+
+
+    def ensure_in_modules(self, course, index=None):
+
+        if not self.canvas_obj:
+            raise DoesntExist(f"trying to make sure an object is in its modules, but this item ({self.name}) doesn't exist on canvas yet.  publish it first.")
+
+        for module_name in self.modules:
+            module = create_or_get_module(module_name, course, index)
+
+            if self.metadata['type'] == 'page':
+                content_id = self.canvas_obj.page_id
+            elif self.metadata['type'] == 'assignment':
+                content_id = self.canvas_obj.id
+
+
+            item = {'type':self.metadata['type'], 'content_id':content_id}
+            add_module_item(module, self.metadata['type'], item, f'adding {self} to module {module_name}', index, **self._module_item_key_args(self.canvas_obj))
+
+
+    def _module_item_key_args(self, canvas_obj):
+        """
+        the arguments of `module_item_key` which identify `canvas_obj`, this document on canvas, in a module
+        """
+        if self.metadata['type'] == 'page':
+            return {'page_url': canvas_obj.url}
+        else:
+            return {'content_id': canvas_obj.id}
+
+
+    def is_in_module(self, module_name, course, index=None):
+        """
+        checks whether this content is an item in the listed module
+
+        passthrough raise if the module doesn't exist
+        """
+
+        module = get_module(module_name,course,index)
+
+        if self.metadata['type'] == 'page':
+            on_canvas = find_page_in_course(self.name, course, index)
+        else:
+            on_canvas = find_assignment_in_course(self.name, course, index)
+
+        if on_canvas is None:
+            return False
+
+        return find_module_item(module, self.metadata['type'], index=index, **self._module_item_key_args(on_canvas)) is not None
+
+
+class Page(Document):
+    """
+    a Page is an abstraction around content for plain old canvas pages, which facilitates uploading to Canvas.
+
+    folder -- a string, the name of the folder we're going to read data from.
+    """
+    def __init__(self, folder):
+        super(Page, self).__init__(folder)
+
+
+    def _set_from_metadata(self):
+        super(Page,self)._set_from_metadata()
+
+
+    @_attributed
+    def publish(self,course, overwrite=False, index=None, manifest=None, registry=None):
+        """
+        if `overwrite` is False, then if an assignment is found with the same name already, the function will decline to make any edits.
+
+        That is, if overwrite==False, then this function will only succeed if there's no existing assignment of the same name.
+
+        This base-class function will handle things like the html, images, etc.
+
+        Other derived-class `publish` functions will handle things like due-dates for assignments, etc.
+
+        Pass a `CourseIndex` as `index` to do lookups against it instead of listing things from Canvas.
+
+        Pass a `Manifest` as `manifest` to skip publishing if nothing changed since the last time.
+
+        Pass an `AssetRegistry` as `registry` to upload each distinct image only once.
+        """
+        if manifest is not None and manifest.is_unchanged(self):
+            logger.info(f'{self} is unchanged since it was last published, skipping')
+            return
+
+        try:
+            page = create_or_get_page(self.name, course, even_if_exists=overwrite, index=index)
+        except AlreadyExists as e:
+            if not overwrite:
+                raise e
+
+        self.canvas_obj = page
+
+        self.publish_images_and_adjust_html(course, index=index, registry=registry)
+
+        d = self._dict_of_props()
+        page.edit(wiki_page=d) 
+
+        if index is not None:
+            index.add_page(page)
+
+        self.ensure_in_modules(course, index)
+
+        if manifest is not None:
+            manifest.record(self)
+
+
+
+
+    def _dict_of_props(self):
+
+        d = super(Page,self)._dict_of_props()
+
+        d['body'] = self.translated_html
+        d['title'] = self.name
+
+        return d
+
+    def __str__(self):
+        result = f"Page({self.folder})"
+        return result
+
+
+class Assignment(Document):
+    """docstring for Assignment"""
+    def __init__(self, folder):
+        super(Assignment, self).__init__(folder)
+
+        # self._set_from_metadata() # <-- this is called from the base __init__
+
+    def __str__(self):
+        result = f"Assignment({self.folder})"
+        return result
+
+    def _set_from_metadata(self):
+        super(Assignment,self)._set_from_metadata()
+
+
+        self.allowed_extensions = self.metadata['allowed_extensions'] if 'allowed_extensions' in self.metadata else None
+
+        self.points_possible = self.metadata['points_possible'] if 'points_possible' in self.metadata else None
+
+        self.unlock_at = self.metadata['unlock_at'] if 'unlock_at' in self.metadata else None
+        self.lock_at = self.metadata['lock_at'] if 'lock_at' in self.metadata else None
+        self.due_at = self.metadata['due_at'] if 'due_at' in self.metadata else None
+
+        self.published = self.metadata['published'] if 'published' in self.metadata else None
+
+        self.submission_types = self.metadata['submission_types'] if 'submission_types' in self.metadata else None
+
+        self.external_tool_tag_attributes = self.metadata['external_tool_tag_attributes'] if 'external_tool_tag_attributes' in self.metadata else None
+
+
+    def _dict_of_props(self):
+
+        d = super(Assignment,self)._dict_of_props()
+        d['name'] = self.name
+        d['description'] = self.translated_html
+
+        if not self.allowed_extensions is None:
+            d['allowed_extensions'] = self.allowed_extensions
+
+        if not self.points_possible is None:
+            d['points_possible'] = self.points_possible
+
+        if not self.unlock_at is None:
+            d['unlock_at'] = self.unlock_at
+        if not self.due_at is None:
+            d['due_at'] = self.due_at
+        if not self.lock_at is None:
+            d['lock_at'] = self.lock_at
+
+        if not self.published is None:
+            d['published'] = self.published
+
+        if not self.submission_types is None:
+            d['submission_types'] = self.submission_types
+
+        if not self.external_tool_tag_attributes is None:
+            d['external_tool_tag_attributes'] = self.external_tool_tag_attributes
+
+
+        return d
+
+
+
+    @_attributed
+    def publish(self, course, overwrite=False, index=None, manifest=None, registry=None):
+        """
+        if `overwrite` is False, then if an assignment is found with the same name already, the function will decline to make any edits.
+
+        That is, if overwrite==False, then this function will only succeed if there's no existing assignment of the same name.
+
+        Pass a `CourseIndex` as `index` to do lookups against it instead of listing things from Canvas.
+
+        Pass a `Manifest` as `manifest` to skip publishing if nothing changed since the last time.
+
+        Pass an `AssetRegistry` as `registry` to upload each distinct image only once.
+        """
+        if manifest is not None and manifest.is_unchanged(self):
+            logger.info(f'{self} is unchanged since it was last published, skipping')
+            return True
+
+        assignment = None
+        try:
+            assignment = create_or_get_assignment(self.name, course, overwrite, index)
+        except AlreadyExists as e:
+            if not overwrite:
+                raise e
+
+
+        self.canvas_obj = assignment
+
+
+        self.publish_images_and_adjust_html(course, index=index, registry=registry)
+
+        # now that we have the assignment, we'll update its content.
+
+        new_props=self._dict_of_props()
+
+        # for example,
+        # ass[0].edit(assignment={'lock_at':datetime.datetime(2021, 8, 17, 4, 59, 59),'due_at':datetime.datetime(2021, 8, 17, 4, 59, 59)})
+        # we construct the dict of values in the _dict_of_props() function.
+
+        assignment.edit(assignment=new_props)
+
+        if index is not None:
+            index.add_assignment(assignment)
+
+        self.ensure_in_modules(course, index)
+
+        if manifest is not None:
+            manifest.record(self)
+
+        return True
+
+
+
+
+
+
+
+class Image(CanvasObject):
+    """
+    A wrapper class for images on Canvas
+    """
+
+
+    def __init__(self, filename, alttext = ''):
+        super(Image, self).__init__()
+
+        self.givenpath = filename
+        self.filename = filename
+        self.name = path.split(filename)[1]
+        self.folder = path.split(filename)[0]
+        self.alttext = alttext
+
+
+        # <p>
+        #     <img class="instructure_file_link inline_disabled" src="https://uws-td.instructure.com/courses/3099/files/219835/preview" alt="hauser_menagerie.jpg" data-api-endpoint="https://uws-td.instructure.com/api/v1/courses/3099/files/219835" data-api-returntype="File" />
+        # </p>
+
+    @property
+    def upload_path(self):
+        """
+        the file which is actually uploaded: a smaller copy of the image if `use_image_optimizer` is on, otherwise the image itself.
+        """
+        if image_optimizer is None:
+            return self.givenpath
+        return image_optimizer.optimize(self.givenpath)
+
+
+    @_attributed
+    def publish(self, course, dest, overwrite=False, raise_if_already_uploaded = False, index=None, registry=None):
+        """
+
+
+        see also https://canvas.instructure.com/doc/api/file.file_uploads.html
+
+        Pass a `CourseIndex` as `index` to look for the image in it, rather than listing all the course's files.
+
+        Pass an `AssetRegistry` as `registry` to find the image by its contents instead of its name, and share the canvas file with every other image with the same contents.
+        """
+
+        if registry is not None and not raise_if_already_uploaded:
+            self.canvas_obj = registry.publish(self, course, dest, overwrite, index)
+            return self.canvas_obj
+
+        # this still needs to be adjusted to capture the Canvas image, in case it exists
+        if overwrite:
+            self.canvas_obj = self._upload(course, dest, 'overwrite', index)
+            return self.canvas_obj
+
+        else:
+            img_on_canvas = find_file_in_course(self.upload_path,course,index)
+            if img_on_canvas is not None:
+                if raise_if_already_uploaded:
+                    raise AlreadyExists(f'image {self.name} already exists in course {course.name}, but you don\'t want to overwrite.')
+            else:
+                # get the remote image
+                print(f'file not already uploaded, uploading {self.name}')
+
+                img_on_canvas = self._upload(course, dest, 'rename', index)
+
+
+            self.canvas_obj = img_on_canvas
+
+            return img_on_canvas
+
+
+    def _find_uploaded(self, course):
+        """
+        for checking whether an upload which failed worked after all.  returns what `course.upload` would have, or None.
+        """
+        f = find_file_in_course(self.upload_path, course)
+        if f is None:
+            return None
+        return True, {'id': f.id}
+
+
+    def _upload(self, course, dest, on_duplicate, index=None):
+        """
+        uploads the image to folder `dest`, and returns the canvasapi File.
+        """
+        success_code, json_response = create_checked(lambda: course.upload(self.upload_path, parent_folder_path=dest,on_duplicate=on_duplicate), lambda: self._find_uploaded(course), f'uploading {self.givenpath}')
+        if not success_code:
+            print(f'failed to upload...  {self.givenpath}')
+
+        uploaded = course.get_file(json_response['id'])
+
+        if index is not None:
+            if on_duplicate == 'overwrite':
+                # canvas replaced any file of the same name in that folder
+                for f in index.files_named(uploaded.filename):
+                    if f.folder_id == uploaded.folder_id and f.id != uploaded.id:
+                        index.remove_file(f)
+            index.add_file(uploaded)
+
+        return uploaded
+
+    def make_src_url(self,courseid):
+        """
+        constructs a string which can be used to embed the image in a Canvas page.
+
+        sadly, the JSON back from Canvas doesn't just produce this for us.  lame.
+
+        """
+        import canvasapi
+        im = self.canvas_obj
+        assert(isinstance(self.canvas_obj, canvasapi.file.File))
+
+        n = im.url.find('/files')
+
+        url = im.url[:n]+'/courses/'+str(courseid)+'/files/'+str(im.id)+'/preview'
+
+        return url
+
+    def make_api_endpoint_url(self,courseid):
+        import canvasapi
+        im = self.canvas_obj
+        assert(isinstance(self.canvas_obj, canvasapi.file.File))
+
+        n = im.url.find('/files')
+
+        url = im.url[:n] + '/api/v1/courses/' + str(courseid) + '/files/' + str(im.id)
+        return url
+        # data-api-endpoint="https://uws-td.instructure.com/api/v1/courses/3099/files/219835"
+
+
+    def __str__(self):
+        result = "\n"
+        result = result + f'givenpath: {self.givenpath}\n'
+        result = result + f'name: {self.name}\n'
+        result = result + f'folder: {self.folder}\n'
+        result = result + f'alttext: {self.alttext}\n'
+        result = result + f'canvas_obj: {self.canvas_obj}\n'
+        url = self.make_src_url('fakecoursenumber')
+        result = result + f'constructed canvas url: {url}\n'
+
+        return result+'\n'
+
+    def __repr__(self):
+        return str(self)
+
+
+
+
+
+
+
+class Link(CanvasObject):
+    """
+    a containerization of url's, for uploading to Canvas modules
+    """
+    def __init__(self, folder):
+        super(Link, self).__init__()
+        self.folder = folder
+
+        import json, os
+        from os.path import join
+
+        self.metaname = path.join(folder,'meta.json')
+        with open(path.join(folder,'meta.json'),'r') as f:
+            self.metadata = json.load(f)
+    
+    def __str__(self):
+        result = f"Link({self.metadata['external_url']})"
+        return result
+
+    def __repr__(self):
+        return str(self)
+
+
+    @_attributed
+    def publish(self, course, overwrite=False, index=None, manifest=None):
+
+        if manifest is not None and manifest.is_unchanged(self):
+            logger.info(f'{self} is unchanged since it was last published, skipping')
+            return
+
+        # one index for all the lookups, so each listing is fetched once
+        if index is None:
+            index = CourseIndex(course)
+
+        for m in self.metadata['modules']:
+            if link_on_canvas:= self.is_in_module(course, m, index):
+                if not overwrite:
+                    n = self.metadata['external_url']
+                    raise AlreadyExists(f'trying to upload {self}, but is already on Canvas')
+                else:
+                    link_on_canvas.edit(module_item={'external_url':self.metadata['external_url'],'title':self.metadata['name'], 'new_tab':bool(self.metadata['new_tab'])})
+
+            else:
+                mod = get_module(m, course, index)
+                item = {'type':'ExternalUrl','external_url':self.metadata['external_url'],'title':self.metadata['name'], 'new_tab':bool(self.metadata['new_tab'])}
+                add_module_item(mod, 'ExternalUrl', item, f'adding {self} to module {m}', index, external_url=self.metadata['external_url'])
+
+        if manifest is not None:
+            manifest.record(self)
+
+
+    def _manifest_files(self):
+        return [self.metaname]
+
+
+    def _plan(self, course, plan, overwrite, index, registry=None):
+        """
+        adds what `publish` would do to `plan`.  see `plan`.
+        """
+        for m in self.metadata['modules']:
+            plan.module(m, index)
+
+            on_canvas = plan.module_item(m, index, 'ExternalUrl', external_url=self.metadata['external_url'])
+            if on_canvas and not overwrite:
+                plan.add(Operation('conflict', f'link {self.metadata["name"]} already in {m}', self.folder, requests=0))
+            elif on_canvas:
+                plan.add(Operation('edit module item', f'{self.metadata["name"]} in {m}', self.folder))
+            else:
+                plan.add(Operation('add module item', f'{self.metadata["name"]} in {m}', self.folder))
+
+
+    def is_already_uploaded(self, course, index=None):
+        for m in self.metadata['modules']:
+            if not self.is_in_module(course, m, index):
+                return False
+
+        return True
+
+
+
+    def is_in_module(self, course, module_name, index=None):
+        module = get_module(module_name,course,index)
+
+        return find_module_item(module, 'ExternalUrl', external_url=self.metadata['external_url'], index=index)
+
+    
+
+
+def _find_uploaded_in_folder(filename, folder):
+    """
+    for checking whether an upload of `filename` to `folder` which failed worked after all.  returns what `folder.upload` would have, or None.
+    """
+    name, size = path.basename(filename), path.getsize(filename)
+    for f in folder.get_files():
+        if f.filename == name and f.size == size:
+            return True, {k: v for k, v in vars(f).items() if not k.startswith('_')}
+
+    return None
+
+
+
+class File(CanvasObject):
+    """
+    a containerization of arbitrary files, for uploading to Canvas
+    """
+    def __init__(self, folder):
+        super(File, self).__init__(folder)
+
+        import json, os
+        from os.path import join
+
+        self.folder = folder
+        
+        self.metaname = path.join(folder,'meta.json')
+        with open(path.join(folder,'meta.json'),'r') as f:
+            self.metadata = json.load(f)
+
+
+    
+    def __str__(self):
+        result = f"File({self.metadata})"
+        return result
+
+    def __repr__(self):
+        return str(self)
+
+
+    def _upload_(self, course):
+        pass
+
+    @_attributed
+    def publish(self, course, overwrite=False, index=None, manifest=None):
+        
+        if manifest is not None and manifest.is_unchanged(self):
+            logger.info(f'{self} is unchanged since it was last published, skipping')
+            return
+
+        # one index for all the lookups, so each listing is fetched once
+        if index is None:
+            index = CourseIndex(course)
+
+        if file_on_canvas:= self.is_already_uploaded(course, index=index):
+            if not overwrite:
+                n = self.metadata['filename']
+                raise AlreadyExists(f'trying to upload file {n}, but is already on Canvas')
+
+            content_id = file_on_canvas.id
+
+        else:
+            curr_dir = create_or_get_folder(self.metadata['destination'], course, index)
+            
+            filepath_to_upload = path.join(self.folder,self.metadata['filename'])
+            reply = create_checked(lambda: curr_dir.upload(file=filepath_to_upload), lambda: _find_uploaded_in_folder(filepath_to_upload, curr_dir), f'uploading {filepath_to_upload}')
+            
+            if not reply[0]:
+                raise RuntimeError(f'something went wrong uploading {filepath_to_upload}')
+
+            file_on_canvas = reply[1]
+            content_id = file_on_canvas['id']
+
+            from canvasapi.file import File as CanvasFile
+            index.add_file(CanvasFile(course._requester, file_on_canvas))
 
 
         # now to make sure it's in the right modules
         for module_name in self.metadata['modules']:
-            module = create_or_get_module(module_name, course)
+            module = create_or_get_module(module_name, course, index)
+
+            add_module_item(module, 'File', {'type':'File', 'content_id':content_id}, f'adding {self} to module {module_name}', index, content_id=content_id)
+
+        if manifest is not None:
+            manifest.record(self)
+
+
+    def _manifest_files(self):
+        return [self.metaname, path.join(self.folder,self.metadata['filename'])]
+
+
+    def _plan(self, course, plan, overwrite, index, registry=None):
+        """
+        adds what `publish` would do to `plan`.  see `plan`.
+        """
+        file_on_canvas = self.is_already_uploaded(course, index=index)
+
+        if file_on_canvas and not overwrite:
+            plan.add(Operation('conflict', f'file {self.metadata["filename"]} already exists', self.folder, requests=0))
+            return
+
+        if not file_on_canvas:
+            plan.folder(self.metadata['destination'], index)
+            filename = path.join(self.folder,self.metadata['filename'])
+            plan.add(Operation('upload file', filename, self.folder, requests=2, upload_bytes=path.getsize(filename)))
+
+        for m in self.metadata['modules']:
+            plan.module(m, index)
+
+            if file_on_canvas and plan.module_item(m, index, 'File', content_id=file_on_canvas.id) is not None:
+                continue
+            plan.add(Operation('add module item', f'{self.metadata["filename"]} in {m}', self.folder))
+
+
+    def is_in_module(self, course, module_name, index=None):
+        file_on_canvas = self.is_already_uploaded(course, index=index)
+
+        if not file_on_canvas:
+            return False
+
+        module = get_module(module_name,course,index)
+
+        return find_module_item(module, 'File', content_id=file_on_canvas.id, index=index) is not None
+
+
+    def is_already_uploaded(self,course, require_same_path=True, index=None):
+        """
+        returns the file on canvas with this file's name (and, with `require_same_path`, in its `destination` folder), or None.
+
+        the files and folders are looked up in `index`, a `CourseIndex`.  without one, each is listed once.
+        """
+        if index is None:
+            index = CourseIndex(course)
+
+        for f in index.files_named(self.metadata['filename']):
+            if f.filename == self.metadata['filename']:
+
+                if not require_same_path:
+                    return f
+                else:
+                    containing_folder = index.get_folder_by_id(f.folder_id)
+                    if containing_folder is not None and containing_folder.full_name.startswith('course files') and containing_folder.full_name.endswith(self.metadata['destination']):
+                        return f
+
+
+        return None
+
+
+
+
+
+
+
+
+################## publishing whole folders of content
+
+
+container_types = {'page': Page, 'assignment': Assignment, 'file': File, 'ExternalUrl': Link}
+
+
+def find_containers(root):
+    """
+    returns a sorted list of the folders under `root` which contain a `meta.json`, that is, the containers of content.
+
+    hidden folders (like `.git` or `.markdown2canvas`) are skipped, and so are folders inside containers.
+    """
+    import os
+
+    found = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith('.'))
+
+        if 'meta.json' in filenames:
+            found.append(dirpath)
+            dirnames[:] = []
+
+    return sorted(found)
+
+
+
+def make_container(folder):
+    """
+    makes a Page, Assignment, File or Link from `folder`, according to the `type` in its `meta.json`.
+    """
+    import json
+
+    with open(path.join(folder,'meta.json'),'r') as f:
+        content_type = json.load(f)['type']
+
+    if content_type not in container_types:
+        raise ValueError(f'{folder} has type {content_type}, but i only know how to publish {", ".join(container_types)}')
+
+    return container_types[content_type](folder)
+
+
+
+class RenderResult(object):
+    """
+    The rendered html of a document, and the srcs of its local images, from `render_many`.  Give it to the document's `use_rendered`.
+
+    It's plain data, so it can be pickled and passed between processes.
+    """
+
+    def __init__(self, folder, html, images):
+        super(RenderResult, self).__init__()
+
+        self.folder = folder
+        self.html = html     # with local image paths relative to the current folder, before any images are uploaded
+        self.images = images # list of srcs of the local images in `html`
+
+
+
+def render_one(folder):
+    """
+    renders the Page or Assignment in `folder`, returning a `RenderResult`, or None if it's some other kind of container.
+    """
+    container = make_container(folder)
+    if not isinstance(container, Document):
+        return None
+
+    soup = container._get_soup()
+    return RenderResult(folder, str(soup), list(container.local_images))
+
+
+
+def render_many(folders, processes=None):
+    """
+    renders the Pages and Assignments in `folders`, `processes` at a time in separate processes, so rendering can use all your cores.  returns a list of what `render_one` returns for each folder, in the same order.  if rendering a folder fails, its entry is the exception instead.
+
+    processes -- defaults to the number of cores.  with 1, everything is rendered in this process.
+
+    the workers use the same render and highlight caches, `markdown_extensions` and `markdown_extension_configs` as this process, but a render profiler doesn't see what they do.
+    """
+    import os
+    from concurrent.futures import ProcessPoolExecutor
+
+    folders = list(folders)
+    if processes is None:
+        processes = os.cpu_count() or 1
+
+    if processes <= 1 or len(folders) <= 1:
+        return [_render_for_pool(folder) for folder in folders]
+
+    cache_options = [None if cache is None else (cache.directory, cache.max_bytes) for cache in [render_cache, highlight_cache]]
+
+    processes = min(processes, len(folders))
+    with ProcessPoolExecutor(max_workers=processes, initializer=_start_render_worker, initargs=(*cache_options, list(markdown_extensions), markdown_extension_configs)) as pool:
+        return list(pool.map(_render_for_pool, folders, chunksize=max(1, len(folders)//(processes*4))))
+
+
+
+def _start_render_worker(render_cache_options, highlight_cache_options, extensions, extension_configs):
+    """
+    sets up a `render_many` worker process like the one which started it
+    """
+    global render_cache, markdown_extensions, markdown_extension_configs
+
+    render_cache = None if render_cache_options is None else RenderCache(*render_cache_options)
+    if highlight_cache_options is not None:
+        use_highlight_cache(*highlight_cache_options)
+    markdown_extensions = extensions
+    markdown_extension_configs = extension_configs
+
+
+
+def _render_for_pool(folder):
+    try:
+        return render_one(folder)
+    except Exception as e:
+        logger.error(f'failed to render {folder}: {e!r}')
+        return e
+
+
+
+def publish_tree(root, course, jobs=4, overwrite=False, index=None, manifest=None, registry=None, processes=None):
+    """
+    publishes every container under `root` to `course`, `jobs` at a time.
+
+    Things happen in an order that's safe to do concurrently:
+
+    1. all modules and file destination folders get made, one at a time, so they're made only once.
+    2. the local images of all the pages and assignments get uploaded, each distinct image once.
+    3. the containers get published.  this is where the page bodies get edited, now that the images are up.
+
+    Items are added to modules in the order they finish publishing, so use `jobs=1` if the order of items in your modules matters.
 
-            items = module.get_module_items()
-            is_in = False
-            for item in items:
-                if item.type=='File' and item.content_id==content_id:
-                    is_in = True
+    A `CourseIndex` is made if you don't pass one.  If you pass a `Manifest`, unchanged containers are skipped, and the manifest is saved at the end.  If you pass an `AssetRegistry`, images are found by their contents, and it's saved at the end too.
 
-            if not is_in:
-                module.create_module_item(module_item={'type':'File', 'content_id':content_id})
+    Pass `processes` to render the pages and assignments that many at a time in separate processes first, with `render_many`.  Otherwise, they're rendered as they're needed, in this process.
 
+    Returns a dict from folder to exception, for the containers that failed to publish.  The others are published even if some fail.
 
-    def is_in_module(self, course, module_name):
-        file_on_canvas = self.is_already_uploaded(course)
+    See also `publish_tree_async`, for use from asyncio code.
+    """
+    from concurrent.futures import ThreadPoolExecutor
 
-        if not file_on_canvas:
-            return False
+    if index is None:
+        index = CourseIndex(course)
+
+    containers, images = _prepare_tree(root, course, jobs, index, manifest, registry, processes)
+
+    with ThreadPoolExecutor(max_workers=max(1,jobs)) as pool:
+        futures = {im.givenpath: pool.submit(im.publish, course, 'images', index=index, registry=registry) for im in images}
+
+    _log_image_failures({givenpath: future.exception() for givenpath, future in futures.items()})
+
+    with ThreadPoolExecutor(max_workers=max(1,jobs)) as pool:
+        futures = {c.folder: pool.submit(c.publish, course, **_publish_options(c, overwrite, index, manifest, registry)) for c in containers}
+
+    return _finish_tree({folder: future.exception() for folder, future in futures.items()}, manifest, registry)
+
+
+
+async def publish_tree_async(root, course, jobs=4, overwrite=False, index=None, manifest=None, registry=None, processes=None):
+    """
+    `publish_tree`, for asyncio.  `await` it from your event loop, and the loop stays free while the publishing happens, `jobs` calls to Canvas at a time.
+
+    the arguments and return value are the same as for `publish_tree`.
+    """
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+
+    loop = asyncio.get_running_loop()
+
+    with ThreadPoolExecutor(max_workers=max(1,jobs)) as pool:
+        run = lambda func, *args, **kwargs: loop.run_in_executor(pool, lambda: func(*args, **kwargs))
+
+        if index is None:
+            index = CourseIndex(course)
+
+        containers, images = await run(_prepare_tree, root, course, jobs, index, manifest, registry, processes)
+
+        results = await asyncio.gather(*[run(im.publish, course, 'images', index=index, registry=registry) for im in images], return_exceptions=True)
+        _log_image_failures({im.givenpath: _exception_or_none(r) for im, r in zip(images, results)})
+
+        results = await asyncio.gather(*[run(c.publish, course, **_publish_options(c, overwrite, index, manifest, registry)) for c in containers], return_exceptions=True)
+
+        return await run(_finish_tree, {c.folder: _exception_or_none(r) for c, r in zip(containers, results)}, manifest, registry)
+
+
+
+def _exception_or_none(result):
+    return result if isinstance(result, BaseException) else None
+
+
+
+def _prepare_tree(root, course, jobs, index, manifest, registry, processes=None):
+    """
+    the first part of `publish_tree`.  finds the containers to publish, makes their modules and folders, and returns the containers and the distinct images they use.
+    """
+    containers = [make_container(folder) for folder in find_containers(root)]
+
+    if manifest is not None:
+        containers = [c for c in containers if not manifest.is_unchanged(c)]
+
+    if processes is not None:
+        documents = [c for c in containers if isinstance(c, Document)]
+        for c, result in zip(documents, render_many([c.folder for c in documents], processes)):
+            if isinstance(result, RenderResult):
+                c.use_rendered(result)
+
+    logger.info(f'publishing {len(containers)} containers from {root} to course {course.id}, {jobs} at a time')
+
+    # 1. modules and folders
+    for c in containers:
+        for module_name in c.metadata.get('modules',[]):
+            create_or_get_module(module_name, course, index)
+
+        if isinstance(c, File):
+            create_or_get_folder(c.metadata['destination'], course, index)
+
+    # 2. images.  documents sharing an image (say, from a style) share one Image object.
+    #    images are the same if their contents are, or without a registry, if their name and size are, like in `find_file_in_course`.
+    if registry is not None:
+        same_image = lambda im: registry.hash(im.givenpath)
+    else:
+        same_image = lambda im: (im.name, path.getsize(im.givenpath))
+
+    images = {}
+    for c in containers:
+        if isinstance(c, Document):
+            for src, im in c.local_images.items():
+                c.local_images[src] = images.setdefault(same_image(im), im)
+
+    return containers, list(images.values())
+
+
+
+def _log_image_failures(exceptions):
+    """
+    images which failed to upload get another try when their document publishes, so they're just logged.
+    """
+    for givenpath, e in exceptions.items():
+        if e is not None:
+            logger.error(f'failed to upload image {givenpath}: {e!r}')
+
+
+
+def _publish_options(c, overwrite, index, manifest, registry):
+    """
+    the keyword arguments for `c.publish`, in `publish_tree`
+    """
+    options = {'overwrite': overwrite, 'index': index, 'manifest': manifest}
+    if isinstance(c, Document):
+        options['registry'] = registry
+    return options
+
+
+
+def _finish_tree(exceptions, manifest, registry):
+    """
+    the end of `publish_tree`.  saves things, and returns the failures.
+    """
+    failures = {}
+    for folder, e in exceptions.items():
+        if e is not None:
+            logger.error(f'failed to publish {folder}: {e!r}')
+            failures[folder] = e
+
+    if manifest is not None:
+        manifest.save()
+
+    if registry is not None:
+        registry.save()
+
+    return failures
+
+
+
+
+################## planning a publish, without doing it
+
+
+class Operation(object):
+    """
+    One thing publishing would do to Canvas.  See `plan`.
+
+    action -- 'create page', 'edit page', 'create assignment', 'edit assignment', 'upload image', 'upload file', 'create module', 'create folder', 'add module item', 'edit module item', or 'conflict', for something which would fail because it's already on Canvas and you're not overwriting
+    target -- the name of the thing
+    container -- the folder of the container it's for.  None for things shared by several, like modules
+    requests -- about how many requests to Canvas it takes
+    upload_bytes -- how many bytes it uploads
+    details -- a dict of anything else worth knowing, like which fields of an assignment get set
+    """
 
-        module = get_module(module_name,course)
+    def __init__(self, action, target, container=None, requests=1, upload_bytes=0, details=None):
+        super(Operation, self).__init__()
 
-        for item in module.get_module_items():
+        self.action = action
+        self.target = target
+        self.container = container
+        self.requests = requests
+        self.upload_bytes = upload_bytes
+        self.details = details or {}
 
-            if item.type=='File' and item.content_id==file_on_canvas.id:
-                return True
-            else:   
+    def __str__(self):
+        return f'{self.action}: {self.target}'
+
+    def __repr__(self):
+        return f'Operation({self.action!r}, {self.target!r}, {self.container!r})'
+
+    def to_dict(self):
+        return {'action': self.action, 'target': self.target, 'container': self.container, 'requests': self.requests, 'upload_bytes': self.upload_bytes, 'details': self.details}
+
+
+
+class Plan(object):
+    """
+    What publishing a folder of content would do, made by `plan`.
+
+    operations -- a list of `Operation`s, in about the order publishing does them
+    skipped -- folders of the containers which are unchanged, according to the manifest
+    """
+
+    def __init__(self):
+        super(Plan, self).__init__()
+
+        self.operations = []
+        self.skipped = []
+
+        self._planned = set() # modules, folders and images already in the plan
+
+
+    def add(self, operation):
+        self.operations.append(operation)
+
+
+    @property
+    def requests(self):
+        """
+        about how many requests to Canvas publishing takes, not counting listing what's in the course
+        """
+        return sum(op.requests for op in self.operations)
+
+    @property
+    def upload_bytes(self):
+        return sum(op.upload_bytes for op in self.operations)
+
+    @property
+    def conflicts(self):
+        return [op for op in self.operations if op.action == 'conflict']
+
+
+    def seconds_at_rate_limit(self, cost_per_request=1.0, refill_rate=None):
+        """
+        about how long the requests take if Canvas' rate limit is what slows them down.  `refill_rate` defaults to `rate_limit_refill_rate`.
+        """
+        return self.requests * cost_per_request / (refill_rate or rate_limit_refill_rate)
+
+
+    def summary(self):
+        """
+        a description of the plan, one line per operation, for people
+        """
+        lines = [str(op) for op in self.operations]
+        lines.append(f'{len(self.operations)} operations, about {self.requests} requests, {self.upload_bytes} bytes to upload, {len(self.conflicts)} conflicts, {len(self.skipped)} containers unchanged')
+        return '\n'.join(lines)
+
+
+    def to_dict(self):
+        return {'operations': [op.to_dict() for op in self.operations], 'skipped': self.skipped, 'requests': self.requests, 'upload_bytes': self.upload_bytes, 'conflicts': len(self.conflicts)}
+
+
+    # these are used by the containers' `_plan` methods
+
+    def module(self, module_name, index):
+        """
+        plans making module `module_name`, unless it exists or is already planned
+        """
+        if index.find_module(module_name) is None and ('module', module_name) not in self._planned:
+            self._planned.add(('module', module_name))
+            self.add(Operation('create module', module_name))
+
+
+    def module_item(self, module_name, index, item_type, **key):
+        """
+        the item in module `module_name` on Canvas, or None.  see `find_module_item`.
+        """
+        module = index.find_module(module_name)
+        if module is None:
+            return None # it'd be made by publishing
+        return find_module_item(module, item_type, index=index, **key)
+
+
+    def folder(self, folder_path, index):
+        """
+        plans making the folders along `folder_path` (relative to the course files) which don't exist
+        """
+        full_name = 'course files'
+        for part in folder_path.split('/'):
+            if not part:
                 continue
+            full_name = f'{full_name}/{part}'
+            if index.get_folder(full_name) is None and ('folder', full_name) not in self._planned:
+                self._planned.add(('folder', full_name))
+                self.add(Operation('create folder', full_name, requests=2))
 
-        return False
 
+    def image(self, image, course, index, registry, container):
+        """
+        plans uploading `image`, unless it's on Canvas or already planned.  images are the same like in `publish_tree`.
+        """
+        if registry is not None:
+            key = registry.hash(image.upload_path)
+            file_id = registry.file_ids.get(key)
+            on_canvas = file_id is not None and index.get_file_by_id(file_id) is not None
+        else:
+            key = (image.name, path.getsize(image.upload_path))
+            on_canvas = False
+
+        if ('image', key) in self._planned:
+            return
+        self._planned.add(('image', key))
 
-    def is_already_uploaded(self,course, require_same_path=True):
-        files = course.get_files()
+        if not on_canvas and find_file_in_course(image.upload_path, course, index) is None:
+            self.add(Operation('upload image', image.givenpath, container, requests=3, upload_bytes=path.getsize(image.upload_path)))
 
-        for f in files:
-            if f.filename == self.metadata['filename']:
 
-                if not require_same_path:
-                    return f
-                else:
-                    containing_folder = course.get_folder(f.folder_id)
-                    if containing_folder.full_name.startswith('course files') and containing_folder.full_name.endswith(self.metadata['destination']):
-                        return f
 
+def plan(root, course, overwrite=False, index=None, manifest=None, registry=None):
+    """
+    works out what `publish_tree(root, course, ...)` would do, without doing any of it, and returns it as a `Plan`.
+
+    The only requests to Canvas are listings of what's in the course, each done once, through `index` (a `CourseIndex` is made if you don't pass one).  Pass the same index to `publish_tree` afterwards, and it won't list things again.
 
-        return None
+    The request count is an estimate.  Things which fail and get retried take more.
+    """
+    if index is None:
+        index = CourseIndex(course)
+
+    the_plan = Plan()
 
+    for folder in find_containers(root):
+        c = make_container(folder)
 
+        if manifest is not None and manifest.is_unchanged(c):
+            the_plan.skipped.append(c.folder)
+            continue
 
+        c._plan(course, the_plan, overwrite, index, registry)
 
+    return the_plan
 
 
 
@@ -1032,60 +4174,412 @@ def page2markdown(destination, page, even_if_exists=False):
     the folder is automatically named, at your own peril.
     """
 
-    import os
+    import canvasapi.page
 
     assert(isinstance(page,canvasapi.page.Page))
 
-    if (path.exists(destination)) and not path.isdir(destination):
-        raise AlreadyExists(f'you want to save a page into directory {destination}, but it exists and is not a directory')
+    _check_download_destination(destination)
+
+    r = page.show_latest_revision()
+    return _save_downloaded_page(destination, r.title, r.body, even_if_exists) # r.body is the content of the page, in html.
 
 
 
+def _check_download_destination(destination):
+    if (path.exists(destination)) and not path.isdir(destination):
+        raise AlreadyExists(f'you want to save a page into directory {destination}, but it exists and is not a directory')
 
-    r = page.show_latest_revision()
-    body = r.body # this is the content of the page, in html.
-    title = r.title
 
+
+def _downloaded_page_folder(destination, title, even_if_exists):
     destdir = path.join(destination,title)
     if (not even_if_exists) and path.exists(destdir):
         raise AlreadyExists(f'trying to save page {title} to folder {destdir}, but that already exists.  If you want to force, use `even_if_exists=True`.')
+    return destdir
+
+
+
+def _save_downloaded_page(destination, title, body, even_if_exists, folder=None):
+    """
+    writes a downloaded page's html and meta.json to a folder in `destination`, named `folder`, or `title` by default.  returns the folder.
+    """
+    import os, json
+
+    destdir = _downloaded_page_folder(destination, title if folder is None else folder, even_if_exists)
 
     if not path.exists(destdir):
         os.makedirs(destdir)
 
-    logging.info(f'downloading page {title}, saving to folder {destdir}')
-
-    with open(path.join(destdir,'source.md'),'w') as file:
-        file.write(body)
+    logger.info(f'downloading page {title}, saving to folder {destdir}')
 
+    with open(path.join(destdir,'source.md'),'w',encoding='utf-8') as file:
+        file.write(body or '')
 
     d = {}
 
     d['name'] = title
     d['type'] = 'page'
-    with open(path.join(destdir,'meta.json'),'w') as file:
-        import json
+    with open(path.join(destdir,'meta.json'),'w',encoding='utf-8') as file:
         json.dump(d, file)
 
+    return destdir
+
 
 
 
-def download_pages(destination, course, even_if_exists=False, name_filter=None):
+def download_pages(destination, course, even_if_exists=False, name_filter=None, jobs=8, progress=None):
     """
     downloads the regular pages from a course, saving them
     into a markdown2canvas compatible format.  that is, as
     a folder with markdown source and json metadata.
+
+    the pages are listed `listing_page_size` at a time, and `name_filter` gets their titles from the listing.  then the bodies of the pages which pass the filter are fetched `jobs` at a time, and each one is saved as soon as it arrives.
+
+    `progress`, if given, is called as `progress(done, total, title)` after each page is saved.
+
+    returns the list of folders saved to, in the order they were saved.
     """
+    from concurrent.futures import ThreadPoolExecutor, as_completed
 
     if name_filter is None:
         name_filter = lambda x: True
 
-    logging.info(f'downloading all pages from course {course.name}, saving to folder {destination}')
-    pages = course.get_pages()
+    _check_download_destination(destination)
+
+    logger.info(f'downloading all pages from course {course.name}, saving to folder {destination}')
+    pages = [p for p in course.get_pages(per_page=listing_page_size) if name_filter(p.title)]
+
+    # fail before downloading anything, rather than part way through
+    titles = set()
     for p in pages:
-        if name_filter(p.show_latest_revision().title):
-            page2markdown(destination,p,even_if_exists)
+        _downloaded_page_folder(destination, p.title, even_if_exists)
+        if (not even_if_exists) and p.title in titles:
+            raise AlreadyExists(f'two pages are titled {p.title}, and would be saved to the same folder.  If you want the last one, use `even_if_exists=True`.')
+        titles.add(p.title)
+
+    saved = []
+    with ThreadPoolExecutor(max_workers=max(1,jobs)) as pool:
+        futures = [pool.submit(p.show_latest_revision) for p in pages]
+
+        try:
+            for future in as_completed(futures):
+                r = future.result()
+                saved.append(_save_downloaded_page(destination, r.title, r.body, even_if_exists=True))
+
+                if progress is not None:
+                    progress(len(saved), len(pages), r.title)
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+    logger.info(f'downloaded {len(saved)} pages from course {course.name}')
+    return saved
 
 
 def download_assignments(destination, course):
     assignments = course.get_assignments()
+
+
+
+
+################## keeping a local copy up to date
+
+
+class SyncState(_CourseRecord):
+    """
+    A record of each page pulled from a course by `sync_pages`: which folder it went to, its `updated_at` and revision id on Canvas, and a hash of the files written for it.
+
+    It lives in `destination/.markdown2canvas/sync.json`, which holds one section per course.  `sync_pages` saves it.
+
+    destination -- the folder the pages get saved into
+    course -- a canvasapi Course, or a course id
+    """
+
+    def __init__(self, destination, course):
+        super(SyncState, self).__init__(destination, course, 'sync.json') # entries are page url to entry
+
+        self.destination = self.root
+
+
+    def hash(self, folder):
+        """
+        the hash of the files for the page saved in `folder`, relative to the destination
+        """
+        destdir = path.join(self.destination, folder)
+        return hash_files([path.join(destdir,'source.md'), path.join(destdir,'meta.json')], self.destination)
+
+
+    def is_changed_locally(self, url):
+        """
+        True if the files for the page at `url` were edited (or deleted) since it was pulled
+        """
+        entry = self.entries[url]
+        return entry['hash'] != self.hash(entry['folder'])
+
+
+    def record(self, url, folder, title, updated_at, revision_id):
+        self.entries[url] = {'folder': folder, 'title': title, 'updated_at': updated_at, 'revision_id': revision_id, 'hash': self.hash(folder)}
+        self._dirty = True
+
+
+    def forget(self, url):
+        if self.entries.pop(url, None) is not None:
+            self._dirty = True
+
+
+
+
+class SyncReport(object):
+    """
+    what `sync_pages` did.  each attribute is a list of folders, relative to the destination, except `conflicts`, which is a dict from folder to the reason it wasn't pulled.
+
+    - `pulled` -- new or changed on Canvas, and saved
+    - `unchanged` -- the same on Canvas and locally as at the last sync.  not downloaded.
+    - `changed_locally` -- edited here, but not on Canvas.  left alone.
+    - `conflicts` -- changed both here and on Canvas, or in the way of a new page.  left alone.
+    - `deleted_remotely` -- pulled before, but not on Canvas any more.  left alone.
+    """
+
+    def __init__(self):
+        super(SyncReport, self).__init__()
+        self.pulled = []
+        self.unchanged = []
+        self.changed_locally = []
+        self.conflicts = {}
+        self.deleted_remotely = []
+
+
+    def summary(self):
+        """
+        a description of the sync, for people
+        """
+        lines = [f'conflict: {folder} ({reason})' for folder, reason in self.conflicts.items()]
+        lines += [f'deleted on Canvas: {folder}' for folder in self.deleted_remotely]
+        lines.append(f'{len(self.pulled)} pulled, {len(self.unchanged)} unchanged, {len(self.changed_locally)} changed locally, {len(self.conflicts)} conflicts, {len(self.deleted_remotely)} deleted on Canvas')
+        return '\n'.join(lines)
+
+
+    def to_dict(self):
+        return {'pulled': self.pulled, 'unchanged': self.unchanged, 'changed_locally': self.changed_locally, 'conflicts': self.conflicts, 'deleted_remotely': self.deleted_remotely}
+
+
+
+
+def sync_pages(destination, course, state=None, name_filter=None, overwrite_local=False, jobs=8, progress=None):
+    """
+    brings the pages saved in `destination` up to date with the course, downloading only what changed on Canvas since the last sync.
+
+    which pages changed is decided from the `updated_at` in the list of pages, against the ones recorded in `state`, a `SyncState` (one is made if not given, and saved either way).  pages which didn't change on Canvas aren't downloaded, and pages which changed both on Canvas and locally since the last sync are reported as conflicts and left alone, unless `overwrite_local`.  folders are named for the page title the first time a page is pulled, and keep their name after that.
+
+    `name_filter` and `progress` are as for `download_pages`.
+
+    returns a `SyncReport`.
+    """
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    if name_filter is None:
+        name_filter = lambda x: True
+
+    if state is None:
+        state = SyncState(destination, course)
+
+    _check_download_destination(destination)
+
+    report = SyncReport()
+    to_pull = [] # (listed page, folder)
+    folders = set()
+
+    listed = [p for p in course.get_pages(per_page=listing_page_size)]
+    for p in listed:
+        if not name_filter(p.title):
+            continue
+
+        entry = state.entries.get(p.url)
+
+        if entry is None:
+            folder = p.title
+            if path.exists(path.join(destination, folder)) and not overwrite_local:
+                report.conflicts[folder] = 'a folder with that name exists, but it was not pulled from this page'
+                continue
+            if folder in folders:
+                report.conflicts[folder] = 'more than one page has this title'
+                continue
+            folders.add(folder)
+            to_pull.append((p, folder))
+            continue
+
+        folder = entry['folder']
+        changed_locally = state.is_changed_locally(p.url)
+
+        if entry['updated_at'] == p.updated_at:
+            (report.changed_locally if changed_locally else report.unchanged).append(folder)
+        elif changed_locally and not overwrite_local:
+            report.conflicts[folder] = 'changed both locally and on Canvas since the last sync'
+        else:
+            to_pull.append((p, folder))
+
+    on_canvas = {p.url for p in listed}
+    for url, entry in state.entries.items():
+        if url not in on_canvas and name_filter(entry['title']):
+            report.deleted_remotely.append(entry['folder'])
+
+    logger.info(f'syncing pages from course {course.name} to folder {destination}: {len(to_pull)} to pull, {len(report.unchanged)} unchanged, {len(report.conflicts)} conflicts')
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1,jobs)) as pool:
+            futures = {pool.submit(p.show_latest_revision): (p, folder) for p, folder in to_pull}
+
+            try:
+                for future in as_completed(futures):
+                    p, folder = futures[future]
+                    r = future.result()
+
+                    _save_downloaded_page(destination, r.title, r.body, even_if_exists=True, folder=folder)
+                    state.record(p.url, folder, p.title, p.updated_at, getattr(r, 'revision_id', None))
+                    report.pulled.append(folder)
+
+                    if progress is not None:
+                        progress(len(report.pulled), len(to_pull), r.title)
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+    finally:
+        state.save()
+
+    return report
+
+
+
+
+################## command line
+
+
+def main(argv=None):
+    """
+    the `markdown2canvas` command.  run `markdown2canvas --help` for usage.
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(prog='markdown2canvas', description='publish markdown content containers to Canvas')
+    parser.add_argument('--url', default=None, help='url of your Canvas.  defaults to API_URL from your CANVAS_CREDENTIAL_FILE')
+    parser.add_argument('--log-file', default=None, help='log what happens to this file')
+    parser.add_argument('--cache-dir', default=None, help='keep rendered markdown and highlighted code in this folder, to skip rendering them again next time')
+    parser.add_argument('--optimize-images', action='store_true', help='upload smaller copies of images, without their metadata.  needs Pillow')
+    parser.add_argument('--max-image-width', type=int, default=1600, metavar='N', help='with --optimize-images, scale images down to at most this many pixels wide')
+    parser.add_argument('--report', default=None, help='save a json report of the requests made to Canvas to this file')
+    parser.add_argument('--profile-render', default=None, help='save the time spent in each stage of rendering each container to this file.  json if it ends in .json, otherwise folded stacks for flamegraph.pl')
+    parser.add_argument('--profile-memory', action='store_true', help='with --profile-render, measure the peak memory of each stage too.  slow.')
+
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    p = commands.add_parser('publish', help='publish every container under a folder')
+    p.add_argument('root', help='folder containing the content to publish')
+    p.add_argument('--course', type=int, required=True, help='id of the course to publish to')
+    p.add_argument('-j', '--jobs', type=int, default=4, help='how many things to publish at once')
+    p.add_argument('--overwrite', action='store_true', help='replace content which is already on Canvas')
+    p.add_argument('--no-manifest', action='store_true', help="publish everything, not just what changed since last time")
+    p.add_argument('-p', '--processes', type=int, default=None, help='render the pages and assignments first, this many at a time in separate processes')
+
+    p = commands.add_parser('plan', help="show what publishing would do, without doing it.  exits with 1 if there'd be conflicts")
+    p.add_argument('root', help='folder containing the content to publish')
+    p.add_argument('--course', type=int, required=True, help='id of the course to publish to')
+    p.add_argument('--overwrite', action='store_true', help='plan to replace content which is already on Canvas')
+    p.add_argument('--no-manifest', action='store_true', help="plan to publish everything, not just what changed since last time")
+    p.add_argument('--json', action='store_true', help='print the plan as json')
+
+    p = commands.add_parser('download', help="save a course's pages as containers")
+    p.add_argument('destination', help='folder to save the pages into')
+    p.add_argument('--course', type=int, required=True, help='id of the course to download from')
+    p.add_argument('-j', '--jobs', type=int, default=8, help='how many pages to download at once')
+    p.add_argument('--overwrite', action='store_true', help='replace folders which already exist')
+
+    p = commands.add_parser('sync', help="bring pages saved by an earlier sync up to date, downloading only what changed on Canvas.  exits with 1 if there are conflicts")
+    p.add_argument('destination', help='folder the pages are saved in')
+    p.add_argument('--course', type=int, required=True, help='id of the course to sync from')
+    p.add_argument('-j', '--jobs', type=int, default=8, help='how many pages to download at once')
+    p.add_argument('--overwrite-local', action='store_true', help='replace pages changed both locally and on Canvas with the version on Canvas')
+    p.add_argument('--json', action='store_true', help='print the report as json')
+
+    args = parser.parse_args(argv)
+
+    if args.log_file:
+        configure_logging(args.log_file)
+
+    if args.cache_dir:
+        use_render_cache(args.cache_dir)
+        use_highlight_cache(path.join(args.cache_dir, 'highlight'))
+
+    if args.optimize_images:
+        use_image_optimizer(args.max_image_width, directory=path.join(args.cache_dir, 'images') if args.cache_dir else None)
+
+    if args.report:
+        use_instrumentation()
+
+    if args.profile_render:
+        use_render_profiler(memory=args.profile_memory)
+
+    try:
+        canvas = make_canvas_api_obj(url=args.url)
+        course = canvas.get_course(args.course)
+
+        return _run_command(args, course)
+    finally:
+        if args.report:
+            instrumentation.to_json(args.report)
+
+        if args.profile_render:
+            if args.profile_render.endswith('.json'):
+                render_profiler.to_json(args.profile_render)
+            else:
+                render_profiler.to_folded(args.profile_render)
+
+
+
+def _run_command(args, course):
+    """
+    does what `main` was asked to
+    """
+    import sys
+
+    if args.command == 'publish':
+        manifest = None if args.no_manifest else Manifest(args.root, course)
+        registry = AssetRegistry(args.root, course)
+        failures = publish_tree(args.root, course, jobs=args.jobs, overwrite=args.overwrite, manifest=manifest, registry=registry, processes=args.processes)
+
+        for folder, e in failures.items():
+            print(f'failed to publish {folder}: {e}', file=sys.stderr)
+
+        return 1 if failures else 0
+
+    if args.command == 'plan':
+        import json
+
+        manifest = None if args.no_manifest else Manifest(args.root, course)
+        the_plan = plan(args.root, course, overwrite=args.overwrite, manifest=manifest, registry=AssetRegistry(args.root, course))
+
+        if args.json:
+            print(json.dumps(the_plan.to_dict(), indent=1))
+        else:
+            print(the_plan.summary())
+
+        return 1 if the_plan.conflicts else 0
+
+    if args.command == 'download':
+        progress = lambda done, total, title: print(f'[{done}/{total}] {title}', file=sys.stderr)
+        download_pages(args.destination, course, even_if_exists=args.overwrite, jobs=args.jobs, progress=progress)
+        return 0
+
+    if args.command == 'sync':
+        import json
+
+        progress = lambda done, total, title: print(f'[{done}/{total}] {title}', file=sys.stderr)
+        report = sync_pages(args.destination, course, overwrite_local=args.overwrite_local, jobs=args.jobs, progress=progress)
+
+        if args.json:
+            print(json.dumps(report.to_dict(), indent=1))
+        else:
+            print(report.summary())
+
+        return 1 if report.conflicts else 0
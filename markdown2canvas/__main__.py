@@ -0,0 +1,5 @@
+import sys
+
+from markdown2canvas import main
+
+sys.exit(main())
@@ -3,7 +3,7 @@ from setuptools import find_packages, setup
 EXCLUDE_FROM_PACKAGES = []
 
 
-extras = {}
+extras = {'images': ['Pillow']}
 
 setup(name='markdown2canvas',
       version='0.0',  # TODO make this set programmatically
@@ -15,4 +15,5 @@ setup(name='markdown2canvas',
       install_requires=['canvasapi','emoji','markdown', 'beautifulsoup4','Pygments'],
       extras_require=extras,
       package_dir={'markdown2canvas': 'markdown2canvas'},
+      entry_points={'console_scripts': ['markdown2canvas=markdown2canvas:main']},
       zip_safe=False)
@@ -0,0 +1,192 @@
+# times publishing and downloading made-up courses, against the fake Canvas in fake_canvas.py.
+#
+#   python benchmark.py                       # courses of 100, 1000 and 10000 containers
+#   python benchmark.py --sizes 100 --latency 0.02 --json results.json
+#   python benchmark.py --sizes 100 1000 --baseline results.json
+#
+# with --baseline, it exits with 1 if any step made more requests than it did in the baseline,
+# or took more than --tolerance longer, so it can catch regressions.
+
+import sys
+sys.path.insert(0,'../')
+import markdown2canvas as mc
+
+from fake_canvas import FakeCanvas
+
+
+containers_per_module = 20
+
+
+def png(n):
+	"""
+	the bytes of a tiny png, a different colour for each `n`
+	"""
+	import struct, zlib
+
+	def chunk(kind, data):
+		return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff)
+
+	pixel = bytes([n % 256, (n // 256) % 256, 128])
+	rows = b''.join(b'\0' + pixel*8 for _ in range(8))
+	return b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', struct.pack('>IIBBBBB', 8, 8, 8, 2, 0, 0, 0)) + chunk(b'IDAT', zlib.compress(rows)) + chunk(b'IEND', b'')
+
+
+
+def make_course(root, containers):
+	"""
+	writes a made-up course with `containers` containers into folder `root`.
+
+	for every 20 containers, there's a module holding 14 pages, 3 assignments, 2 files and a link.  every fourth page has a highlighted code block, and an image shared with a few other pages.
+	"""
+	import os, json
+
+	def write(filename, contents, meta):
+		os.makedirs(os.path.dirname(filename), exist_ok=True)
+		mode = 'wb' if isinstance(contents, bytes) else 'w'
+		with open(filename, mode, **({} if mode == 'wb' else {'encoding': 'utf-8'})) as f:
+			f.write(contents)
+		with open(os.path.join(os.path.dirname(filename),'meta.json'),'w',encoding='utf-8') as f:
+			json.dump(meta, f)
+
+	images = os.path.join(root,'_images')
+	os.makedirs(images, exist_ok=True)
+	for n in range(max(1, containers // 50)):
+		with open(os.path.join(images,f'image{n}.png'),'wb') as f:
+			f.write(png(n))
+
+	for i in range(containers):
+		module = f'Module {i // containers_per_module + 1}'
+		folder = os.path.join(root, f'module{i // containers_per_module + 1:04d}', f'{i:05d}')
+		kind = i % containers_per_module
+
+		if kind < 14:
+			source = f'# page {i}\n\nsome words about :smile: topic {i}, with $x^{i % 7}$ math.\n\n'
+			if kind % 4 == 0:
+				source += f'![image {i}](../../_images/image{(i // 4) % max(1, containers // 50)}.png)\n\n```python\ndef f(x):\n    return x**{i}\n```\n'
+			write(os.path.join(folder + '.page','source.md'), source, {'type': 'page', 'name': f'Page {i}', 'modules': [module]})
+		elif kind < 17:
+			write(os.path.join(folder + '.assignment','source.md'), f'# assignment {i}\n\ndo the thing.\n', {'type': 'assignment', 'name': f'Assignment {i}', 'points_possible': 10, 'modules': [module]})
+		elif kind < 19:
+			write(os.path.join(folder + '.file', f'handout{i}.txt'), f'handout {i}\n'*100, {'type': 'file', 'title': f'Handout {i}', 'filename': f'handout{i}.txt', 'destination': f'handouts/{module}', 'modules': [module]})
+		else:
+			write(os.path.join(folder + '.link','link.txt'), '', {'type': 'ExternalUrl', 'name': f'Link {i}', 'external_url': f'https://example.com/{i}', 'new_tab': 1, 'modules': [module]})
+
+
+
+def measure(fake, step, func):
+	"""
+	runs `func()`, and returns a dict of how long it took and how many requests it made
+	"""
+	import time
+
+	fake.reset_counts()
+	start = time.perf_counter()
+	result = func()
+	seconds = time.perf_counter() - start
+
+	requests = {}
+	for method, _ in fake.request_log:
+		requests[method] = requests.get(method, 0) + 1
+
+	print(f'  {step:<12} {seconds:8.2f}s  {fake.request_count:6d} requests  {requests}', flush=True)
+	return {'seconds': round(seconds, 3), 'requests': fake.request_count, 'by_method': requests}, result
+
+
+
+def run(containers, latency=0.0, rate_limit=None, jobs=8):
+	"""
+	publishes a made-up course of `containers` containers to a fake Canvas, publishes it again (nothing changed), then downloads and syncs its pages.  returns the measurements of each step.
+	"""
+	import os, shutil, tempfile
+
+	print(f'{containers} containers', flush=True)
+
+	here = os.getcwd()
+	root = tempfile.mkdtemp()
+	try:
+		content = os.path.join(root,'course')
+		make_course(content, containers)
+		os.chdir(content)
+
+		with FakeCanvas(latency=latency, rate_limit=rate_limit) as fake:
+			canvas = mc.throttle_canvas(fake.canvas(), mc.CanvasSession())
+			course = canvas.get_course(fake.add_course())
+
+			def publish():
+				manifest = mc.Manifest('.', course)
+				registry = mc.AssetRegistry('.', course)
+				return mc.publish_tree('.', course, jobs=jobs, overwrite=True, manifest=manifest, registry=registry)
+
+			results = {}
+			results['publish'], failures = measure(fake, 'publish', publish)
+			results['republish'], _ = measure(fake, 'republish', publish)
+			results['download'], _ = measure(fake, 'download', lambda: mc.download_pages(os.path.join(root,'downloaded'), course, jobs=jobs))
+			results['sync'], _ = measure(fake, 'sync', lambda: mc.sync_pages(os.path.join(root,'synced'), course, jobs=jobs))
+			results['resync'], _ = measure(fake, 'resync', lambda: mc.sync_pages(os.path.join(root,'synced'), course, jobs=jobs))
+
+			if failures:
+				print(f'  {len(failures)} containers failed to publish, like {next(iter(failures.values()))!r}', flush=True)
+			results['failures'] = len(failures)
+
+		return results
+	finally:
+		os.chdir(here)
+		shutil.rmtree(root)
+
+
+
+def regressions(results, baseline, tolerance):
+	"""
+	a list of descriptions of steps which made more requests, or took more than `tolerance` (a fraction) longer, than in `baseline`
+	"""
+	found = []
+	for size, steps in results.items():
+		for step, now in steps.items():
+			before = baseline.get(size, {}).get(step)
+			if not isinstance(now, dict) or before is None:
+				continue
+
+			if now['requests'] > before['requests']:
+				found.append(f'{size} containers, {step}: {now["requests"]} requests, up from {before["requests"]}')
+			if now['seconds'] > before['seconds'] * (1 + tolerance):
+				found.append(f'{size} containers, {step}: {now["seconds"]}s, up from {before["seconds"]}s')
+
+	return found
+
+
+
+def main(argv=None):
+	import argparse, json
+
+	parser = argparse.ArgumentParser(description='time publishing and downloading made-up courses, against a fake Canvas')
+	parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000], help='how many containers in each course')
+	parser.add_argument('--latency', type=float, default=0.0, help='seconds of delay the fake Canvas adds to every request')
+	parser.add_argument('--rate-limit', type=float, default=None, help="size of the fake Canvas's rate limit bucket.  by default, no limit")
+	parser.add_argument('-j', '--jobs', type=int, default=8, help='how many things to publish or download at once')
+	parser.add_argument('--json', default=None, help='save the results to this file')
+	parser.add_argument('--baseline', default=None, help='compare to results saved earlier with --json')
+	parser.add_argument('--tolerance', type=float, default=0.25, help='how much slower than the baseline is ok, as a fraction')
+	args = parser.parse_args(argv)
+
+	results = {str(n): run(n, latency=args.latency, rate_limit=args.rate_limit, jobs=args.jobs) for n in args.sizes}
+
+	if args.json:
+		with open(args.json,'w',encoding='utf-8') as f:
+			json.dump(results, f, indent=1)
+
+	failed = any(steps['failures'] for steps in results.values())
+
+	if args.baseline:
+		with open(args.baseline,'r',encoding='utf-8') as f:
+			found = regressions(results, json.load(f), args.tolerance)
+		for r in found:
+			print(f'regression: {r}')
+		failed = failed or bool(found)
+
+	return 1 if failed else 0
+
+
+
+
+if __name__ == '__main__':
+	sys.exit(main())
@@ -0,0 +1,657 @@
+# an in-process stand-in for the parts of the Canvas REST API that markdown2canvas uses.
+#
+# it keeps everything in memory, serves it over http on localhost, and counts requests,
+# so that the library can be exercised and benchmarked without a live Canvas instance.
+
+import json
+import re
+import threading
+import time
+import itertools
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeCourse(object):
+	"""
+	the in-memory state of one course on the fake server
+	"""
+
+	def __init__(self, course_id, name):
+		self.id = course_id
+		self.name = name
+		self.pages = {} # url -> dict
+		self.assignments = {} # id -> dict
+		self.files = {} # id -> dict
+		self.file_contents = {} # id -> the bytes uploaded
+		self.folders = {} # id -> dict
+		self.modules = {} # id -> dict
+		self.module_items = {} # module id -> list of dict
+		self.revisions = {} # page url -> int
+
+
+
+class FakeCanvas(object):
+	"""
+	a fake Canvas server.  use as a context manager, or call `start()` and `stop()`.
+
+	latency -- seconds of artificial delay added to every request
+	rate_limit -- size of the simulated request-cost bucket, or None for no rate limiting
+	refill_rate -- units per second the bucket refills at
+	request_cost -- cost charged to the bucket per request
+	max_per_page -- the most items a listing returns per page, whatever per_page asks for
+	port -- port to listen on.  by default, any free one
+	"""
+
+	def __init__(self, latency=0.0, rate_limit=None, refill_rate=10.0, request_cost=1.0, max_per_page=100, port=0):
+		self.latency = latency
+		self.rate_limit = rate_limit
+		self.refill_rate = refill_rate
+		self.request_cost = request_cost
+		self.max_per_page = max_per_page
+		self.port = port
+
+		self.courses = {}
+		self.uploads = {}
+
+		self.lock = threading.RLock()
+		self._ids = itertools.count(1000)
+
+		self.request_log = []
+		self.fail_next = [] # list of (method, path regex, status), consumed on match
+		self.fail_after_next = [] # same, but the request is carried out first, like the response got lost
+
+		self._bucket = rate_limit
+		self._bucket_time = time.monotonic()
+
+		self.server = None
+		self.thread = None
+
+	# --------- lifecycle
+
+	def start(self):
+		handler = type('Handler', (_Handler,), {'fake': self})
+		self.server = ThreadingHTTPServer(('127.0.0.1', self.port), handler)
+		self.server.daemon_threads = True
+		self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+		self.thread.start()
+		return self
+
+	def stop(self):
+		if self.server is not None:
+			self.server.shutdown()
+			self.server.server_close()
+			self.server = None
+
+	def __enter__(self):
+		return self.start()
+
+	def __exit__(self, *exc):
+		self.stop()
+
+	@property
+	def url(self):
+		host, port = self.server.server_address[:2]
+		return f'http://{host}:{port}'
+
+	def canvas(self):
+		"""
+		a `canvasapi.Canvas` pointed at this server
+		"""
+		import canvasapi
+		return canvasapi.Canvas(self.url, 'fake-key')
+
+	# --------- bookkeeping
+
+	def next_id(self):
+		return next(self._ids)
+
+	def add_course(self, name='Fake Course', course_id=None):
+		with self.lock:
+			course_id = course_id or self.next_id()
+			c = FakeCourse(course_id, name)
+			root = {'id': self.next_id(), 'name': 'course files', 'full_name': 'course files', 'parent_folder_id': None, 'context_id': course_id}
+			c.folders[root['id']] = root
+			self.courses[course_id] = c
+			return course_id
+
+	def reset_counts(self):
+		with self.lock:
+			self.request_log = []
+
+	@property
+	def request_count(self):
+		return len(self.request_log)
+
+	def count(self, method=None, pattern=None):
+		"""
+		counts logged requests, optionally filtering on method and a regex on the path
+		"""
+		n = 0
+		for m, p in self.request_log:
+			if method is not None and m != method:
+				continue
+			if pattern is not None and not re.search(pattern, p):
+				continue
+			n += 1
+		return n
+
+	def _charge(self):
+		"""
+		returns (allowed, remaining)
+		"""
+		if self.rate_limit is None:
+			return True, None
+
+		with self.lock:
+			now = time.monotonic()
+			self._bucket = min(self.rate_limit, self._bucket + (now - self._bucket_time) * self.refill_rate)
+			self._bucket_time = now
+
+			if self._bucket < self.request_cost:
+				return False, self._bucket
+
+			self._bucket -= self.request_cost
+			return True, self._bucket
+
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+	protocol_version = 'HTTP/1.1'
+	fake = None
+
+	def log_message(self, *args):
+		pass
+
+	def do_GET(self):
+		self._dispatch('GET')
+
+	def do_POST(self):
+		self._dispatch('POST')
+
+	def do_PUT(self):
+		self._dispatch('PUT')
+
+	def do_DELETE(self):
+		self._dispatch('DELETE')
+
+	# --------- plumbing
+
+	def _read_form(self):
+		n = int(self.headers.get('Content-Length') or 0)
+		raw = self.rfile.read(n) if n else b''
+		ctype = self.headers.get('Content-Type') or ''
+
+		if ctype.startswith('multipart/form-data'):
+			return _parse_multipart(raw, ctype)
+
+		return dict(urllib.parse.parse_qsl(raw.decode('utf-8'), keep_blank_values=True))
+
+	def _send(self, status, payload=None, headers=None, text=None):
+		if text is not None:
+			body = text.encode('utf-8')
+		else:
+			body = json.dumps(payload).encode('utf-8')
+
+		self.send_response(status)
+		self.send_header('Content-Type', 'application/json')
+		self.send_header('Content-Length', str(len(body)))
+		for k, v in (headers or {}).items():
+			self.send_header(k, v)
+		self.end_headers()
+		self.wfile.write(body)
+
+	def _dispatch(self, method):
+		fake = self.fake
+
+		parsed = urllib.parse.urlsplit(self.path)
+		path = parsed.path
+		query = dict(urllib.parse.parse_qsl(parsed.query, keep_blank_values=True))
+		form = self._read_form() if method in ('POST', 'PUT') else {}
+		form.update({k: v for k, v in query.items() if k not in form})
+
+		with fake.lock:
+			fake.request_log.append((method, path))
+
+		if fake.latency:
+			time.sleep(fake.latency)
+
+		allowed, remaining = fake._charge()
+		headers = {}
+		if remaining is not None:
+			headers['X-Rate-Limit-Remaining'] = f'{remaining:.1f}'
+			headers['X-Request-Cost'] = f'{fake.request_cost:.1f}'
+
+		if not allowed:
+			return self._send(403, text='403 Forbidden (Rate Limit Exceeded)', headers=headers)
+
+		with fake.lock:
+			failed = _consume_failure(fake.fail_next, method, path)
+			if failed is not None:
+				return self._send(failed, {'errors': [{'message': 'injected failure'}]}, headers)
+			lost = _consume_failure(fake.fail_after_next, method, path)
+
+		for m, regex, func in _ROUTES:
+			if m != method:
+				continue
+			match = re.fullmatch(regex, path)
+			if match:
+				try:
+					with fake.lock:
+						result = func(fake, self, form, *match.groups())
+				except KeyError:
+					return self._send(404, {'errors': [{'message': 'not found'}]}, headers)
+
+				status, payload = result[0], result[1]
+				if lost is not None:
+					return self._send(lost, {'errors': [{'message': 'injected failure, after doing it'}]}, headers)
+				if isinstance(payload, list):
+					payload, link = _paginate(self, payload, query, fake.max_per_page)
+					headers['Link'] = link
+				return self._send(status, payload, headers)
+
+		self._send(404, {'errors': [{'message': f'no route for {method} {path}'}]}, headers)
+
+
+
+def _consume_failure(failures, method, path):
+	"""
+	removes and returns the status of the first of `failures` matching the request, or returns None
+	"""
+	for i, (m, pattern, status) in enumerate(failures):
+		if m == method and re.search(pattern, path):
+			del failures[i]
+			return status
+	return None
+
+
+def _parse_multipart(raw, ctype):
+	from email.parser import BytesParser
+	from email.policy import HTTP
+
+	msg = BytesParser(policy=HTTP).parsebytes(b'Content-Type: ' + ctype.encode() + b'\r\n\r\n' + raw)
+	form = {}
+	for part in msg.iter_parts():
+		name = part.get_param('name', header='content-disposition')
+		filename = part.get_param('filename', header='content-disposition')
+		data = part.get_payload(decode=True)
+		if filename is not None:
+			form[name] = (filename, data)
+		else:
+			form[name] = data.decode('utf-8')
+	return form
+
+
+def _paginate(handler, items, query, max_per_page):
+	per_page = min(int(query.get('per_page', 10)), max_per_page)
+	page = int(query.get('page', 1))
+	start = (page-1)*per_page
+	chunk = items[start:start+per_page]
+
+	host = handler.headers.get('Host')
+	base = f'http://{host}{urllib.parse.urlsplit(handler.path).path}'
+
+	links = []
+	if start + per_page < len(items):
+		q = dict(query, page=page+1, per_page=per_page)
+		links.append(f'<{base}?{urllib.parse.urlencode(q)}>; rel="next"')
+	q = dict(query, page=1, per_page=per_page)
+	links.append(f'<{base}?{urllib.parse.urlencode(q)}>; rel="first"')
+	return chunk, ', '.join(links)
+
+
+def _now():
+	t = time.time()
+	return time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(t)) + f'.{int(t*1e6) % 1000000:06d}Z'
+
+
+def _slug(title):
+	s = re.sub(r'[^a-z0-9]+', '-', title.lower()).strip('-')
+	return s or 'page'
+
+
+# --------- routes.  each returns (status, payload).  lists get paginated.
+
+def _course(fake, h, form, cid):
+	c = fake.courses[int(cid)]
+	return 200, {'id': c.id, 'name': c.name}
+
+
+def _page_summary(p):
+	return {k: v for k, v in p.items() if k != 'body'}
+
+
+def _list_pages(fake, h, form, cid):
+	c = fake.courses[int(cid)]
+	return 200, [_page_summary(p) for p in c.pages.values()]
+
+
+def _create_page(fake, h, form, cid):
+	c = fake.courses[int(cid)]
+	title = form.get('wiki_page[title]', 'untitled')
+	url = _slug(title)
+	n = 1
+	while url in c.pages:
+		n += 1
+		url = f'{_slug(title)}-{n}'
+	p = {'page_id': fake.next_id(), 'url': url, 'title': title, 'body': form.get('wiki_page[body]', ''),
+		'created_at': _now(), 'updated_at': _now(), 'published': False}
+	c.pages[url] = p
+	c.revisions[url] = 1
+	return 200, dict(p)
+
+
+def _get_page(fake, h, form, cid, url):
+	c = fake.courses[int(cid)]
+	return 200, dict(c.pages[urllib.parse.unquote(url)])
+
+
+def _edit_page(fake, h, form, cid, url):
+	c = fake.courses[int(cid)]
+	p = c.pages[urllib.parse.unquote(url)]
+	for k, v in form.items():
+		m = re.fullmatch(r'wiki_page\[(\w+)\]', k)
+		if m:
+			p[m.group(1)] = v
+	p['updated_at'] = _now()
+	c.revisions[p['url']] += 1
+	return 200, dict(p)
+
+
+def _delete_page(fake, h, form, cid, url):
+	c = fake.courses[int(cid)]
+	p = c.pages.pop(urllib.parse.unquote(url))
+	return 200, p
+
+
+def _latest_revision(fake, h, form, cid, url):
+	c = fake.courses[int(cid)]
+	p = c.pages[urllib.parse.unquote(url)]
+	return 200, {'revision_id': c.revisions[p['url']], 'updated_at': p['updated_at'], 'latest': True,
+		'url': p['url'], 'title': p['title'], 'body': p['body']}
+
+
+def _list_assignments(fake, h, form, cid):
+	c = fake.courses[int(cid)]
+	return 200, [dict(a) for a in c.assignments.values()]
+
+
+def _create_assignment(fake, h, form, cid):
+	c = fake.courses[int(cid)]
+	a = {'id': fake.next_id(), 'name': form.get('assignment[name]', 'untitled'), 'description': '', 'course_id': c.id}
+	c.assignments[a['id']] = a
+	return 200, dict(a)
+
+
+def _get_assignment(fake, h, form, cid, aid):
+	c = fake.courses[int(cid)]
+	return 200, dict(c.assignments[int(aid)])
+
+
+def _edit_assignment(fake, h, form, cid, aid):
+	c = fake.courses[int(cid)]
+	a = c.assignments[int(aid)]
+	for k, v in form.items():
+		m = re.fullmatch(r'assignment\[(\w+)\](\[\])?', k)
+		if m:
+			a[m.group(1)] = v
+	return 200, dict(a)
+
+
+def _list_files(fake, h, form, cid):
+	c = fake.courses[int(cid)]
+	return 200, [dict(f) for f in c.files.values()]
+
+
+def _get_file(fake, h, form, cid, fid):
+	c = fake.courses[int(cid)]
+	return 200, dict(c.files[int(fid)])
+
+
+def _delete_file(fake, h, form, fid):
+	for c in fake.courses.values():
+		if int(fid) in c.files:
+			c.file_contents.pop(int(fid), None)
+			return 200, c.files.pop(int(fid))
+	raise KeyError(fid)
+
+
+def _folder_path(c, folder_path):
+	"""
+	finds or makes the folder at `folder_path`, relative to the course root
+	"""
+	root = [f for f in c.folders.values() if f['parent_folder_id'] is None][0]
+	curr = root
+	for part in [p for p in (folder_path or '').split('/') if p]:
+		found = [f for f in c.folders.values() if f['parent_folder_id'] == curr['id'] and f['name'] == part]
+		if found:
+			curr = found[0]
+		else:
+			curr = _new_folder(c, curr, part)
+	return curr
+
+
+def _new_folder(c, parent, name):
+	f = {'id': max(list(c.folders.keys()) + [0]) + 1 + 10**6, 'name': name, 'full_name': parent['full_name'] + '/' + name,
+		'parent_folder_id': parent['id'], 'context_id': c.id}
+	c.folders[f['id']] = f
+	return f
+
+
+def _request_upload(fake, c, folder, form):
+	token = str(fake.next_id())
+	fake.uploads[token] = (c.id, folder['id'], form.get('on_duplicate', 'overwrite'))
+	return 200, {'upload_url': f'http://{_host(fake)}/upload/{token}', 'upload_params': {'token': token}}
+
+
+def _host(fake):
+	host, port = fake.server.server_address[:2]
+	return f'{host}:{port}'
+
+
+def _course_upload(fake, h, form, cid):
+	c = fake.courses[int(cid)]
+	folder = _folder_path(c, form.get('parent_folder_path'))
+	return _request_upload(fake, c, folder, form)
+
+
+def _folder_upload(fake, h, form, fid):
+	for c in fake.courses.values():
+		if int(fid) in c.folders:
+			return _request_upload(fake, c, c.folders[int(fid)], form)
+	raise KeyError(fid)
+
+
+def _do_upload(fake, h, form, token):
+	cid, folder_id, on_duplicate = fake.uploads.pop(token)
+	c = fake.courses[cid]
+	filename, data = form['file']
+
+	existing = [f for f in c.files.values() if f['folder_id'] == folder_id and f['filename'] == filename]
+	if existing and on_duplicate == 'overwrite':
+		for f in existing:
+			del c.files[f['id']]
+			c.file_contents.pop(f['id'], None)
+	elif existing:
+		stem, dot, ext = filename.rpartition('.')
+		n = 1
+		names = {f['filename'] for f in c.files.values() if f['folder_id'] == folder_id}
+		while filename in names:
+			filename = f'{stem}-{n}.{ext}' if dot else f'{ext}-{n}'
+			n += 1
+
+	fid = fake.next_id()
+	f = {'id': fid, 'filename': filename, 'display_name': filename, 'size': len(data), 'folder_id': folder_id,
+		'url': f'http://{_host(fake)}/files/{fid}/download?download_frd=1', 'content-type': 'application/octet-stream'}
+	c.files[fid] = f
+	c.file_contents[fid] = data
+	return 201, dict(f)
+
+
+def _list_folders(fake, h, form, cid):
+	c = fake.courses[int(cid)]
+	return 200, [dict(f) for f in c.folders.values()]
+
+
+def _get_course_folder(fake, h, form, cid, fid):
+	c = fake.courses[int(cid)]
+	return 200, dict(c.folders[int(fid)])
+
+
+def _folder_files(fake, h, form, fid):
+	for c in fake.courses.values():
+		if int(fid) in c.folders:
+			return 200, [dict(f) for f in c.files.values() if f['folder_id'] == int(fid)]
+	raise KeyError(fid)
+
+
+def _subfolders(fake, h, form, fid):
+	for c in fake.courses.values():
+		if int(fid) in c.folders:
+			return 200, [dict(f) for f in c.folders.values() if f['parent_folder_id'] == int(fid)]
+	raise KeyError(fid)
+
+
+def _create_subfolder(fake, h, form, fid):
+	for c in fake.courses.values():
+		if int(fid) in c.folders:
+			return 200, dict(_new_folder(c, c.folders[int(fid)], form['name']))
+	raise KeyError(fid)
+
+
+def _create_course_folder(fake, h, form, cid):
+	c = fake.courses[int(cid)]
+	parent = _folder_path(c, form.get('parent_folder_path'))
+	return 200, dict(_new_folder(c, parent, form['name']))
+
+
+def _list_modules(fake, h, form, cid):
+	c = fake.courses[int(cid)]
+	return 200, [dict(m) for m in c.modules.values()]
+
+
+def _create_module(fake, h, form, cid):
+	c = fake.courses[int(cid)]
+	m = {'id': fake.next_id(), 'name': form.get('module[name]', 'untitled'), 'position': len(c.modules)+1}
+	c.modules[m['id']] = m
+	c.module_items[m['id']] = []
+	return 200, dict(m)
+
+
+def _delete_module(fake, h, form, cid, mid):
+	c = fake.courses[int(cid)]
+	m = c.modules.pop(int(mid))
+	del c.module_items[int(mid)]
+	return 200, m
+
+
+def _list_items(fake, h, form, cid, mid):
+	c = fake.courses[int(cid)]
+	return 200, [dict(i) for i in c.module_items[int(mid)]]
+
+
+def _create_item(fake, h, form, cid, mid):
+	c = fake.courses[int(cid)]
+	items = c.module_items[int(mid)]
+	kind = _ITEM_TYPES.get(form['module_item[type]'].lower(), form['module_item[type]'])
+
+	item = {'id': fake.next_id(), 'module_id': int(mid), 'type': kind, 'position': len(items)+1}
+	if kind == 'Page':
+		if 'module_item[page_url]' in form:
+			p = c.pages[form['module_item[page_url]']]
+		else:
+			p = [p for p in c.pages.values() if p['page_id'] == int(form['module_item[content_id]'])][0]
+		item.update(page_url=p['url'], title=p['title'])
+	elif kind == 'Assignment':
+		a = c.assignments[int(form['module_item[content_id]'])]
+		item.update(content_id=a['id'], title=a['name'])
+	elif kind == 'File':
+		f = c.files[int(form['module_item[content_id]'])]
+		item.update(content_id=f['id'], title=f['display_name'])
+	elif kind == 'ExternalUrl':
+		item.update(external_url=form['module_item[external_url]'], title=form.get('module_item[title]', ''),
+			new_tab=form.get('module_item[new_tab]') == 'true')
+	else:
+		item.update(title=form.get('module_item[title]', ''))
+
+	items.append(item)
+	return 200, dict(item)
+
+
+_ITEM_TYPES = {'page': 'Page', 'assignment': 'Assignment', 'file': 'File', 'externalurl': 'ExternalUrl', 'subheader': 'SubHeader'}
+
+
+def _edit_item(fake, h, form, cid, mid, iid):
+	c = fake.courses[int(cid)]
+	for item in c.module_items[int(mid)]:
+		if item['id'] == int(iid):
+			for k, v in form.items():
+				m = re.fullmatch(r'module_item\[(\w+)\]', k)
+				if m:
+					item[m.group(1)] = v
+			return 200, dict(item)
+	raise KeyError(iid)
+
+
+_C = r'/api/v1/courses/(\d+)'
+
+_ROUTES = [
+	('GET', _C, _course),
+	('GET', _C + r'/pages', _list_pages),
+	('POST', _C + r'/pages', _create_page),
+	('GET', _C + r'/pages/([^/]+)/revisions/latest', _latest_revision),
+	('GET', _C + r'/pages/([^/]+)', _get_page),
+	('PUT', _C + r'/pages/([^/]+)', _edit_page),
+	('DELETE', _C + r'/pages/([^/]+)', _delete_page),
+	('GET', _C + r'/assignments', _list_assignments),
+	('POST', _C + r'/assignments', _create_assignment),
+	('GET', _C + r'/assignments/(\d+)', _get_assignment),
+	('PUT', _C + r'/assignments/(\d+)', _edit_assignment),
+	('GET', _C + r'/files', _list_files),
+	('POST', _C + r'/files', _course_upload),
+	('GET', _C + r'/files/(\d+)', _get_file),
+	('DELETE', r'/api/v1/files/(\d+)', _delete_file),
+	('POST', r'/api/v1/folders/(\d+)/files', _folder_upload),
+	('POST', r'/upload/(\d+)', _do_upload),
+	('GET', _C + r'/folders', _list_folders),
+	('POST', _C + r'/folders', _create_course_folder),
+	('GET', _C + r'/folders/(\d+)', _get_course_folder),
+	('GET', r'/api/v1/folders/(\d+)/files', _folder_files),
+	('GET', r'/api/v1/folders/(\d+)/folders', _subfolders),
+	('POST', r'/api/v1/folders/(\d+)/folders', _create_subfolder),
+	('GET', _C + r'/modules', _list_modules),
+	('POST', _C + r'/modules', _create_module),
+	('DELETE', _C + r'/modules/(\d+)', _delete_module),
+	('GET', _C + r'/modules/(\d+)/items', _list_items),
+	('POST', _C + r'/modules/(\d+)/items', _create_item),
+	('PUT', _C + r'/modules/(\d+)/items/(\d+)', _edit_item),
+]
+
+
+
+
+if __name__ == '__main__':
+	# serves an empty fake course until interrupted, for trying things by hand:
+	#   python fake_canvas.py --latency 0.05 --rate-limit 700
+	# then point API_URL in your CANVAS_CREDENTIAL_FILE at the url it prints.
+	import argparse
+
+	parser = argparse.ArgumentParser(description='serve a fake Canvas on localhost')
+	parser.add_argument('--port', type=int, default=0, help='port to listen on.  by default, any free one')
+	parser.add_argument('--latency', type=float, default=0.0, help='seconds of delay added to every request')
+	parser.add_argument('--rate-limit', type=float, default=None, help='size of the rate limit bucket.  by default, no limit')
+	parser.add_argument('--refill-rate', type=float, default=10.0, help='how fast the rate limit bucket refills, per second')
+	args = parser.parse_args()
+
+	fake = FakeCanvas(latency=args.latency, rate_limit=args.rate_limit, refill_rate=args.refill_rate, port=args.port).start()
+	course_id = fake.add_course()
+
+	print(f'fake Canvas at {fake.url}, with course {course_id}.  ctrl-c to stop.', flush=True)
+	try:
+		while True:
+			time.sleep(3600)
+	except KeyboardInterrupt:
+		pass
+	finally:
+		fake.stop()
@@ -0,0 +1,119 @@
+
+import sys
+sys.path.insert(0,'../')
+import markdown2canvas as mc
+
+import unittest
+
+
+class FakeCourse(object):
+	"""
+	just enough of a canvasapi Course to upload files to, counting the uploads.
+	"""
+
+	def __init__(self):
+		self.id = 12345
+		self.files = {}
+		self.uploads = 0
+
+	def upload(self, filename, parent_folder_path, on_duplicate):
+		import os
+		from canvasapi.file import File
+
+		self.uploads += 1
+		file_id = 1000 + len(self.files)
+		self.files[file_id] = File(None, {'id': file_id, 'filename': os.path.basename(filename), 'size': os.path.getsize(filename), 'folder_id': 1, 'url': f'https://x.instructure.com/files/{file_id}/download'})
+		return True, {'id': file_id}
+
+	def get_file(self, file_id):
+		from canvasapi.exceptions import ResourceDoesNotExist
+
+		if file_id not in self.files:
+			raise ResourceDoesNotExist('Not Found')
+		return self.files[file_id]
+
+	def get_files(self):
+		return list(self.files.values())
+
+
+
+class AssetRegistryTester(unittest.TestCase):
+	"""
+	these tests use a pretend course, not Canvas.
+	"""
+
+	def setUp(self):
+		import os, shutil, tempfile
+
+		self.root = tempfile.mkdtemp()
+		self.image_name = os.path.join(self.root,'a.jpg')
+		shutil.copy(os.path.join('has_local_images','hauser_menagerie.jpg'), self.image_name)
+
+		# same contents, different name
+		self.copy_name = os.path.join(self.root,'b.jpg')
+		shutil.copy(self.image_name, self.copy_name)
+
+		self.course = FakeCourse()
+
+	def tearDown(self):
+		import shutil
+		shutil.rmtree(self.root)
+
+
+
+	def test_aaa_same_contents_uploaded_once(self):
+		registry = mc.AssetRegistry(self.root, self.course)
+
+		a = mc.Image(self.image_name)
+		b = mc.Image(self.copy_name)
+		a.publish(self.course, 'images', registry=registry)
+		b.publish(self.course, 'images', registry=registry)
+
+		self.assertEqual(self.course.uploads, 1)
+		self.assertIs(a.canvas_obj, b.canvas_obj)
+
+
+
+	def test_bbb_remembered_between_runs(self):
+		registry = mc.AssetRegistry(self.root, self.course)
+		mc.Image(self.image_name).publish(self.course, 'images', registry=registry)
+		registry.save()
+
+		again = mc.AssetRegistry(self.root, self.course)
+		mc.Image(self.copy_name).publish(self.course, 'images', registry=again)
+
+		self.assertEqual(self.course.uploads, 1)
+
+
+
+	def test_ccc_changed_contents_uploaded(self):
+		registry = mc.AssetRegistry(self.root, self.course)
+		mc.Image(self.image_name).publish(self.course, 'images', registry=registry)
+
+		with open(self.copy_name,'ab') as f:
+			f.write(b'\0')
+
+		mc.Image(self.copy_name).publish(self.course, 'images', registry=registry)
+
+		self.assertEqual(self.course.uploads, 2)
+
+
+
+	def test_ddd_deleted_on_canvas_uploaded_again(self):
+		registry = mc.AssetRegistry(self.root, self.course)
+		mc.Image(self.image_name).publish(self.course, 'images', registry=registry)
+		registry.save()
+
+		self.course.files.clear()
+
+		again = mc.AssetRegistry(self.root, self.course)
+		mc.Image(self.image_name).publish(self.course, 'images', registry=again)
+
+		self.assertEqual(self.course.uploads, 2)
+
+
+
+
+if __name__ == '__main__':
+    pgnm = 'this_argument_is_ignored_but_necessary'
+    unittest.main(argv=[pgnm], exit=False)
@@ -0,0 +1,79 @@
+
+import sys
+sys.path.insert(0,'../')
+import markdown2canvas as mc
+
+import unittest
+
+from fake_canvas import FakeCanvas
+
+
+class AsyncPublishTester(unittest.TestCase):
+	"""
+	publishes with asyncio, to a fake Canvas running on this computer.
+	"""
+
+	def setUp(self):
+		import os, shutil, tempfile
+
+		# work in a copy of the test folder, so results don't land in the repo
+		self.here = os.getcwd()
+		self.root = tempfile.mkdtemp()
+		self.folder = os.path.join(self.root,'test')
+		shutil.copytree(self.here, self.folder, ignore=shutil.ignore_patterns('__pycache__','.markdown2canvas'))
+		os.chdir(self.folder)
+
+		self.fake = FakeCanvas(latency=0.02).start()
+		self.course = self.fake.canvas().get_course(self.fake.add_course())
+
+	def tearDown(self):
+		import os, shutil
+
+		self.fake.stop()
+		os.chdir(self.here)
+		shutil.rmtree(self.root)
+
+
+
+	def test_aaa_apublish(self):
+		import asyncio
+
+		async def publish_both():
+			return await asyncio.gather(mc.Page('plain_text').apublish(self.course, overwrite=True), mc.Page('has_remote_images').apublish(self.course, overwrite=True))
+
+		asyncio.run(publish_both())
+
+		self.assertTrue(mc.is_page_already_uploaded('Test Plain Text', self.course))
+		self.assertTrue(mc.is_page_already_uploaded(mc.Page('has_remote_images').name, self.course))
+
+
+
+	def test_bbb_publish_tree_async(self):
+		import asyncio
+
+		failures = asyncio.run(mc.publish_tree_async('.', self.course, jobs=8, overwrite=True))
+		self.assertEqual(failures, {})
+
+		fake_course = self.fake.courses[self.course.id]
+		self.assertEqual(len(fake_course.pages), 6)
+		self.assertEqual(len(fake_course.assignments), 1)
+
+		# the images got uploaded, and the pages point at them
+		self.assertNotIn('hauser_menagerie.jpg"', fake_course.pages['test-has-local-images']['body'])
+
+
+
+	def test_ccc_failures_are_returned(self):
+		import asyncio
+
+		self.fake.fail_next.append(('PUT', r'/pages/test-plain-text$', 500))
+
+		failures = asyncio.run(mc.publish_tree_async('.', self.course, jobs=8, overwrite=True))
+		self.assertEqual(list(failures), ['./plain_text'])
+
+
+
+
+if __name__ == '__main__':
+    pgnm = 'this_argument_is_ignored_but_necessary'
+    unittest.main(argv=[pgnm], exit=False)
@@ -0,0 +1,70 @@
+
+import sys
+sys.path.insert(0,'../')
+import markdown2canvas as mc
+
+import unittest
+
+
+class CourseIndexTester(unittest.TestCase):
+	@classmethod
+	def setUpClass(self):
+		import os
+
+		from course_id import test_course_id
+		from canvas_url import canvas_url
+		self.canvas = mc.make_canvas_api_obj(url=canvas_url)
+		self.course = self.canvas.get_course(test_course_id)
+
+		self.folder = 'plain_text_in_a_module'
+		self.page = mc.Page(self.folder)
+
+		self.index = mc.CourseIndex(self.course)
+
+	@classmethod
+	def tearDownClass(self):
+		pass
+
+
+
+	def test_aaa_can_publish_with_index(self):
+		self.page.publish(self.course,overwrite=True,index=self.index)
+		self.assertTrue(mc.is_page_already_uploaded(self.page.name,self.course,self.index))
+
+		for m in self.page.modules:
+			self.assertIsNotNone(self.index.find_module(m))
+
+
+
+	def test_bbb_index_agrees_with_course(self):
+		self.page.publish(self.course,overwrite=True,index=self.index)
+
+		from_index = mc.find_page_in_course(self.page.name,self.course,self.index)
+		from_course = mc.find_page_in_course(self.page.name,self.course)
+		self.assertEqual(from_index.url, from_course.url)
+
+
+
+	def test_ccc_already_online_raises(self):
+		self.page.publish(self.course,overwrite=True,index=self.index)
+
+		with self.assertRaises(mc.AlreadyExists):
+			self.page.publish(self.course,overwrite=False,index=self.index)
+
+
+
+	def test_ddd_doesnt_find_deleted(self):
+		self.page.publish(self.course,overwrite=True,index=self.index)
+
+		p = mc.find_page_in_course(self.page.name,self.course,self.index)
+		p.delete()
+		self.index.remove_page(p)
+
+		self.assertFalse(mc.is_page_already_uploaded(self.page.name,self.course,self.index))
+
+
+
+
+if __name__ == '__main__':
+    pgnm = 'this_argument_is_ignored_but_necessary'
+    unittest.main(argv=[pgnm], exit=False)
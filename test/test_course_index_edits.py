@@ -0,0 +1,68 @@
+
+import sys
+sys.path.insert(0,'../')
+import markdown2canvas as mc
+
+import unittest
+
+from fake_canvas import FakeCanvas
+
+
+class CourseIndexEditsTester(unittest.TestCase):
+	"""
+	the index follows things which are edited on Canvas.  these tests use a fake Canvas running on this computer.
+	"""
+
+	def setUp(self):
+		import warnings
+		warnings.filterwarnings('ignore', message='Canvas may respond unexpectedly')
+
+		self.fake = FakeCanvas().start()
+		canvas = mc.throttle_canvas(self.fake.canvas(), mc.CanvasSession())
+		self.course = canvas.get_course(self.fake.add_course())
+
+	def tearDown(self):
+		self.fake.stop()
+
+
+
+	def test_aaa_renamed_page(self):
+		self.course.create_page(wiki_page={'title': 'Another Page'})
+		index = mc.CourseIndex(self.course)
+
+		page = mc.create_or_get_page('Old Title', self.course, even_if_exists=False, index=index)
+		self.assertIs(index.find_page('Old Title'), page)
+
+		# editing changes the page object itself, and it's given to the index again
+		page.edit(wiki_page={'title': 'New Title'})
+		index.add_page(page)
+
+		self.assertIsNone(index.find_page('Old Title'))
+		self.assertIs(index.find_page('New Title'), page)
+		self.assertIsNotNone(index.find_page('Another Page'))
+
+		index.remove_page(page)
+		self.assertIsNone(index.find_page('New Title'))
+		self.assertIsNotNone(index.find_page('Another Page'))
+
+
+
+	def test_bbb_renamed_assignment(self):
+		index = mc.CourseIndex(self.course)
+
+		assignment = mc.create_or_get_assignment('Old Name', self.course, index=index)
+		self.assertIs(index.find_assignment('Old Name'), assignment)
+
+		assignment.edit(assignment={'name': 'New Name'})
+		index.add_assignment(assignment)
+
+		self.assertIsNone(index.find_assignment('Old Name'))
+		self.assertIs(index.find_assignment('New Name'), assignment)
+		self.assertIs(index.get_assignment_by_id(assignment.id), assignment)
+
+
+
+
+if __name__ == '__main__':
+    pgnm = 'this_argument_is_ignored_but_necessary'
+    unittest.main(argv=[pgnm], exit=False)
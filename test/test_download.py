@@ -0,0 +1,92 @@
+
+import sys
+sys.path.insert(0,'../')
+import markdown2canvas as mc
+
+import unittest
+
+from fake_canvas import FakeCanvas
+
+
+class DownloadPagesTester(unittest.TestCase):
+	"""
+	downloads from a fake Canvas running on this computer.
+	"""
+
+	def setUp(self):
+		import os, tempfile, warnings
+		warnings.filterwarnings('ignore', message='Canvas may respond unexpectedly')
+
+		self.root = tempfile.mkdtemp()
+		self.destination = os.path.join(self.root,'downloaded')
+
+		self.fake = FakeCanvas().start()
+		canvas = mc.throttle_canvas(self.fake.canvas(), mc.CanvasSession())
+		self.course = canvas.get_course(self.fake.add_course())
+
+		for n in range(30):
+			title = f'test page {n}' if n % 3 else f'other page {n}'
+			self.course.create_page(wiki_page={'title': title, 'body': f'<p>body of {title} :smile:</p>'})
+
+		self.fake.reset_counts()
+
+	def tearDown(self):
+		import shutil
+
+		self.fake.stop()
+		shutil.rmtree(self.root)
+
+
+
+	def test_aaa_downloads_each_page_once(self):
+		import os, json
+
+		reported = []
+		saved = mc.download_pages(self.destination, self.course, jobs=4, progress=lambda *args: reported.append(args))
+
+		self.assertEqual(len(saved), 30)
+		self.assertEqual(sorted(os.listdir(self.destination)), sorted(os.path.basename(s) for s in saved))
+		self.assertEqual([r[:2] for r in reported], [(n,30) for n in range(1,31)])
+
+		# one listing, and one fetch of each body
+		self.assertEqual(self.fake.count('GET', r'/pages$'), 1)
+		self.assertEqual(self.fake.count('GET', r'/revisions/latest$'), 30)
+		self.assertEqual(self.fake.request_count, 31 + self.fake.count('GET', r'/courses/\d+$'))
+
+		with open(os.path.join(self.destination,'test page 1','source.md'),encoding='utf-8') as f:
+			self.assertEqual(f.read(), '<p>body of test page 1 :smile:</p>')
+		with open(os.path.join(self.destination,'test page 1','meta.json'),encoding='utf-8') as f:
+			self.assertEqual(json.load(f), {'name': 'test page 1', 'type': 'page'})
+
+
+
+	def test_bbb_filter_doesnt_fetch_bodies(self):
+		import os
+
+		saved = mc.download_pages(self.destination, self.course, name_filter=lambda title: 'test' in title)
+
+		self.assertEqual(len(saved), 20)
+		self.assertEqual(self.fake.count('GET', r'/revisions/latest$'), 20)
+		self.assertTrue(all(name.startswith('test') for name in os.listdir(self.destination)))
+
+
+
+	def test_ccc_existing_folders_fail_before_downloading(self):
+		import os
+
+		os.makedirs(os.path.join(self.destination,'test page 1'))
+
+		with self.assertRaises(mc.AlreadyExists):
+			mc.download_pages(self.destination, self.course)
+
+		self.assertEqual(self.fake.count('GET', r'/revisions/latest$'), 0)
+
+		saved = mc.download_pages(self.destination, self.course, even_if_exists=True)
+		self.assertEqual(len(saved), 30)
+
+
+
+
+if __name__ == '__main__':
+    pgnm = 'this_argument_is_ignored_but_necessary'
+    unittest.main(argv=[pgnm], exit=False)
@@ -0,0 +1,91 @@
+
+import sys
+sys.path.insert(0,'../')
+import markdown2canvas as mc
+
+import unittest
+
+from fake_canvas import FakeCanvas
+from benchmark import make_course
+
+
+class EndToEndTester(unittest.TestCase):
+	"""
+	publishes a small made-up course (see benchmark.py) to a rate limited fake Canvas running on this computer, and downloads it again.
+	"""
+
+	def setUp(self):
+		import os, tempfile, warnings
+		warnings.filterwarnings('ignore', message='Canvas may respond unexpectedly')
+
+		self.here = os.getcwd()
+		self.root = tempfile.mkdtemp()
+		self.content = os.path.join(self.root,'course')
+		make_course(self.content, 60)
+		os.chdir(self.content)
+
+		self.fake = FakeCanvas(latency=0.002, rate_limit=700, refill_rate=100).start()
+		canvas = mc.throttle_canvas(self.fake.canvas(), mc.CanvasSession())
+		self.course = canvas.get_course(self.fake.add_course())
+		self.fake_course = self.fake.courses[self.course.id]
+
+	def tearDown(self):
+		import os, shutil
+
+		self.fake.stop()
+		os.chdir(self.here)
+		shutil.rmtree(self.root)
+
+
+	def publish(self):
+		manifest = mc.Manifest('.', self.course)
+		registry = mc.AssetRegistry('.', self.course)
+		return mc.publish_tree('.', self.course, jobs=8, overwrite=True, manifest=manifest, registry=registry)
+
+
+
+	def test_aaa_publish_everything(self):
+		self.assertEqual(self.publish(), {})
+
+		c = self.fake_course
+		self.assertEqual(len(c.pages), 42)
+		self.assertEqual(len(c.assignments), 9)
+		self.assertEqual(len(c.modules), 3)
+		self.assertEqual(sorted(len(items) for items in c.module_items.values()), [20, 20, 20])
+
+		# 6 handouts, and the one image the made-up course has
+		self.assertEqual(len(c.files), 7)
+		self.assertEqual(sum(f['full_name'].startswith('course files/handouts/') for f in c.folders.values()), 3)
+
+		with_image = [p for p in c.pages.values() if '<img' in p['body']]
+		self.assertEqual(len(with_image), 12)
+		self.assertTrue(all('codehilite' in p['body'] for p in with_image))
+
+
+
+	def test_bbb_republish_makes_no_requests(self):
+		self.publish()
+
+		self.fake.reset_counts()
+		self.assertEqual(self.publish(), {})
+		self.assertEqual(self.fake.request_count, 0)
+
+
+
+	def test_ccc_download_what_was_published(self):
+		import os
+
+		self.publish()
+
+		saved = mc.download_pages(os.path.join(self.root,'downloaded'), self.course)
+		self.assertEqual(sorted(os.path.basename(s) for s in saved), sorted(f'Page {i}' for i in range(60) if i % 20 < 14))
+
+		report = mc.sync_pages(os.path.join(self.root,'synced'), self.course)
+		self.assertEqual(len(report.pulled), 42)
+
+
+
+
+if __name__ == '__main__':
+    pgnm = 'this_argument_is_ignored_but_necessary'
+    unittest.main(argv=[pgnm], exit=False)
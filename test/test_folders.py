@@ -0,0 +1,123 @@
+
+import sys
+sys.path.insert(0,'../')
+import markdown2canvas as mc
+
+import unittest
+
+from fake_canvas import FakeCanvas
+
+
+class FolderTester(unittest.TestCase):
+	"""
+	talks to a fake Canvas running on this computer, and counts how it gets asked about folders (and modules).
+	"""
+
+	def setUp(self):
+		import os, json, shutil, tempfile, warnings
+		warnings.filterwarnings('ignore', message='Canvas may respond unexpectedly')
+
+		self.here = os.getcwd()
+		self.root = tempfile.mkdtemp()
+
+		# several files, in a few nested destinations which share folders
+		self.destinations = ['handouts', 'handouts/week1', 'handouts/week1/extra', 'handouts/week2', 'solutions/week1']
+		self.folders = []
+		for n, destination in enumerate(self.destinations * 2):
+			folder = os.path.join(self.root, f'file{n}.file')
+			shutil.copytree('a_file.file', folder)
+			with open(os.path.join(folder,'meta.json'),'r',encoding='utf-8') as f:
+				meta = json.load(f)
+			meta.update({'destination': destination, 'modules': [], 'title': f'file {n}'})
+			with open(os.path.join(folder,'meta.json'),'w',encoding='utf-8') as f:
+				json.dump(meta, f)
+			self.folders.append(folder)
+		os.chdir(self.root)
+
+		self.fake = FakeCanvas().start()
+		canvas = mc.throttle_canvas(self.fake.canvas(), mc.CanvasSession())
+		self.course = canvas.get_course(self.fake.add_course())
+		self.fake_course = self.fake.courses[self.course.id]
+
+	def tearDown(self):
+		import os, shutil
+
+		self.fake.stop()
+		os.chdir(self.here)
+		shutil.rmtree(self.root)
+
+
+	def folder_lookups(self):
+		return self.fake.count('GET', r'/folders/\d+/folders$') + self.fake.count('GET', r'/folders/\d+$')
+
+
+
+	def test_aaa_folders_are_looked_up_in_the_index(self):
+		index = mc.CourseIndex(self.course)
+
+		for folder in self.folders:
+			mc.File(folder).publish(self.course, overwrite=True, index=index)
+
+		self.assertEqual(self.folder_lookups(), 0)
+		self.assertEqual(self.fake.count('GET', r'/courses/\d+/folders$'), 1)
+
+		# each folder got made once
+		names = sorted(f['full_name'] for f in self.fake_course.folders.values())
+		self.assertEqual(names, ['course files', 'course files/handouts', 'course files/handouts/week1', 'course files/handouts/week1/extra', 'course files/handouts/week2', 'course files/solutions', 'course files/solutions/week1'])
+
+		# and each file landed in its own destination
+		by_id = self.fake_course.folders
+		for n, destination in enumerate(self.destinations * 2):
+			found = mc.File(self.folders[n]).is_already_uploaded(self.course, index=index)
+			self.assertEqual(by_id[found.folder_id]['full_name'], 'course files/' + destination)
+
+
+
+	def test_bbb_existing_folders_are_found_by_path(self):
+		index = mc.CourseIndex(self.course)
+		made = mc.create_or_get_folder('handouts/week1/extra', self.course, index)
+
+		self.fake.reset_counts()
+		found = mc.create_or_get_folder('/handouts/week1/extra/', self.course, index)
+
+		self.assertEqual(found.id, made.id)
+		self.assertEqual(self.fake.request_count, 0)
+
+
+
+	def test_ccc_without_an_index_folders_are_listed_once(self):
+		file = mc.File(self.folders[2])
+		file.publish(self.course, overwrite=True)
+
+		self.fake.reset_counts()
+		self.assertIsNotNone(file.is_already_uploaded(self.course))
+		self.assertEqual(self.folder_lookups(), 0)
+		self.assertEqual(self.fake.count('GET', r'/courses/\d+/folders$'), 1)
+
+
+
+	def test_ddd_publish_without_an_index_lists_once(self):
+		import os, shutil
+
+		# a new file, so it's looked for, its folders made, and it's uploaded
+		self.fake.reset_counts()
+		mc.File(self.folders[2]).publish(self.course)
+		self.assertEqual(self.fake.count('GET', r'/courses/\d+/folders$'), 1)
+		self.assertEqual(self.fake.count('GET', r'/courses/\d+/files$'), 1)
+
+		# and a link, which is looked for in its module, then added to it
+		shutil.copytree(os.path.join(self.here,'a_link.link'), 'a_link.link')
+		link = mc.Link('a_link.link')
+		mc.create_or_get_module(link.metadata['modules'][0], self.course)
+
+		self.fake.reset_counts()
+		link.publish(self.course)
+		self.assertEqual(self.fake.count('GET', r'/modules$'), 1)
+		self.assertEqual(self.fake.count('GET', r'/modules/\d+/items$'), 1)
+
+
+
+
+if __name__ == '__main__':
+    pgnm = 'this_argument_is_ignored_but_necessary'
+    unittest.main(argv=[pgnm], exit=False)
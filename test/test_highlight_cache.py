@@ -0,0 +1,109 @@
+
+import sys
+sys.path.insert(0,'../')
+import markdown2canvas as mc
+
+import unittest
+
+
+class HighlightCacheTester(unittest.TestCase):
+	"""
+	highlighted code blocks are kept on disk.  these tests don't talk to Canvas.
+	"""
+
+	def setUp(self):
+		import os, tempfile
+
+		self.root = tempfile.mkdtemp()
+		self.cache = mc.use_highlight_cache(os.path.join(self.root,'highlight'))
+
+		self.source = '# starter code\n\n```python\ndef f(x):\n    return x**2\n```\n\n    :::c\n    int main() { return 0; }\n'
+
+	def tearDown(self):
+		import shutil
+
+		mc.use_highlight_cache(False)
+		shutil.rmtree(self.root)
+
+
+	def count_highlights(self):
+		"""
+		counts calls to pygments' `highlight`, as used by codehilite
+		"""
+		import markdown.extensions.codehilite as codehilite
+
+		calls = []
+		original = codehilite.highlight
+
+		def counting(*args, **kwargs):
+			calls.append(args[0])
+			return original(*args, **kwargs)
+
+		codehilite.highlight = counting
+		self.addCleanup(setattr, codehilite, 'highlight', original)
+		return calls
+
+
+
+	def test_aaa_same_html_as_without(self):
+		mc.use_highlight_cache(False)
+		expected = mc.render_markdown_source(self.source.encode('utf-8'))
+
+		self.cache = mc.use_highlight_cache(self.cache.directory)
+		self.assertEqual(mc.render_markdown_source(self.source.encode('utf-8')), expected)
+		self.assertEqual(mc.render_markdown_source(self.source.encode('utf-8')), expected)
+		self.assertEqual(len(list(self.cache._entries())), 2)
+
+
+
+	def test_bbb_repeated_snippets_arent_highlighted_again(self):
+		calls = self.count_highlights()
+
+		mc.render_markdown_source(self.source.encode('utf-8'))
+		self.assertEqual(len(calls), 2)
+
+		# the same snippet in another document, or in another run
+		mc.render_markdown_source(('# another page\n\n' + self.source).encode('utf-8'))
+		mc.use_highlight_cache(self.cache.directory)
+		mc.render_markdown_source(self.source.encode('utf-8'))
+		self.assertEqual(len(calls), 2)
+
+
+
+	def test_ccc_language_and_options_are_part_of_the_key(self):
+		calls = self.count_highlights()
+
+		mc.render_markdown_source(b'```python\nx = 1\n```\n')
+		mc.render_markdown_source(b'```ruby\nx = 1\n```\n')
+		mc.render_markdown_source(b'```python\nx = 1\n```\n', extension_configs={'codehilite': {'linenums': True}})
+		self.assertEqual(len(calls), 3)
+
+		mc.render_markdown_source(b'```python\nx = 1\n```\n')
+		self.assertEqual(len(calls), 3)
+
+
+
+	def test_ddd_other_markdown_users_are_left_alone(self):
+		import markdown
+		import markdown.extensions.codehilite as codehilite
+
+		calls = self.count_highlights()
+
+		# someone else's Markdown, while the cache is on, doesn't use it
+		theirs = markdown.Markdown(extensions=['codehilite','fenced_code'])
+		theirs.convert(self.source)
+		theirs.reset().convert(self.source)
+		self.assertEqual(len(calls), 4)
+		self.assertEqual(len(list(self.cache._entries())), 0)
+
+		# and turning the cache off puts the original CodeHilite back
+		mc.use_highlight_cache(False)
+		self.assertIs(codehilite.CodeHilite, mc._cached_code_hilite.__bases__[0])
+		self.assertEqual(mc.render_markdown_source(self.source.encode('utf-8')), theirs.reset().convert(self.source))
+
+
+
+
+if __name__ == '__main__':
+    pgnm = 'this_argument_is_ignored_but_necessary'
+    unittest.main(argv=[pgnm], exit=False)
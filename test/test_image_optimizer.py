@@ -0,0 +1,196 @@
+
+import sys
+sys.path.insert(0,'../')
+import markdown2canvas as mc
+
+import unittest
+
+try:
+	import PIL
+	have_pillow = True
+except ImportError:
+	have_pillow = False
+
+
+@unittest.skipUnless(have_pillow, 'optimizing images needs Pillow')
+class ImageOptimizerTester(unittest.TestCase):
+	"""
+	uploads smaller copies of images.  these tests don't talk to Canvas, except the last three, which use the fake one.
+	"""
+
+	def setUp(self):
+		import os, shutil, tempfile
+
+		self.here = os.getcwd()
+		self.root = tempfile.mkdtemp()
+		for folder in ['has_local_images']:
+			shutil.copytree(folder, os.path.join(self.root, folder))
+		os.chdir(self.root)
+
+		self.photo = os.path.join('has_local_images','hauser_menagerie.jpg')
+		self.optimizer = mc.use_image_optimizer(directory=os.path.join(self.root,'images'))
+
+	def tearDown(self):
+		import os, shutil
+
+		mc.use_image_optimizer(False)
+		os.chdir(self.here)
+		shutil.rmtree(self.root)
+
+
+
+	def test_aaa_smaller_and_without_metadata(self):
+		import os
+		from PIL import Image
+
+		smaller = mc.Image(self.photo).upload_path
+
+		self.assertNotEqual(smaller, self.photo)
+		self.assertEqual(os.path.basename(smaller), 'hauser_menagerie.jpg')
+		self.assertLess(os.path.getsize(smaller), os.path.getsize(self.photo))
+
+		with Image.open(smaller) as im:
+			self.assertEqual(im.width, 1600)
+			self.assertNotIn('exif', im.info)
+			self.assertNotIn('photoshop', im.info)
+			self.assertIn('icc_profile', im.info)
+
+		# the original is untouched
+		with Image.open(self.photo) as im:
+			self.assertEqual(im.width, 2188)
+			self.assertIn('exif', im.info)
+
+
+
+	def test_bbb_made_once(self):
+		import os
+
+		first = self.optimizer.optimize(self.photo)
+		made = os.path.getmtime(first)
+
+		# a new optimizer, say in the next run, finds the copy
+		again = mc.use_image_optimizer(directory=self.optimizer.directory).optimize(self.photo)
+		self.assertEqual(again, first)
+		self.assertEqual(os.path.getmtime(again), made)
+
+		# other options make another copy
+		webp = mc.use_image_optimizer(directory=self.optimizer.directory, webp=True).optimize(self.photo)
+		self.assertNotEqual(webp, first)
+		self.assertTrue(webp.endswith('hauser_menagerie.webp'))
+
+
+
+	def test_ccc_originals_kept_when_no_smaller(self):
+		import os
+		from PIL import Image
+
+		tiny = os.path.join('has_local_images','tiny.png')
+		Image.new('RGB', (4,4), 'white').save(tiny, optimize=True)
+		gif = os.path.join('has_local_images','big.gif')
+		Image.new('P', (2000,10)).save(gif)
+		svg = os.path.join('has_local_images','drawing.svg')
+		with open(svg,'w') as f:
+			f.write('<svg xmlns="http://www.w3.org/2000/svg" width="4000" height="10"/>')
+
+		for filename in [tiny, gif, svg]:
+			self.assertEqual(self.optimizer.optimize(filename), filename)
+
+		mc.use_image_optimizer(False)
+		self.assertEqual(mc.Image(self.photo).upload_path, self.photo)
+
+
+
+	def test_ddd_smaller_copy_is_uploaded(self):
+		import os, warnings
+		from fake_canvas import FakeCanvas
+
+		warnings.filterwarnings('ignore', message='Canvas may respond unexpectedly')
+
+		with FakeCanvas() as fake:
+			canvas = mc.throttle_canvas(fake.canvas(), mc.CanvasSession())
+			course = canvas.get_course(fake.add_course())
+
+			mc.Page('has_local_images').publish(course, overwrite=True)
+
+			files = [f for f in fake.courses[course.id].files.values() if f['filename'] == 'hauser_menagerie.jpg']
+			self.assertEqual(len(files), 1)
+			self.assertEqual(files[0]['size'], os.path.getsize(self.optimizer.optimize(self.photo)))
+
+			# and it's found there next time, rather than uploaded again
+			f = mc.Image(self.photo).publish(course, 'images')
+			self.assertEqual(f.id, files[0]['id'])
+			self.assertEqual(len(fake.courses[course.id].files), 1)
+
+
+
+	def test_eee_no_location_even_when_no_smaller(self):
+		import io, os, warnings
+		from PIL import Image
+		from fake_canvas import FakeCanvas
+
+		warnings.filterwarnings('ignore', message='Canvas may respond unexpectedly')
+
+		# already small, so saving it again doesn't help.  but it says where it was taken.
+		photo = os.path.join('has_local_images','photo.jpg')
+		exif = Image.Exif()
+		exif[0x010F] = 'PhoneMaker'
+		exif[0x8825] = {1: 'N', 2: (44.0, 0.0, 0.0)}
+		Image.effect_noise((400,300), 60).convert('RGB').save(photo, quality=50, exif=exif)
+
+		png = os.path.join('has_local_images','diagram.png')
+		from PIL.PngImagePlugin import PngInfo
+		info = PngInfo()
+		info.add_text('Author', 'someone')
+		Image.new('RGB', (4,4), 'white').save(png, optimize=True, pnginfo=info)
+
+		with FakeCanvas() as fake:
+			canvas = mc.throttle_canvas(fake.canvas(), mc.CanvasSession())
+			course = canvas.get_course(fake.add_course())
+
+			for filename in [photo, png]:
+				f = mc.Image(filename).publish(course, 'images')
+
+				with Image.open(io.BytesIO(fake.courses[course.id].file_contents[f.id])) as im:
+					self.assertEqual(dict(im.getexif()), {})
+					self.assertNotIn('Author', im.info)
+					self.assertEqual(im.size, Image.open(filename).size)
+
+		# the jpeg wasn't compressed again
+		with Image.open(self.optimizer.optimize(photo)) as smaller, Image.open(photo) as original:
+			self.assertEqual(smaller.tobytes(), original.tobytes())
+
+
+
+	def test_fff_command_line(self):
+		import os, shutil, warnings
+		from unittest import mock
+		from fake_canvas import FakeCanvas
+
+		warnings.filterwarnings('ignore', message='Canvas may respond unexpectedly')
+
+		shutil.copytree('has_local_images', os.path.join('my_course','has_local_images'))
+
+		with FakeCanvas() as fake:
+			course_id = fake.add_course()
+			with open('credentials.py','w') as f:
+				f.write(f'API_KEY = "fake-key"\nAPI_URL = "{fake.url}"\n')
+
+			environ = {'CANVAS_CREDENTIAL_FILE': os.path.abspath('credentials.py'), 'XDG_CACHE_HOME': os.path.join(self.root,'cache')}
+			with mock.patch.dict(os.environ, environ):
+				self.assertEqual(mc.main(['--optimize-images', 'publish', 'my_course', '--course', str(course_id)]), 0)
+				self.assertEqual(mc.image_optimizer.max_width, 1600)
+				self.assertEqual(mc.image_optimizer.directory, os.path.join(self.root,'cache','markdown2canvas','images'))
+
+				self.assertEqual(mc.main(['--optimize-images', '--max-image-width', '1000', 'publish', 'my_course', '--course', str(course_id), '--no-manifest', '--overwrite']), 0)
+				self.assertEqual(mc.image_optimizer.max_width, 1000)
+
+			sizes = sorted(f['size'] for f in fake.courses[course_id].files.values())
+			expected = sorted(os.path.getsize(mc.use_image_optimizer(width, directory=os.path.join(self.root,'cache','markdown2canvas','images')).optimize(self.photo)) for width in [1000, 1600])
+			self.assertEqual(sizes, expected)
+
+
+
+
+if __name__ == '__main__':
+    pgnm = 'this_argument_is_ignored_but_necessary'
+    unittest.main(argv=[pgnm], exit=False)
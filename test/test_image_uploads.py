@@ -0,0 +1,146 @@
+
+import sys
+sys.path.insert(0,'../')
+import markdown2canvas as mc
+
+import unittest
+
+from fake_canvas import FakeCanvas
+
+
+class ImageUploadsTester(unittest.TestCase):
+	"""
+	uploads a page's images several at a time, to a fake Canvas running on this computer.
+	"""
+
+	def setUp(self):
+		import json, os, tempfile, warnings
+		warnings.filterwarnings('ignore', message='Canvas may respond unexpectedly')
+
+		self.here = os.getcwd()
+		self.root = tempfile.mkdtemp()
+		os.chdir(self.root)
+
+		# a page with lots of figures.  they don't have to be real images, just different.
+		os.mkdir('lots_of_figures')
+		self.srcs = [f'figure{n}.png' for n in range(6)]
+		for n, src in enumerate(self.srcs):
+			with open(os.path.join('lots_of_figures', src),'wb') as f:
+				f.write(bytes([n]) * (100 + n))
+
+		with open(os.path.join('lots_of_figures','meta.json'),'w') as f:
+			json.dump({'type': 'page', 'name': 'Lots of Figures'}, f)
+		with open(os.path.join('lots_of_figures','source.md'),'w') as f:
+			f.write('# lots of figures\n\n' + '\n\n'.join(f'![figure {n}]({src})' for n, src in enumerate(self.srcs)))
+
+		self.fake = FakeCanvas().start()
+		canvas = mc.throttle_canvas(self.fake.canvas(), mc.CanvasSession())
+		self.course = canvas.get_course(self.fake.add_course())
+
+	def tearDown(self):
+		import os, shutil
+
+		self.fake.stop()
+		os.chdir(self.here)
+		shutil.rmtree(self.root)
+
+
+	def uploaded(self):
+		return sorted(f['filename'] for f in self.fake.courses[self.course.id].files.values())
+
+
+
+	def test_aaa_all_uploaded(self):
+		page = mc.Page('lots_of_figures')
+		page.publish_images_and_adjust_html(self.course)
+
+		self.assertEqual(self.uploaded(), self.srcs)
+		for src, im in page.local_images.items():
+			self.assertIsNotNone(im.canvas_obj)
+			self.assertIn(f'/courses/{self.course.id}/files/{im.canvas_obj.id}', page.translated_html)
+
+
+
+	def test_bbb_at_most_workers_at_once(self):
+		import threading, time
+
+		in_flight = [0]
+		most = [0]
+		lock = threading.Lock()
+		upload = mc.Image._upload
+
+		def slow_upload(im, *args, **kwargs):
+			with lock:
+				in_flight[0] += 1
+				most[0] = max(most[0], in_flight[0])
+			try:
+				time.sleep(0.05)
+				return upload(im, *args, **kwargs)
+			finally:
+				with lock:
+					in_flight[0] -= 1
+
+		mc.Image._upload = slow_upload
+		self.addCleanup(setattr, mc.Image, '_upload', upload)
+
+		mc.Page('lots_of_figures').publish_images_and_adjust_html(self.course, workers=2)
+		self.assertEqual(most[0], 2)
+
+		most[0] = 0
+		mc.Page('lots_of_figures').publish_images_and_adjust_html(self.course, workers=1)
+		self.assertEqual(most[0], 0) # they're all there already
+
+		for f in list(self.fake.courses[self.course.id].files):
+			del self.fake.courses[self.course.id].files[f]
+		mc.Page('lots_of_figures').publish_images_and_adjust_html(self.course, workers=1)
+		self.assertEqual(most[0], 1)
+
+
+
+	def test_ccc_failures_are_collected(self):
+		import os
+
+		# the second step of two uploads fails, after canvas said to go ahead
+		self.fake.fail_next += [('POST', r'^/upload/', 400), ('POST', r'^/upload/', 400)]
+
+		page = mc.Page('lots_of_figures')
+		with self.assertRaises(mc.ImageUploadError) as caught:
+			page.publish_images_and_adjust_html(self.course)
+
+		errors = {os.path.basename(src): e for src, e in caught.exception.errors.items()}
+		self.assertEqual(len(errors), 2)
+		self.assertTrue(set(errors) < set(self.srcs))
+		self.assertTrue(all(isinstance(e, Exception) for e in errors.values()))
+
+		# the others were uploaded anyway, and the html wasn't changed
+		self.assertEqual(self.uploaded(), sorted(set(self.srcs) - set(errors)))
+		self.assertFalse(os.path.exists(os.path.join('lots_of_figures','result.html')))
+
+		# next time, only the ones which failed are uploaded
+		self.fake.reset_counts()
+		page.publish_images_and_adjust_html(self.course)
+		self.assertEqual(self.uploaded(), self.srcs)
+		self.assertEqual(self.fake.count('POST', r'^/upload/'), 2)
+
+
+
+	def test_ddd_one_index_for_all_the_images(self):
+		# without one, the course's files are listed once for the whole page
+		mc.Page('lots_of_figures').publish_images_and_adjust_html(self.course)
+		self.assertEqual(self.fake.count('GET', r'/courses/\d+/files$'), 1)
+
+		# with one, it's used
+		index = mc.CourseIndex(self.course)
+		index.files_named('anything')
+		self.fake.reset_counts()
+
+		mc.Page('lots_of_figures').publish_images_and_adjust_html(self.course, index=index)
+		self.assertEqual(self.fake.count('GET', r'/files'), 0)
+		self.assertEqual(self.fake.count('POST'), 0)
+
+
+
+
+if __name__ == '__main__':
+    pgnm = 'this_argument_is_ignored_but_necessary'
+    unittest.main(argv=[pgnm], exit=False)
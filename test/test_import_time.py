@@ -0,0 +1,80 @@
+
+import sys
+sys.path.insert(0,'../')
+
+import unittest
+
+
+heavy_modules = ['canvasapi','requests','bs4','lxml','markdown','emoji','pygments']
+
+max_import_seconds = 0.5 # generous, so this only fails when something heavy sneaks back in
+
+
+def import_in_fresh_interpreter(folder):
+	"""
+	imports markdown2canvas in a new python, with `-X importtime`, running in `folder`.  returns (seconds to import markdown2canvas, set of top-level modules imported).
+	"""
+	import os, subprocess
+
+	package_root = os.path.abspath('..')
+	code = f'import sys; sys.path.insert(0,{package_root!r}); import markdown2canvas'
+
+	result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=folder, capture_output=True, text=True, check=True)
+
+	seconds = None
+	imported = set()
+	for line in result.stderr.splitlines():
+		if not line.startswith('import time:') or '|' not in line:
+			continue
+		_, cumulative, name = line[len('import time:'):].split('|')
+		if not cumulative.strip().isdigit():
+			continue # the header
+		imported.add(name.strip().split('.')[0])
+		if name.strip() == 'markdown2canvas':
+			seconds = int(cumulative)/1e6
+
+	return seconds, imported
+
+
+
+class ImportTimeTester(unittest.TestCase):
+	"""
+	guards how long `import markdown2canvas` takes, and that it doesn't do anything to the current folder.
+	"""
+
+	@classmethod
+	def setUpClass(self):
+		import tempfile
+
+		self.folder = tempfile.mkdtemp()
+
+		import_in_fresh_interpreter(self.folder) # so the bytecode is cached
+		self.seconds, self.imported = import_in_fresh_interpreter(self.folder)
+
+	@classmethod
+	def tearDownClass(self):
+		import shutil
+		shutil.rmtree(self.folder)
+
+
+
+	def test_aaa_no_heavy_imports(self):
+		self.assertEqual(self.imported.intersection(heavy_modules), set())
+
+
+
+	def test_bbb_fast(self):
+		self.assertLess(self.seconds, max_import_seconds, msg=f'import markdown2canvas took {self.seconds*1000:.1f} ms')
+
+
+
+	def test_ccc_no_log_file(self):
+		import os
+		self.assertEqual(os.listdir(self.folder), [])
+
+
+
+
+if __name__ == '__main__':
+    pgnm = 'this_argument_is_ignored_but_necessary'
+    unittest.main(argv=[pgnm], exit=False)
@@ -0,0 +1,101 @@
+
+import sys
+sys.path.insert(0,'../')
+import markdown2canvas as mc
+
+import unittest
+
+from fake_canvas import FakeCanvas
+
+
+class InstrumentationTester(unittest.TestCase):
+	"""
+	records the requests made to a fake Canvas running on this computer.
+	"""
+
+	def setUp(self):
+		import os, shutil, tempfile, warnings
+		warnings.filterwarnings('ignore', message='Canvas may respond unexpectedly')
+
+		self.here = os.getcwd()
+		self.root = tempfile.mkdtemp()
+		for folder in ['plain_text_in_a_module','has_local_images','a_file.file']:
+			shutil.copytree(folder, os.path.join(self.root, folder))
+		os.chdir(self.root)
+
+		self.fake = FakeCanvas().start()
+		canvas = mc.throttle_canvas(self.fake.canvas(), mc.CanvasSession())
+		self.course = canvas.get_course(self.fake.add_course())
+
+		self.fake.reset_counts()
+		self.calls = []
+		self.instrumentation = mc.use_instrumentation(self.calls.append)
+
+	def tearDown(self):
+		import os, shutil
+
+		mc.use_instrumentation(False)
+		self.fake.stop()
+		os.chdir(self.here)
+		shutil.rmtree(self.root)
+
+
+
+	def test_aaa_operation_names(self):
+		base = 'https://canvas.example.com/api/v1'
+
+		self.assertEqual(mc.operation_name('GET', base + '/courses/1/pages?per_page=100'), 'list pages')
+		self.assertEqual(mc.operation_name('PUT', base + '/courses/1/pages/a-page'), 'edit page')
+		self.assertEqual(mc.operation_name('GET', base + '/courses/1/pages/a-page/revisions/latest'), 'get page revision')
+		self.assertEqual(mc.operation_name('GET', base + '/courses/1/modules/2/items'), 'list module items')
+		self.assertEqual(mc.operation_name('POST', base + '/courses/1/modules/2/items'), 'create module item')
+		self.assertEqual(mc.operation_name('POST', base + '/folders/3/files'), 'start upload')
+		self.assertEqual(mc.operation_name('POST', base + '/folders/5/folders'), 'create folder')
+		self.assertEqual(mc.operation_name('GET', base + '/folders/5/folders'), 'list folders')
+		self.assertEqual(mc.operation_name('GET', base + '/courses/1/folders/5'), 'get folder')
+		self.assertEqual(mc.operation_name('POST', 'https://files.example.com/upload/abc'), 'upload')
+
+
+
+	def test_bbb_every_request_is_recorded(self):
+		import os
+
+		index = mc.CourseIndex(self.course)
+		for folder in ['plain_text_in_a_module','has_local_images','a_file.file']:
+			mc.make_container(folder).publish(self.course, overwrite=True, index=index)
+
+		self.assertEqual(len(self.calls), self.fake.request_count)
+		self.assertEqual(self.instrumentation.calls, self.calls)
+
+		report = self.instrumentation.report()
+		self.assertEqual(report['requests'], self.fake.request_count)
+		self.assertEqual(report['operations']['create page']['requests'], 2)
+		self.assertEqual(report['operations']['upload']['bytes_sent'] > os.path.getsize('has_local_images/hauser_menagerie.jpg'), True)
+		self.assertEqual(sum(op['errors'] for op in report['operations'].values()), 0)
+		self.assertTrue(all(sum(op['histogram']) == op['requests'] for op in report['operations'].values()))
+
+		# the image's upload counts for the page which uses it
+		self.assertEqual(report['containers']['has_local_images']['upload'], 1)
+		self.assertEqual(report['containers']['a_file.file']['upload'], 1)
+
+
+
+	def test_ccc_report_as_json(self):
+		import json
+
+		mc.Page('plain_text_in_a_module').publish(self.course, overwrite=True)
+		mc.is_page_already_uploaded('Test Plain Text in a Module', self.course)
+
+		report = json.loads(self.instrumentation.to_json('report.json'))
+		with open('report.json','r',encoding='utf-8') as f:
+			self.assertEqual(json.load(f), report)
+
+		self.assertEqual(report['containers'][''], {'list pages': 1})
+		self.assertIn('list module items', report['containers']['plain_text_in_a_module'])
+
+
+
+
+if __name__ == '__main__':
+    pgnm = 'this_argument_is_ignored_but_necessary'
+    unittest.main(argv=[pgnm], exit=False)
@@ -0,0 +1,80 @@
+
+import sys
+sys.path.insert(0,'../')
+import markdown2canvas as mc
+
+import unittest
+
+
+class LazyDocumentTester(unittest.TestCase):
+	"""
+	making a Document shouldn't render it.  these tests don't talk to Canvas.
+	"""
+
+	def setUp(self):
+		import os, shutil, tempfile
+
+		self.root = tempfile.mkdtemp()
+		self.folder = os.path.join(self.root,'has_local_images')
+		shutil.copytree('has_local_images', self.folder)
+
+	def tearDown(self):
+		import shutil
+		shutil.rmtree(self.root)
+
+
+
+	def test_aaa_construction_reads_only_meta(self):
+		import os
+
+		os.remove(os.path.join(self.folder,'source.md'))
+
+		page = mc.Page(self.folder)
+		self.assertEqual(page.name,'Test Has Local Images')
+
+		with self.assertRaises(FileNotFoundError):
+			page.translated_html
+
+
+
+	def test_bbb_renders_on_first_use(self):
+		page = mc.Page(self.folder)
+
+		self.assertIn('hauser_menagerie.jpg', page.translated_html)
+		self.assertEqual(len(page.local_images), 1)
+
+
+
+	def test_ccc_renders_once(self):
+		import os
+
+		page = mc.Page(self.folder)
+		html = page.translated_html
+
+		# changes to the source after rendering don't matter to this Document
+		with open(os.path.join(self.folder,'source.md'),'a',encoding='utf-8') as f:
+			f.write('\n\nmore words\n')
+
+		self.assertIs(page.translated_html, html)
+		self.assertIn('more words', mc.Page(self.folder).translated_html)
+
+
+
+	def test_ddd_images_follow_the_html(self):
+		page = mc.Page(self.folder)
+		self.assertEqual(len(page.local_images), 1)
+
+		page.translated_html = '<p>no pictures here</p>'
+		self.assertEqual(page.local_images, {})
+
+		# a rendering from somewhere else replaces this one, images and all
+		page.use_rendered(mc.RenderResult(self.folder, '<p><img src="elsewhere.png"/></p>', ['elsewhere.png']))
+		self.assertIn('elsewhere.png', page.translated_html)
+		self.assertEqual(list(page.local_images), ['elsewhere.png'])
+
+
+
+
+if __name__ == '__main__':
+    pgnm = 'this_argument_is_ignored_but_necessary'
+    unittest.main(argv=[pgnm], exit=False)
@@ -0,0 +1,97 @@
+
+import sys
+sys.path.insert(0,'../')
+import markdown2canvas as mc
+
+import unittest
+
+
+class ManifestTester(unittest.TestCase):
+	"""
+	the manifest doesn't talk to Canvas, so these tests don't either.
+	"""
+
+	def setUp(self):
+		import os, shutil, tempfile
+
+		self.root = tempfile.mkdtemp()
+		for folder in ['has_local_images','a_link.link']:
+			shutil.copytree(folder, os.path.join(self.root, folder))
+
+		self.page = mc.Page(os.path.join(self.root,'has_local_images'))
+		self.link = mc.Link(os.path.join(self.root,'a_link.link'))
+
+		self.course_id = 12345
+
+	def tearDown(self):
+		import shutil
+		shutil.rmtree(self.root)
+
+
+
+	def test_aaa_unrecorded_is_changed(self):
+		manifest = mc.Manifest(self.root, self.course_id)
+		self.assertFalse(manifest.is_unchanged(self.page))
+
+
+
+	def test_bbb_recorded_is_unchanged(self):
+		manifest = mc.Manifest(self.root, self.course_id)
+		manifest.record(self.page)
+		manifest.record(self.link)
+		self.assertTrue(manifest.is_unchanged(self.page))
+		self.assertTrue(manifest.is_unchanged(self.link))
+
+
+
+	def test_ccc_survives_save_and_load(self):
+		manifest = mc.Manifest(self.root, self.course_id)
+		manifest.record(self.page)
+		manifest.save()
+
+		self.assertTrue(mc.Manifest(self.root, self.course_id).is_unchanged(self.page))
+
+		# a different course has its own section
+		self.assertFalse(mc.Manifest(self.root, 54321).is_unchanged(self.page))
+
+
+
+	def test_ddd_editing_source_is_a_change(self):
+		import os
+
+		manifest = mc.Manifest(self.root, self.course_id)
+		manifest.record(self.page)
+
+		with open(os.path.join(self.root,'has_local_images','source.md'),'a',encoding='utf-8') as f:
+			f.write('\n\nmore words\n')
+
+		self.assertFalse(manifest.is_unchanged(self.page))
+
+
+
+	def test_eee_editing_an_image_is_a_change(self):
+		import os
+
+		manifest = mc.Manifest(self.root, self.course_id)
+		manifest.record(self.page)
+
+		with open(os.path.join(self.root,'has_local_images','hauser_menagerie.jpg'),'ab') as f:
+			f.write(b'\0')
+
+		self.assertFalse(manifest.is_unchanged(self.page))
+
+
+
+	def test_fff_forget(self):
+		manifest = mc.Manifest(self.root, self.course_id)
+		manifest.record(self.page)
+		manifest.forget(self.page)
+
+		self.assertFalse(manifest.is_unchanged(self.page))
+
+
+
+
+if __name__ == '__main__':
+    pgnm = 'this_argument_is_ignored_but_necessary'
+    unittest.main(argv=[pgnm], exit=False)
@@ -0,0 +1,91 @@
+
+import sys
+sys.path.insert(0,'../')
+import markdown2canvas as mc
+
+import unittest
+
+
+class MarkdownRendererTester(unittest.TestCase):
+	"""
+	the markdown renderer is made once per thread, and reused.  these tests don't talk to Canvas.
+	"""
+
+	def setUp(self):
+		import os, shutil, tempfile
+
+		self.here = os.getcwd()
+		self.root = tempfile.mkdtemp()
+		for folder in ['uses_droplets_via_style','_styles']:
+			shutil.copytree(folder, os.path.join(self.root, folder))
+		os.chdir(self.root)
+
+	def tearDown(self):
+		import os, shutil
+
+		os.chdir(self.here)
+		shutil.rmtree(self.root)
+
+
+
+	def test_aaa_reused_and_reset(self):
+		md = mc.markdown_renderer()
+		self.assertIs(mc.markdown_renderer(), md)
+		self.assertIsNot(mc.markdown_renderer(['footnotes']), md)
+
+		# footnotes from one document don't turn up in the next
+		first = mc.render_markdown_source(b'words[^1]\n\n[^1]: a footnote', ['footnotes'])
+		second = mc.render_markdown_source(b'more words', ['footnotes'])
+		self.assertIn('a footnote', first)
+		self.assertEqual(second, '<p>more words</p>')
+
+
+
+	def test_bbb_one_per_thread(self):
+		from concurrent.futures import ThreadPoolExecutor
+
+		with ThreadPoolExecutor(max_workers=1) as pool:
+			theirs = pool.submit(mc.markdown_renderer).result()
+
+		self.assertIsNot(theirs, mc.markdown_renderer())
+
+		# and rendering from lots of threads at once gives the same html
+		sources = [f'# heading {n}\n\n```python\nx = {n}\n```\n'.encode('utf-8') for n in range(40)]
+		expected = [mc.render_markdown_source(source) for source in sources]
+		with ThreadPoolExecutor(max_workers=8) as pool:
+			self.assertEqual(list(pool.map(mc.render_markdown_source, sources)), expected)
+
+
+
+	def test_ccc_style_chooses_extensions(self):
+		import json, os
+
+		plain = mc.Page('uses_droplets_via_style').translated_html
+		self.assertNotIn('<h1 id="', plain)
+
+		with open(os.path.join('_styles','generic','markdown.json'),'w',encoding='utf-8') as f:
+			json.dump({'extensions': mc.markdown_extensions + ['toc']}, f)
+
+		page = mc.Page('uses_droplets_via_style')
+		style = mc.Style.load(page.metadata['style'])
+		self.assertEqual(style.markdown_extensions, mc.markdown_extensions + ['toc'])
+		self.assertIn('<h1 id="', page.translated_html)
+
+		# and it's part of what the manifest watches
+		self.assertIn(os.path.join('_styles','generic','markdown.json'), page._manifest_files())
+
+
+
+	def test_ddd_options_are_part_of_the_cache_key(self):
+		cache = mc.RenderCache('cache', 2**20)
+
+		plain = cache.key(b'source', ['codehilite'])
+		self.assertEqual(plain, cache.key(b'source', ['codehilite'], {}))
+		self.assertNotEqual(plain, cache.key(b'source', ['codehilite'], {'codehilite': {'linenums': True}}))
+
+
+
+
+if __name__ == '__main__':
+    pgnm = 'this_argument_is_ignored_but_necessary'
+    unittest.main(argv=[pgnm], exit=False)
@@ -0,0 +1,85 @@
+
+import sys
+sys.path.insert(0,'../')
+import markdown2canvas as mc
+
+import unittest
+
+from fake_canvas import FakeCanvas
+
+
+class ModuleItemTester(unittest.TestCase):
+	"""
+	publishes things in modules to a fake Canvas running on this computer.
+	"""
+
+	def setUp(self):
+		import os, shutil, tempfile, warnings
+		warnings.filterwarnings('ignore', message='Canvas may respond unexpectedly')
+
+		self.here = os.getcwd()
+		self.root = tempfile.mkdtemp()
+		for folder in ['plain_text_in_a_module','programming_assignment']:
+			shutil.copytree(folder, os.path.join(self.root, folder))
+		os.chdir(self.root)
+
+		self.fake = FakeCanvas().start()
+		self.course = self.fake.canvas().get_course(self.fake.add_course())
+		self.fake_course = self.fake.courses[self.course.id]
+
+		self.page = mc.Page('plain_text_in_a_module')
+
+	def tearDown(self):
+		import os, shutil
+
+		self.fake.stop()
+		os.chdir(self.here)
+		shutil.rmtree(self.root)
+
+
+	def item_counts(self):
+		return sorted(len(items) for items in self.fake_course.module_items.values())
+
+
+
+	def test_aaa_republishing_doesnt_duplicate(self):
+		self.page.publish(self.course, overwrite=True)
+		self.page.publish(self.course, overwrite=True)
+
+		index = mc.CourseIndex(self.course)
+		self.page.publish(self.course, overwrite=True, index=index)
+		self.page.publish(self.course, overwrite=True, index=index)
+
+		self.assertEqual(self.item_counts(), [1,1])
+
+
+
+	def test_bbb_is_in_module(self):
+		self.page.publish(self.course, overwrite=True)
+
+		for m in self.page.modules:
+			self.assertTrue(self.page.is_in_module(m, self.course))
+			self.assertTrue(self.page.is_in_module(m, self.course, mc.CourseIndex(self.course)))
+
+		assignment = mc.Assignment('programming_assignment')
+		assignment.publish(self.course, overwrite=True)
+		self.assertFalse(assignment.is_in_module(self.page.modules[0], self.course))
+
+
+
+	def test_ccc_items_listed_once_per_module(self):
+		index = mc.CourseIndex(self.course)
+		self.page.publish(self.course, overwrite=True, index=index)
+
+		self.fake.reset_counts()
+		self.page.publish(self.course, overwrite=True, index=index)
+
+		self.assertEqual(self.fake.count('GET', r'/items$'), 0)
+		self.assertEqual(self.fake.count('POST', r'/items$'), 0)
+
+
+
+
+if __name__ == '__main__':
+    pgnm = 'this_argument_is_ignored_but_necessary'
+    unittest.main(argv=[pgnm], exit=False)
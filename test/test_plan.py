@@ -0,0 +1,94 @@
+
+import sys
+sys.path.insert(0,'../')
+import markdown2canvas as mc
+
+import unittest
+
+from fake_canvas import FakeCanvas
+
+
+class PlanTester(unittest.TestCase):
+	"""
+	plans publishing the test content to a fake Canvas running on this computer.
+	"""
+
+	def setUp(self):
+		import os, shutil, tempfile, warnings
+		warnings.filterwarnings('ignore', message='Canvas may respond unexpectedly')
+
+		self.here = os.getcwd()
+		self.root = tempfile.mkdtemp()
+		self.folder = os.path.join(self.root,'test')
+		shutil.copytree(self.here, self.folder, ignore=shutil.ignore_patterns('__pycache__','.markdown2canvas'))
+		os.chdir(self.folder)
+
+		self.fake = FakeCanvas().start()
+		self.course = self.fake.canvas().get_course(self.fake.add_course())
+
+	def tearDown(self):
+		import os, shutil
+
+		self.fake.stop()
+		os.chdir(self.here)
+		shutil.rmtree(self.root)
+
+
+	def writes(self):
+		return sum(self.fake.count(method) for method in ['POST','PUT','DELETE'])
+
+
+
+	def test_aaa_plan_changes_nothing(self):
+		the_plan = mc.plan('.', self.course, overwrite=True)
+
+		self.assertEqual(self.writes(), 0)
+		self.assertIn('create page', [op.action for op in the_plan.operations])
+		self.assertEqual(the_plan.conflicts, [])
+
+
+
+	def test_bbb_plan_is_about_right(self):
+		import os
+
+		index = mc.CourseIndex(self.course)
+		the_plan = mc.plan('.', self.course, overwrite=True, index=index)
+
+		# each distinct image once, plus the file
+		uploads = [op for op in the_plan.operations if op.action.startswith('upload')]
+		self.assertEqual(len(uploads), 4)
+		self.assertEqual(the_plan.upload_bytes, sum(os.path.getsize(op.target) for op in uploads))
+
+		self.fake.reset_counts()
+		failures = mc.publish_tree('.', self.course, overwrite=True, index=index)
+		self.assertEqual(failures, {})
+
+		self.assertLess(abs(the_plan.requests - self.fake.request_count), 0.25*self.fake.request_count)
+
+
+
+	def test_ccc_conflicts_without_overwrite(self):
+		mc.publish_tree('.', self.course, overwrite=True)
+
+		the_plan = mc.plan('.', self.course)
+
+		self.assertEqual(len(the_plan.conflicts), len(mc.find_containers('.')))
+		self.assertEqual(the_plan.upload_bytes, 0)
+
+
+
+	def test_ddd_manifest_skips(self):
+		manifest = mc.Manifest('.', self.course)
+		mc.publish_tree('.', self.course, overwrite=True, manifest=manifest)
+
+		the_plan = mc.plan('.', self.course, manifest=mc.Manifest('.', self.course))
+
+		self.assertEqual(the_plan.operations, [])
+		self.assertEqual(len(the_plan.skipped), len(mc.find_containers('.')))
+
+
+
+
+if __name__ == '__main__':
+    pgnm = 'this_argument_is_ignored_but_necessary'
+    unittest.main(argv=[pgnm], exit=False)
@@ -0,0 +1,56 @@
+
+import sys
+sys.path.insert(0,'../')
+import markdown2canvas as mc
+
+import unittest
+
+
+class PublishTreeTester(unittest.TestCase):
+	@classmethod
+	def setUpClass(self):
+		from course_id import test_course_id
+		from canvas_url import canvas_url
+		self.canvas = mc.make_canvas_api_obj(url=canvas_url)
+		self.course = self.canvas.get_course(test_course_id)
+
+	@classmethod
+	def tearDownClass(self):
+		pass
+
+
+
+	def test_aaa_finds_containers(self):
+		import os
+
+		found = [os.path.basename(f) for f in mc.find_containers('.')]
+		self.assertIn('plain_text', found)
+		self.assertIn('a_file.file', found)
+		self.assertIn('a_link.link', found)
+		self.assertNotIn('_styles', found)
+		self.assertNotIn('generic', found)
+
+
+
+	def test_bbb_can_publish_tree(self):
+		failures = mc.publish_tree('.', self.course, jobs=4, overwrite=True)
+		self.assertEqual(failures, {})
+
+		index = mc.CourseIndex(self.course)
+		self.assertTrue(mc.is_page_already_uploaded('Test Plain Text', self.course, index))
+		self.assertTrue(mc.is_assignment_already_uploaded('Test Programming Assignment', self.course, index))
+
+
+
+	def test_ccc_already_online_is_reported(self):
+		mc.publish_tree('.', self.course, jobs=4, overwrite=True)
+
+		failures = mc.publish_tree('.', self.course, jobs=4, overwrite=False)
+		self.assertTrue(all(isinstance(e, mc.AlreadyExists) for e in failures.values()))
+
+
+
+
+if __name__ == '__main__':
+    pgnm = 'this_argument_is_ignored_but_necessary'
+    unittest.main(argv=[pgnm], exit=False)
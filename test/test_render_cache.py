@@ -0,0 +1,87 @@
+
+import sys
+sys.path.insert(0,'../')
+import markdown2canvas as mc
+
+import unittest
+
+
+class RenderCacheTester(unittest.TestCase):
+	"""
+	the render cache is just files on disk.  these tests don't talk to Canvas.
+	"""
+
+	def setUp(self):
+		import os, shutil, tempfile
+
+		self.root = tempfile.mkdtemp()
+		self.folder = os.path.join(self.root,'has_local_images')
+		shutil.copytree('has_local_images', self.folder)
+
+		self.source = os.path.join(self.folder,'source.md')
+		self.cache = mc.use_render_cache(os.path.join(self.root,'cache'))
+
+	def tearDown(self):
+		import shutil
+		mc.use_render_cache(False)
+		shutil.rmtree(self.root)
+
+
+
+	def test_aaa_cached_render_is_the_same(self):
+		mc.use_render_cache(False)
+		uncached = mc.render_markdown(self.source)
+
+		mc.use_render_cache(self.cache.directory)
+		first = mc.render_markdown(self.source)
+		second = mc.render_markdown(self.source)
+
+		self.assertEqual(first, uncached)
+		self.assertEqual(second, uncached)
+
+
+
+	def test_bbb_hit_skips_rendering(self):
+		import markdown
+		from unittest import mock
+
+		mc.render_markdown(self.source)
+
+		with mock.patch.object(markdown, 'markdown', side_effect=AssertionError('rendered again')):
+			mc.render_markdown(self.source)
+
+
+
+	def test_ccc_editing_source_is_a_miss(self):
+		mc.render_markdown(self.source)
+
+		with open(self.source,'a',encoding='utf-8') as f:
+			f.write('\n\nmore words\n')
+
+		self.assertIn('more words', mc.render_markdown(self.source))
+
+
+
+	def test_ddd_evicts_least_recently_used(self):
+		import os, time
+
+		cache = mc.RenderCache(os.path.join(self.root,'small'), max_bytes=10000)
+
+		keys = [cache.key(str(i).encode(), []) for i in range(4)]
+		for i,k in enumerate(keys[:3]):
+			cache.put(k, 'x'*3000)
+			os.utime(cache._filename(k), (i,i))
+
+		cache.get(keys[0]) # recently used, so it stays
+		cache.put(keys[3], 'x'*3000) # too big now
+
+		self.assertIsNotNone(cache.get(keys[0]))
+		self.assertIsNone(cache.get(keys[1]))
+		self.assertLessEqual(cache._size, 10000)
+
+
+
+
+if __name__ == '__main__':
+    pgnm = 'this_argument_is_ignored_but_necessary'
+    unittest.main(argv=[pgnm], exit=False)
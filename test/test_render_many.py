@@ -0,0 +1,103 @@
+
+import sys
+sys.path.insert(0,'../')
+import markdown2canvas as mc
+
+import unittest
+
+
+class RenderManyTester(unittest.TestCase):
+	"""
+	renders in other processes.  these tests don't talk to Canvas, except the last, which uses the fake one.
+	"""
+
+	def setUp(self):
+		import os, shutil, tempfile
+
+		self.here = os.getcwd()
+		self.root = tempfile.mkdtemp()
+		self.folders = ['has_local_images','uses_droplets_via_style','plain_text','a_file.file','programming_assignment']
+		for folder in self.folders + ['_styles']:
+			shutil.copytree(folder, os.path.join(self.root, folder))
+		os.chdir(self.root)
+
+	def tearDown(self):
+		import os, shutil
+
+		os.chdir(self.here)
+		shutil.rmtree(self.root)
+
+
+
+	def test_aaa_same_as_rendering_here(self):
+		import pickle
+
+		results = mc.render_many(self.folders, processes=2)
+
+		self.assertEqual([r is None for r in results], [False, False, False, True, False])
+
+		for folder, result in zip(self.folders, results):
+			if result is None:
+				continue
+
+			self.assertEqual(result.folder, folder)
+			self.assertEqual(pickle.loads(pickle.dumps(result)).html, result.html)
+
+			here = mc.make_container(folder)
+			there = mc.make_container(folder)
+			there.use_rendered(result)
+
+			self.assertEqual(there.translated_html, here.translated_html)
+			self.assertEqual({src: im.givenpath for src, im in there.local_images.items()}, {src: im.givenpath for src, im in here.local_images.items()})
+
+
+
+	def test_bbb_style_images_are_found(self):
+		results = mc.render_many(['uses_droplets_via_style'], processes=1)
+
+		page = mc.Page('uses_droplets_via_style')
+		page.use_rendered(results[0])
+
+		srcs = mc.Style.load(page.metadata['style']).image_srcs
+		self.assertTrue(srcs)
+		self.assertTrue(all(page.local_images[src].givenpath == src for src in srcs))
+
+
+
+	def test_ccc_failures_are_returned(self):
+		import os
+
+		os.remove(os.path.join('plain_text','source.md'))
+
+		results = mc.render_many(self.folders, processes=2)
+
+		self.assertIsInstance(results[2], FileNotFoundError)
+		self.assertIsInstance(results[0], mc.RenderResult)
+
+
+
+	def test_ddd_publish_tree_renders_in_processes(self):
+		import warnings
+		from fake_canvas import FakeCanvas
+
+		warnings.filterwarnings('ignore', message='Canvas may respond unexpectedly')
+
+		with FakeCanvas() as fake:
+			course = fake.canvas().get_course(fake.add_course())
+			failures = mc.publish_tree('.', course, overwrite=True, processes=2)
+
+			self.assertEqual(failures, {})
+			pages = fake.courses[course.id].pages.values()
+			self.assertEqual(len(pages), 3)
+
+			# the image was uploaded, and the page points at it
+			body = [p['body'] for p in pages if p['title'] == 'Test Has Local Images'][0]
+			self.assertIn(f'/courses/{course.id}/files/', body)
+			self.assertIn('hauser_menagerie.jpg', [f['filename'] for f in fake.courses[course.id].files.values()])
+
+
+
+
+if __name__ == '__main__':
+    pgnm = 'this_argument_is_ignored_but_necessary'
+    unittest.main(argv=[pgnm], exit=False)
@@ -0,0 +1,171 @@
+
+import sys
+sys.path.insert(0,'../')
+import markdown2canvas as mc
+
+import unittest
+
+
+# how the html was made before the pipeline worked on one parsed tree.  the pipeline should give the same html.
+
+def old_markdown2html(filename):
+	import emoji, markdown
+	from bs4 import BeautifulSoup
+	from os import path
+
+	root = path.split(filename)[0]
+
+	with open(filename,'r',encoding='utf-8') as file:
+		markdown_source = file.read()
+
+	html = markdown.markdown(emoji.emojize(markdown_source), extensions=['codehilite','fenced_code','md_in_html','tables'])
+	soup = BeautifulSoup(html,features="lxml")
+
+	for img in soup.find_all("img"):
+		src = img["src"]
+		if ('http://' not in src) and ('https://' not in src):
+			img["src"] = path.join(root,src)
+
+	return soup.prettify()
+
+
+def old_translated_html(folder):
+	import json
+	from os.path import join
+
+	with open(join(folder,'meta.json'),'r') as f:
+		metadata = json.load(f)
+
+	sourcename = join(folder,'source.md')
+	if 'style' not in metadata:
+		return old_markdown2html(sourcename)
+
+	style_path = metadata['style']
+
+	def read(name):
+		with open(name,'r',encoding='utf-8') as f:
+			return f.read()
+
+	outname = join(folder,'styled_source.md')
+	contents = f"{read(join(style_path,'header.md'))}\n{read(sourcename)}\n{read(join(style_path,'footer.md'))}"
+	with open(outname,'w',encoding='utf-8') as f:
+		f.write(mc.preprocess_markdown_images(contents, style_path))
+
+	return f"{read(join(style_path,'header.html'))}\n{old_markdown2html(outname)}\n{read(join(style_path,'footer.html'))}"
+
+
+def old_adjust_html_for_images(html, published_images, courseid):
+	from bs4 import BeautifulSoup
+
+	soup = BeautifulSoup(html,features="lxml")
+
+	for img in soup.find_all("img"):
+		src = img["src"]
+		if src[:7] not in ['https:/','http://']:
+			local_img = published_images[src]
+			img['src'] = local_img.make_src_url(courseid)
+			img['class'] = "instructure_file_link inline_disabled"
+			img['data-api-endpoint'] = local_img.make_api_endpoint_url(courseid)
+			img['data-api-returntype'] = 'File'
+
+	return soup.prettify()
+
+
+
+
+class RenderPipelineTester(unittest.TestCase):
+	"""
+	the html for documents is the same as it used to be.  these tests don't talk to Canvas.
+	"""
+
+	folders = ['has_local_images','has_remote_images','plain_text','plain_text_in_a_module','programming_assignment','uses_droplets','uses_droplets_via_style','has_a_logo']
+
+	def setUp(self):
+		import json, os, shutil, tempfile
+
+		self.here = os.getcwd()
+		self.root = tempfile.mkdtemp()
+		for folder in self.folders[:-1] + ['_styles']:
+			shutil.copytree(folder, os.path.join(self.root, folder))
+		os.chdir(self.root)
+
+		# a style with an image in its html header.  that one's path is relative to where we're running, not to the document.
+		shutil.copytree(os.path.join('_styles','generic'), os.path.join('_styles','with_logo'))
+		with open(os.path.join('_styles','with_logo','logo.png'),'wb') as f:
+			f.write(b'not really a png')
+		with open(os.path.join('_styles','with_logo','header.html'),'a',encoding='utf-8') as f:
+			f.write('\n<img src="_styles/with_logo/logo.png" alt="logo"/>\n')
+
+		os.mkdir('has_a_logo')
+		shutil.copy(os.path.join('has_local_images','hauser_menagerie.jpg'), 'has_a_logo')
+		with open(os.path.join('has_a_logo','meta.json'),'w') as f:
+			json.dump({'type': 'page', 'name': 'Has a Logo', 'style': '_styles/with_logo'}, f)
+		with open(os.path.join('has_a_logo','source.md'),'w',encoding='utf-8') as f:
+			f.write('# has a logo\n\n![a menagerie](hauser_menagerie.jpg)\n')
+
+	def tearDown(self):
+		import os, shutil
+
+		os.chdir(self.here)
+		shutil.rmtree(self.root)
+
+
+	def document(self, folder):
+		import json, os
+
+		with open(os.path.join(folder,'meta.json'),'r') as f:
+			kind = json.load(f)['type']
+		return mc.Assignment(folder) if kind == 'assignment' else mc.Page(folder)
+
+
+	def publish_images(self, images):
+		"""
+		pretends the images were uploaded, giving them canvas files
+		"""
+		import canvasapi
+
+		for n, im in enumerate(images.values()):
+			im.canvas_obj = canvasapi.file.File(None, {'id': 100+n, 'url': f'https://canvas.example.edu/files/{100+n}/download'})
+
+
+
+	def test_aaa_header_images_arent_localized(self):
+		import os
+
+		page = mc.Page('has_a_logo')
+
+		self.assertEqual(sorted(page.local_images), sorted(['_styles/with_logo/logo.png', 'has_a_logo/hauser_menagerie.jpg', os.path.abspath('_styles/with_logo/640px-Zhuravlyne_ozero.jpeg')]))
+		self.assertIn('src="_styles/with_logo/logo.png"', page.translated_html)
+		self.assertNotIn('has_a_logo/_styles', page.translated_html)
+
+
+
+	def test_bbb_same_html_as_before(self):
+		for folder in self.folders:
+			with self.subTest(folder=folder):
+				expected = old_translated_html(folder)
+				doc = self.document(folder)
+
+				self.assertEqual(doc.translated_html, mc.parse_html(expected).prettify())
+				self.assertEqual(sorted(doc.local_images), sorted(mc.find_local_images(expected)))
+
+
+
+	def test_ccc_same_html_after_images_as_before(self):
+		for folder in self.folders:
+			with self.subTest(folder=folder):
+				expected = old_translated_html(folder)
+				doc = self.document(folder)
+
+				self.publish_images(doc.local_images)
+				mc.adjust_html_for_images(doc._get_soup(), doc.local_images, 1234)
+				doc._translated_html = None
+
+				self.assertEqual(doc.translated_html, old_adjust_html_for_images(expected, doc.local_images, 1234))
+
+
+
+
+if __name__ == '__main__':
+    pgnm = 'this_argument_is_ignored_but_necessary'
+    unittest.main(argv=[pgnm], exit=False)
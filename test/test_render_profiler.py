@@ -0,0 +1,126 @@
+
+import sys
+sys.path.insert(0,'../')
+import markdown2canvas as mc
+
+import unittest
+
+
+class RenderProfilerTester(unittest.TestCase):
+	"""
+	times rendering.  these tests don't talk to Canvas.
+	"""
+
+	def setUp(self):
+		import os, shutil, tempfile
+
+		self.root = tempfile.mkdtemp()
+		for folder in ['has_local_images','plain_text']:
+			shutil.copytree(folder, os.path.join(self.root, folder))
+
+		self.folders = [os.path.join(self.root, folder) for folder in ['has_local_images','plain_text']]
+
+	def tearDown(self):
+		import shutil
+
+		mc.use_render_profiler(False)
+		shutil.rmtree(self.root)
+
+
+	def render_all(self):
+		for folder in self.folders:
+			page = mc.Page(folder)
+			page.translated_html
+			page.local_images
+
+
+
+	def test_aaa_off_by_default(self):
+		self.assertIsNone(mc.render_profiler)
+		self.render_all()
+
+
+
+	def test_bbb_stages_for_each_container(self):
+		profiler = mc.use_render_profiler()
+		self.render_all()
+
+		report = profiler.report()
+		self.assertEqual(sorted(report['containers']), sorted(self.folders))
+
+		for stage in ['render', 'render;read source', 'render;emojize', 'render;markdown', 'render;parse html', 'prettify', 'find images']:
+			self.assertEqual(report['stages'][stage]['calls'], 2)
+
+		for folder in self.folders:
+			c = report['containers'][folder]
+			self.assertGreaterEqual(c['stages']['render'], c['stages']['render;markdown'])
+			self.assertAlmostEqual(c['seconds'], c['stages']['render'] + c['stages']['prettify'] + c['stages']['find images'])
+
+		self.assertNotIn('peak_bytes', report['stages']['render'])
+
+
+
+	def test_ccc_memory(self):
+		import tracemalloc
+
+		profiler = mc.use_render_profiler(memory=True)
+		self.render_all()
+
+		stages = profiler.report()['stages']
+		self.assertGreater(stages['render;markdown']['peak_bytes'], 0)
+		self.assertGreaterEqual(stages['render']['peak_bytes'], stages['render;markdown']['peak_bytes'])
+
+		mc.use_render_profiler(False)
+		self.assertFalse(tracemalloc.is_tracing())
+
+
+
+	def test_ddd_memory_before_an_inner_stage(self):
+		import tracemalloc
+
+		profiler = mc.use_render_profiler(memory=True)
+
+		with mc.profile_stage('outer', 'somewhere'):
+			big = bytearray(50*2**20)
+			del big
+			with mc.profile_stage('inner'):
+				small = bytearray(2**10)
+
+		stages = profiler.report()['stages']
+		self.assertGreaterEqual(stages['outer']['peak_bytes'], 50*2**20)
+		self.assertLess(stages['outer;inner']['peak_bytes'], 2**20)
+
+		# tracing someone else started is left on
+		mc.use_render_profiler(False)
+		tracemalloc.start()
+		self.addCleanup(tracemalloc.stop)
+
+		mc.use_render_profiler(memory=True)
+		mc.use_render_profiler(False)
+		self.assertTrue(tracemalloc.is_tracing())
+
+
+
+	def test_eee_folded_stacks(self):
+		import json, os
+
+		profiler = mc.use_render_profiler()
+		self.render_all()
+
+		folded = profiler.to_folded(os.path.join(self.root,'render.folded'))
+		lines = folded.splitlines()
+		self.assertIn(f'{self.folders[0]};render;markdown', [line.rsplit(' ',1)[0] for line in lines])
+		self.assertTrue(all(line.rsplit(' ',1)[1].isdigit() for line in lines))
+
+		# each stage's own time plus its inner stages' is its total
+		own = {line.rsplit(' ',1)[0]: int(line.rsplit(' ',1)[1]) for line in lines}
+		total = sum(v for k, v in own.items() if k.startswith(f'{self.folders[1]};render'))
+		stages = json.loads(profiler.to_json())['containers'][self.folders[1]]['stages']
+		self.assertAlmostEqual(total, stages['render']*1e6, delta=10)
+
+
+
+
+if __name__ == '__main__':
+    pgnm = 'this_argument_is_ignored_but_necessary'
+    unittest.main(argv=[pgnm], exit=False)
@@ -0,0 +1,94 @@
+
+import sys
+sys.path.insert(0,'../')
+import markdown2canvas as mc
+
+import unittest
+
+from fake_canvas import FakeCanvas
+
+
+class RetryTester(unittest.TestCase):
+	"""
+	talks to a fake Canvas running on this computer, which fails when told to.
+	"""
+
+	def setUp(self):
+		import os, shutil, tempfile, warnings
+		warnings.filterwarnings('ignore', message='Canvas may respond unexpectedly')
+
+		self.here = os.getcwd()
+		self.root = tempfile.mkdtemp()
+		for folder in ['plain_text_in_a_module','has_local_images','a_file.file']:
+			shutil.copytree(folder, os.path.join(self.root, folder))
+		os.chdir(self.root)
+
+		self.backoff = mc.retry_policy.backoff
+		mc.retry_policy.backoff = 0.01
+
+		self.fake = FakeCanvas().start()
+		canvas = mc.throttle_canvas(self.fake.canvas(), mc.CanvasSession())
+		self.course = canvas.get_course(self.fake.add_course())
+		self.fake_course = self.fake.courses[self.course.id]
+
+	def tearDown(self):
+		import os, shutil
+
+		self.fake.stop()
+		mc.retry_policy.backoff = self.backoff
+		os.chdir(self.here)
+		shutil.rmtree(self.root)
+
+
+
+	def test_aaa_transient_failures_are_retried(self):
+		self.fake.fail_next += [('POST', r'/pages$', 500), ('PUT', r'/pages/', 502), ('GET', r'/modules$', 503)]
+
+		mc.Page('plain_text_in_a_module').publish(self.course, overwrite=True)
+
+		self.assertEqual(self.fake.fail_next, [])
+		self.assertEqual(len(self.fake_course.pages), 1)
+		self.assertIn('testing source', list(self.fake_course.pages.values())[0]['body'])
+
+
+
+	def test_bbb_lost_responses_dont_make_duplicates(self):
+		self.fake.fail_after_next += [('POST', r'/pages$', 500), ('POST', r'/modules$', 502), ('POST', r'/items$', 503), ('POST', r'^/upload/', 504)]
+
+		mc.Page('plain_text_in_a_module').publish(self.course, overwrite=True)
+		mc.Page('has_local_images').publish(self.course, overwrite=True)
+
+		self.assertEqual(self.fake.fail_after_next, [])
+		self.assertEqual(len(self.fake_course.pages), 2)
+		self.assertEqual(len(self.fake_course.modules), 2)
+		self.assertEqual([len(items) for items in self.fake_course.module_items.values()], [1,1])
+		self.assertEqual(len(self.fake_course.files), 1)
+
+
+
+	def test_ccc_lost_file_upload_isnt_duplicated(self):
+		self.fake.fail_after_next += [('POST', r'^/upload/', 500)]
+
+		mc.File('a_file.file').publish(self.course, overwrite=True)
+
+		self.assertEqual(self.fake.fail_after_next, [])
+		self.assertEqual(len(self.fake_course.files), 1)
+
+
+
+	def test_ddd_gives_up_eventually(self):
+		from canvasapi.exceptions import CanvasException
+
+		self.fake.fail_next += [('POST', r'/pages$', 500)] * mc.retry_policy.attempts
+
+		with self.assertRaises(CanvasException):
+			mc.Page('plain_text_in_a_module').publish(self.course, overwrite=True)
+
+		self.assertEqual(len(self.fake_course.pages), 0)
+
+
+
+
+if __name__ == '__main__':
+    pgnm = 'this_argument_is_ignored_but_necessary'
+    unittest.main(argv=[pgnm], exit=False)
@@ -0,0 +1,112 @@
+
+import sys
+sys.path.insert(0,'../')
+import markdown2canvas as mc
+
+import unittest
+
+
+class StyleObjectTester(unittest.TestCase):
+	"""
+	styles are read and rendered once, and shared.  these tests don't talk to Canvas, except the last, which uses the fake one.
+	"""
+
+	def test_aaa_loaded_once(self):
+		self.assertIs(mc.Style.load('_styles/generic'), mc.Style.load('_styles/generic'))
+
+
+
+	def test_bbb_header_and_footer_are_applied(self):
+		import os
+
+		page = mc.Page('uses_droplets_via_style')
+		html = page.translated_html
+
+		self.assertIn('uws-droplets-page', html)
+		self.assertIn('Markdown header content here', html)
+		self.assertIn('Header image credit', html)
+		self.assertIn('Testing upload of pages using Droplets', html)
+
+		# no more temp files next to the source
+		self.assertFalse(os.path.exists(os.path.join('uses_droplets_via_style','styled_source.md')))
+
+		# the body can be parsed already
+		style = mc.Style.load('_styles/generic')
+		self.assertEqual(style.apply(mc.parse_html('<p>the body</p>')), style.apply('<p>the body</p>'))
+
+
+
+	def test_ccc_documents_have_their_own_style_images(self):
+		a = mc.Page('uses_droplets_via_style')
+		b = mc.Page('uses_droplets_via_style')
+
+		srcs = mc.Style.load('_styles/generic').image_srcs
+		self.assertEqual(len(srcs), 1)
+
+		# what an image is on canvas depends on the course, so they aren't shared
+		src = srcs[0]
+		self.assertEqual(a.local_images[src].givenpath, b.local_images[src].givenpath)
+		self.assertIsNot(a.local_images[src], b.local_images[src])
+
+
+
+	def test_ddd_reloaded_when_changed(self):
+		import os, shutil, tempfile
+
+		root = tempfile.mkdtemp()
+		try:
+			style_path = os.path.join(root,'generic')
+			shutil.copytree(os.path.join('_styles','generic'), style_path)
+
+			before = mc.Style.load(style_path)
+
+			with open(os.path.join(style_path,'header.md'),'w',encoding='utf-8') as f:
+				f.write('a different header\n')
+			os.utime(os.path.join(style_path,'header.md'), ns=(0,0))
+
+			after = mc.Style.load(style_path)
+			self.assertIsNot(before, after)
+			self.assertIn('a different header', after.header_md_html)
+
+			# and the old one is forgotten
+			self.assertEqual([style for key, style in mc.Style._loaded.values() if style.style_path == style_path], [after])
+		finally:
+			shutil.rmtree(root)
+
+
+
+	def test_eee_publishing_to_two_courses_at_once(self):
+		import os, shutil, tempfile, warnings
+		from concurrent.futures import ThreadPoolExecutor
+		from fake_canvas import FakeCanvas
+
+		warnings.filterwarnings('ignore', message='Canvas may respond unexpectedly')
+
+		here = os.getcwd()
+		root = tempfile.mkdtemp()
+		for folder in ['uses_droplets_via_style','_styles']:
+			shutil.copytree(folder, os.path.join(root, folder))
+		os.chdir(root)
+
+		try:
+			with FakeCanvas(latency=0.01) as fake:
+				canvas = mc.throttle_canvas(fake.canvas(), mc.CanvasSession())
+				courses = [canvas.get_course(fake.add_course()) for _ in range(2)]
+				pages = [mc.Page('uses_droplets_via_style') for _ in courses]
+
+				with ThreadPoolExecutor(max_workers=2) as pool:
+					list(pool.map(lambda pc: pc[0].publish_images_and_adjust_html(pc[1]), zip(pages, courses)))
+
+				for page, course, other in zip(pages, courses, reversed(courses)):
+					self.assertIn(f'/courses/{course.id}/files/', page.translated_html)
+					self.assertNotIn(f'/courses/{other.id}/files/', page.translated_html)
+		finally:
+			os.chdir(here)
+			shutil.rmtree(root)
+
+
+
+
+if __name__ == '__main__':
+    pgnm = 'this_argument_is_ignored_but_necessary'
+    unittest.main(argv=[pgnm], exit=False)
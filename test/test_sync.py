@@ -0,0 +1,120 @@
+
+import sys
+sys.path.insert(0,'../')
+import markdown2canvas as mc
+
+import unittest
+
+from fake_canvas import FakeCanvas
+
+
+class SyncTester(unittest.TestCase):
+	"""
+	pulls pages from a fake Canvas running on this computer, more than once.
+	"""
+
+	def setUp(self):
+		import os, tempfile, warnings
+		warnings.filterwarnings('ignore', message='Canvas may respond unexpectedly')
+
+		self.root = tempfile.mkdtemp()
+		self.destination = os.path.join(self.root,'synced')
+
+		self.fake = FakeCanvas().start()
+		canvas = mc.throttle_canvas(self.fake.canvas(), mc.CanvasSession())
+		self.course = canvas.get_course(self.fake.add_course())
+
+		self.pages = [self.course.create_page(wiki_page={'title': f'page {n}', 'body': f'<p>version 1 of page {n}</p>'}) for n in range(10)]
+
+		self.report = mc.sync_pages(self.destination, self.course)
+		self.fake.reset_counts()
+
+	def tearDown(self):
+		import shutil
+
+		self.fake.stop()
+		shutil.rmtree(self.root)
+
+
+	def source(self, n):
+		import os
+		with open(os.path.join(self.destination,f'page {n}','source.md'),encoding='utf-8') as f:
+			return f.read()
+
+	def edit_locally(self, n):
+		import os
+		with open(os.path.join(self.destination,f'page {n}','source.md'),'a',encoding='utf-8') as f:
+			f.write('\n\nlocal edit\n')
+
+	def edit_remotely(self, n):
+		self.pages[n].edit(wiki_page={'body': f'<p>version 2 of page {n}</p>'})
+		self.fake.reset_counts()
+
+
+
+	def test_aaa_first_sync_pulls_everything(self):
+		self.assertEqual(sorted(self.report.pulled), sorted(f'page {n}' for n in range(10)))
+		self.assertEqual(self.source(3), '<p>version 1 of page 3</p>')
+
+		state = mc.SyncState(self.destination, self.course)
+		self.assertEqual(len(state.entries), 10)
+		self.assertTrue(all(e['revision_id'] == 1 for e in state.entries.values()))
+
+
+
+	def test_bbb_unchanged_pages_arent_fetched(self):
+		report = mc.sync_pages(self.destination, self.course)
+
+		self.assertEqual(report.pulled, [])
+		self.assertEqual(len(report.unchanged), 10)
+		self.assertEqual(self.fake.request_count, self.fake.count('GET', r'/pages$'))
+
+
+
+	def test_ccc_only_changed_pages_are_fetched(self):
+		self.edit_remotely(2)
+		self.edit_remotely(7)
+
+		report = mc.sync_pages(self.destination, self.course)
+
+		self.assertEqual(sorted(report.pulled), ['page 2', 'page 7'])
+		self.assertEqual(self.fake.count('GET', r'/revisions/latest$'), 2)
+		self.assertEqual(self.source(2), '<p>version 2 of page 2</p>')
+		self.assertEqual(mc.SyncState(self.destination, self.course).entries[self.pages[2].url]['revision_id'], 2)
+
+
+
+	def test_ddd_conflicts_are_reported_without_fetching(self):
+		self.edit_locally(1)
+		self.edit_locally(4)
+		self.edit_remotely(4)
+
+		report = mc.sync_pages(self.destination, self.course)
+
+		self.assertEqual(report.changed_locally, ['page 1'])
+		self.assertEqual(list(report.conflicts), ['page 4'])
+		self.assertEqual(self.fake.count('GET', r'/revisions/latest$'), 0)
+		self.assertIn('local edit', self.source(4))
+
+		report = mc.sync_pages(self.destination, self.course, overwrite_local=True)
+		self.assertEqual(report.pulled, ['page 4'])
+		self.assertEqual(self.source(4), '<p>version 2 of page 4</p>')
+
+
+
+	def test_eee_new_and_deleted_pages(self):
+		self.course.create_page(wiki_page={'title': 'page 10', 'body': 'new'})
+		self.pages[0].delete()
+
+		report = mc.sync_pages(self.destination, self.course)
+
+		self.assertEqual(report.pulled, ['page 10'])
+		self.assertEqual(report.deleted_remotely, ['page 0'])
+		self.assertEqual(self.source(0), '<p>version 1 of page 0</p>')
+
+
+
+
+if __name__ == '__main__':
+    pgnm = 'this_argument_is_ignored_but_necessary'
+    unittest.main(argv=[pgnm], exit=False)
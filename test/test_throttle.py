@@ -0,0 +1,79 @@
+
+import sys
+sys.path.insert(0,'../')
+import markdown2canvas as mc
+
+import unittest
+
+from fake_canvas import FakeCanvas
+
+
+class ThrottleTester(unittest.TestCase):
+	"""
+	talks to a fake Canvas running on this computer, with a small rate limit bucket.
+	"""
+
+	def setUp(self):
+		import warnings
+		warnings.filterwarnings('ignore', message='Canvas may respond unexpectedly')
+
+		self.fake = FakeCanvas(latency=0.01, rate_limit=20, refill_rate=200, request_cost=1).start()
+		self.course_id = self.fake.add_course()
+
+	def tearDown(self):
+		self.fake.stop()
+
+
+	def hammer(self, canvas, n=200, threads=16):
+		"""
+		makes `n` requests, `threads` at a time, and returns the names of the exceptions they raised
+		"""
+		from concurrent.futures import ThreadPoolExecutor
+
+		course = canvas.get_course(self.course_id)
+
+		def one(i):
+			try:
+				course.get_page('not-a-page')
+			except Exception as e:
+				return type(e).__name__
+
+		with ThreadPoolExecutor(threads) as pool:
+			return list(pool.map(one, range(n)))
+
+
+
+	def test_aaa_unthrottled_gets_rate_limited(self):
+		# makes sure the fake server actually limits, so the next test means something
+		self.assertIn('Forbidden', self.hammer(self.fake.canvas()))
+
+
+
+	def test_bbb_throttled_doesnt(self):
+		canvas = mc.throttle_canvas(self.fake.canvas(), mc.CanvasSession(low_water=10, refill_rate=200))
+
+		self.assertEqual(set(self.hammer(canvas)), {'ResourceDoesNotExist'})
+
+
+
+	def test_ccc_refused_upload_is_sent_again_whole(self):
+		import os
+
+		canvas = mc.throttle_canvas(self.fake.canvas(), mc.CanvasSession())
+		course = canvas.get_course(self.course_id)
+
+		self.fake.fail_next.append(('POST', r'^/upload/', 429))
+
+		filename = os.path.join('has_local_images','hauser_menagerie.jpg')
+		im = mc.Image(filename)
+		im.publish(course, 'images')
+
+		self.assertEqual(self.fake.fail_next, []) # it was refused once
+		self.assertEqual(im.canvas_obj.size, os.path.getsize(filename))
+
+
+
+
+if __name__ == '__main__':
+    pgnm = 'this_argument_is_ignored_but_necessary'
+    unittest.main(argv=[pgnm], exit=False)